@@ -1,17 +1,177 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import threading
+from pathlib import Path
 import numpy as np
 from scipy import stats
 import pandas as pd
 from sklearn.linear_model import BayesianRidge
 from sklearn.preprocessing import StandardScaler
+from profiling import profiled
 
-def perform_bayesian_analysis(data_df):
+# Number of bootstrap resamples used for the confidence intervals
+N_BOOTSTRAP = 1000
+# Settings of the per-resample BayesianRidge fits
+BOOTSTRAP_MAX_ITER = 300
+BOOTSTRAP_TOL = 1e-6
+# The vectorized engine agrees with per-resample sklearn fits on the same
+# resamples to within this absolute tolerance on coefficients and intercepts
+# (typically ~1e-15; tiny samples with many repeated rows reach ~1e-8)
+BOOTSTRAP_TOLERANCE = 1e-6
+# Upper bound on resamples x rows held in memory at once
+BOOTSTRAP_CHUNK_CELLS = 4_000_000
+
+# Features and target of the incrementally updated model
+ONLINE_FEATURES = ['age', 'social_media_hours']
+ONLINE_TARGET = 'accuracy'
+ONLINE_MODEL_PATH = Path('data/cache/online_model.json')
+# Two-sided 95% normal quantile for the credible intervals
+CREDIBLE_Z = 1.959963984540054
+
+def bootstrap_indices(n_samples, n_resamples, random_state=None):
+    """Yield chunks of bootstrap row indices, shape (chunk, n_samples)."""
+    rng = np.random.default_rng(random_state)
+    chunk = max(1, BOOTSTRAP_CHUNK_CELLS // max(n_samples, 1))
+    for start in range(0, n_resamples, chunk):
+        size = min(chunk, n_resamples - start)
+        yield rng.integers(0, n_samples, size=(size, n_samples))
+
+def fit_bayesian_ridge_stats(n, sum_x, sum_xx, sum_y, sum_xy, sum_yy,
+                             max_iter=BOOTSTRAP_MAX_ITER, tol=BOOTSTRAP_TOL,
+                             alpha_init=None, lambda_init=None,
+                             alpha_1=1e-6, alpha_2=1e-6, lambda_1=1e-6, lambda_2=1e-6):
+    """
+    Fit many BayesianRidge models at once from their sufficient statistics.
+
+    Arguments are stacked over a leading batch axis: n (B,), sum_x (B, p),
+    sum_xx (B, p, p), sum_y (B,), sum_xy (B, p), sum_yy (B,). Runs the same
+    evidence maximisation as sklearn's BayesianRidge(fit_intercept=True),
+    with each model stopping on its own convergence test.
+
+    Returns (coef, intercept, alpha, lambda) with shapes (B, p), (B,), (B,), (B,).
+    """
+    n = np.asarray(n, dtype=float)
+    x_mean = sum_x / n[:, None]
+    y_mean = sum_y / n
+    # Statistics of the centered data, as sklearn fits after centering
+    xtx = sum_xx - n[:, None, None] * x_mean[:, :, None] * x_mean[:, None, :]
+    xty = sum_xy - n[:, None] * x_mean * y_mean[:, None]
+    yty = sum_yy - n * y_mean ** 2
+
+    eigen_vals, eigen_vecs = np.linalg.eigh(xtx)
+    eigen_vals = np.clip(eigen_vals, 0, None)
+    # Projection of X^T y onto the eigenbasis, reused by every iteration
+    proj = np.einsum('bji,bj->bi', eigen_vecs, xty)
+
+    eps = np.finfo(np.float64).eps
+    alpha = np.full(len(n), alpha_init) if alpha_init is not None else 1.0 / (yty / n + eps)
+    lam = np.full(len(n), lambda_init if lambda_init is not None else 1.0)
+
+    def update_coef(alpha, lam):
+        coef = np.einsum('bij,bj->bi', eigen_vecs, proj / (eigen_vals + (lam / alpha)[:, None]))
+        rmse = yty - 2 * np.einsum('bi,bi->b', coef, xty) + np.einsum('bi,bij,bj->b', coef, xtx, coef)
+        return coef, np.clip(rmse, 0, None)
+
+    active = np.ones(len(n), dtype=bool)
+    coef_old = None
+    for iteration in range(max_iter):
+        a, l = alpha[active], lam[active]
+        coef, rmse = update_coef(alpha, lam)
+        coef, rmse = coef[active], rmse[active]
+        gamma = np.sum(a[:, None] * eigen_vals[active] / (l[:, None] + a[:, None] * eigen_vals[active]), axis=1)
+        lam[active] = (gamma + 2 * lambda_1) / (np.sum(coef ** 2, axis=1) + 2 * lambda_2)
+        alpha[active] = (n[active] - gamma + 2 * alpha_1) / (rmse + 2 * alpha_2)
+        if iteration != 0:
+            converged = np.sum(np.abs(coef_old[active] - coef), axis=1) < tol
+            still_active = active.copy()
+            still_active[active] = ~converged
+        else:
+            still_active = active
+        if coef_old is None:
+            coef_old = np.zeros((len(n), coef.shape[1]))
+        coef_old[active] = coef
+        active = still_active
+        if not active.any():
+            break
+
+    coef, _ = update_coef(alpha, lam)
+    intercept = y_mean - np.einsum('bi,bi->b', x_mean, coef)
+    return coef, intercept, alpha, lam
+
+def _bootstrap_vectorized(X, y, n_resamples, random_state):
+    n, p = X.shape
+    # Per-row products, so each resample's sums become one matrix product
+    xx = (X[:, :, None] * X[:, None, :]).reshape(n, p * p)
+    coefs, intercepts = [], []
+    for indices in bootstrap_indices(n, n_resamples, random_state):
+        # counts[b, i] = how many times row i was drawn in resample b
+        size = len(indices)
+        flat = (indices + (np.arange(size) * n)[:, None]).ravel()
+        counts = np.bincount(flat, minlength=size * n).reshape(size, n).astype(float)
+        coef, intercept, _, _ = fit_bayesian_ridge_stats(
+            np.full(size, n),
+            counts @ X,
+            (counts @ xx).reshape(size, p, p),
+            counts @ y,
+            counts @ (X * y[:, None]),
+            counts @ (y * y),
+        )
+        coefs.append(coef)
+        intercepts.append(intercept)
+    return np.concatenate(coefs), np.concatenate(intercepts)
+
+def _fit_bootstrap_chunk(X, y, indices):
+    coefs, intercepts = [], []
+    for rows in indices:
+        brr_bootstrap = BayesianRidge(max_iter=BOOTSTRAP_MAX_ITER, tol=BOOTSTRAP_TOL)
+        brr_bootstrap.fit(X[rows], y[rows])
+        coefs.append(brr_bootstrap.coef_)
+        intercepts.append(brr_bootstrap.intercept_)
+    return np.array(coefs), np.array(intercepts)
+
+def _bootstrap_sklearn(X, y, n_resamples, random_state, n_jobs):
+    chunks = bootstrap_indices(len(X), n_resamples, random_state)
+    if n_jobs and n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            # Split each index chunk so every worker gets a share
+            pieces = [piece for chunk in chunks for piece in np.array_split(chunk, n_jobs)]
+            results = list(pool.map(_fit_bootstrap_chunk, [X] * len(pieces), [y] * len(pieces), pieces))
+    else:
+        results = [_fit_bootstrap_chunk(X, y, chunk) for chunk in chunks]
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+@profiled()
+def bootstrap_bayesian_ridge(X, y, n_resamples=N_BOOTSTRAP, random_state=None,
+                             method='vectorized', n_jobs=None):
+    """
+    Bootstrap BayesianRidge coefficients and intercepts.
+
+    method='vectorized' fits all resamples together as batched NumPy algebra;
+    method='sklearn' fits one BayesianRidge per resample, optionally spread
+    over n_jobs processes. Both draw identical resamples for a given
+    random_state and agree within BOOTSTRAP_TOLERANCE.
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if method == 'vectorized':
+        return _bootstrap_vectorized(X, y, n_resamples, random_state)
+    if method == 'sklearn':
+        return _bootstrap_sklearn(X, y, n_resamples, random_state, n_jobs)
+    raise ValueError(f"Unknown bootstrap method: {method!r}")
+
+@profiled()
+def perform_bayesian_analysis(data_df, n_iterations=N_BOOTSTRAP, random_state=None,
+                              method='vectorized', n_jobs=None):
     """
     Perform statistical analysis on the relationship between user characteristics
     and deepfake detection ability using Bayesian Ridge Regression.
+    Confidence intervals come from n_iterations bootstrap resamples, see
+    bootstrap_bayesian_ridge for method and n_jobs.
     """
     # Prepare the data
-    X = data_df[['age', 'social_media_hours']]
-    y = data_df['accuracy']
+    X = data_df[['age', 'social_media_hours']].astype(float)
+    y = data_df['accuracy'].astype(float)
     
     # Standardize features
     scaler = StandardScaler()
@@ -22,20 +182,10 @@ def perform_bayesian_analysis(data_df):
     brr.fit(X_scaled, y)
     
     # Calculate 95% confidence intervals using bootstrapping
-    predictions = []
-    intercepts = []
-    n_iterations = 1000
-    for _ in range(n_iterations):
-        indices = np.random.choice(len(X), len(X), replace=True)
-        X_bootstrap = X_scaled[indices]
-        y_bootstrap = y.iloc[indices]
-        brr_bootstrap = BayesianRidge(max_iter=300, tol=1e-6)
-        brr_bootstrap.fit(X_bootstrap, y_bootstrap)
-        predictions.append(brr_bootstrap.coef_)
-        intercepts.append(brr_bootstrap.intercept_)
-    
-    predictions = np.array(predictions)
-    intercepts = np.array(intercepts)
+    predictions, intercepts = bootstrap_bayesian_ridge(
+        X_scaled, y, n_resamples=n_iterations, random_state=random_state,
+        method=method, n_jobs=n_jobs
+    )
     
     # Calculate correlations using scipy.stats
     age=data_df['age']
@@ -74,6 +224,366 @@ def perform_bayesian_analysis(data_df):
     
     return results
 
+# Targets, features and grouping column of the batched subgroup analysis
+GROUP_TARGETS = ['accuracy', 'images', 'withAudio', 'withoutAudio']
+GROUP_FEATURES = ['age', 'social_media_hours', 'fam_score']
+GROUP_BY = 'gender'
+# Result keys of each feature's effect, as perform_bayesian_analysis names them
+EFFECT_NAMES = {'age': 'age_effect', 'social_media_hours': 'social_media_effect', 'fam_score': 'familiarity_effect'}
+# Groups with fewer participants are left out of the subgroup results
+MIN_GROUP_SIZE = 10
+
+def _interval(values):
+    """Std and 95% percentile interval over the leading axis, ignoring failed resamples."""
+    return (np.nanstd(values, axis=0),
+            np.nanpercentile(values, 2.5, axis=0),
+            np.nanpercentile(values, 97.5, axis=0))
+
+def _pearson(n, xtx, xty, yty):
+    """Pearson r and two-sided p-values of every feature with every target, from centered sums."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = xty / np.sqrt(np.diag(xtx)[:, None] * yty[None, :])
+        r = np.clip(r, -1.0, 1.0)
+        t = r * np.sqrt((n - 2) / (1 - r ** 2))
+    return r, 2 * stats.t.sf(np.abs(t), n - 2)
+
+@profiled()
+def perform_group_analysis(data_df, targets=GROUP_TARGETS, features=GROUP_FEATURES, group_by=GROUP_BY,
+                           n_iterations=N_BOOTSTRAP, random_state=None, min_group_size=MIN_GROUP_SIZE):
+    """
+    Bayesian ridge effects of the features on every target, for all
+    participants and for each value of group_by, in one batched pass.
+
+    Features are standardized once over all participants, so effects are in
+    the same units across groups. Every bootstrap resample is drawn once over
+    all participants and each group uses its own rows of it; the sufficient
+    statistics of all groups and targets come from shared matrix products and
+    all models are fitted together by fit_bayesian_ridge_stats. Rows missing
+    a feature or target are left out.
+
+    Returns {'features', 'targets', 'n_bootstrap', 'all', 'by_<group_by>'},
+    where each group holds 'n' and, per target, the effects of each feature,
+    the baseline and the model score.
+    """
+    frame = data_df[features + targets + [group_by]].copy()
+    frame[features + targets] = frame[features + targets].apply(pd.to_numeric, errors='coerce')
+    frame = frame.dropna(subset=features + targets)
+    X = StandardScaler().fit_transform(frame[features].to_numpy(dtype=float))
+    Y = frame[targets].to_numpy(dtype=float)
+    n, p = X.shape
+    t = Y.shape[1]
+
+    # Row masks of the groups: everyone, then each value of group_by
+    labels = frame[group_by].astype(str).str.strip().to_numpy()
+    values = [value for value in sorted(set(labels)) if value and value.lower() != 'nan'
+              and np.count_nonzero(labels == value) >= min_group_size]
+    masks = np.array([np.ones(n, dtype=bool)] + [labels == value for value in values], dtype=float)
+    g = len(masks)
+
+    # Per-row terms of every sufficient statistic side by side, so one
+    # weighted sum over rows yields them all for every target
+    terms = np.hstack([
+        np.ones((n, 1)), X, (X[:, :, None] * X[:, None, :]).reshape(n, p * p),
+        Y, (X[:, :, None] * Y[:, None, :]).reshape(n, p * t), Y * Y,
+    ])
+    bounds = np.cumsum([1, p, p * p, t, p * t])
+
+    def fit(weights, **options):
+        """Fit every (weights row, target) model; weights has shape (batch, n)."""
+        sums = weights @ terms
+        count, sum_x, sum_xx, sum_y, sum_xy, sum_yy = np.split(sums, bounds, axis=1)
+        batch = len(sums)
+        count = count[:, 0]
+        # Groups absent from a resample cannot be fitted; fit them on dummy sums and drop the result
+        empty = count < 2
+        safe = np.where(empty, 1.0, count)
+
+        def per_target(values):
+            return np.repeat(values, t, axis=0)
+
+        coef, intercept, alpha, lam = fit_bayesian_ridge_stats(
+            per_target(safe), per_target(sum_x), per_target(sum_xx.reshape(batch, p, p)),
+            sum_y.ravel(), sum_xy.reshape(batch, p, t).transpose(0, 2, 1).reshape(batch * t, p),
+            sum_yy.ravel(), **options
+        )
+        coef = coef.reshape(batch, t, p)
+        intercept = intercept.reshape(batch, t)
+        coef[empty] = np.nan
+        intercept[empty] = np.nan
+        return coef, intercept
+
+    # Point estimates with the settings of perform_bayesian_analysis
+    coef, intercept = fit(masks, max_iter=1000, tol=1e-6, alpha_init=1e-6, lambda_init=1e-6)
+
+    boot_coef, boot_intercept = [], []
+    for indices in bootstrap_indices(n, n_iterations, random_state):
+        size = len(indices)
+        flat = (indices + (np.arange(size) * n)[:, None]).ravel()
+        counts = np.bincount(flat, minlength=size * n).reshape(size, n).astype(float)
+        # Same resamples for every group: each keeps its own rows' counts
+        chunk_coef, chunk_intercept = fit((counts[:, None, :] * masks[None]).reshape(size * g, n))
+        boot_coef.append(chunk_coef.reshape(size, g, t, p))
+        boot_intercept.append(chunk_intercept.reshape(size, g, t))
+    coef_std, coef_low, coef_high = _interval(np.concatenate(boot_coef))
+    intercept_std, intercept_low, intercept_high = _interval(np.concatenate(boot_intercept))
+
+    def group_result(k):
+        rows = masks[k].astype(bool)
+        size = int(rows.sum())
+        x, y = X[rows] - X[rows].mean(axis=0), Y[rows] - Y[rows].mean(axis=0)
+        xtx, xty, yty = x.T @ x, x.T @ y, np.sum(y * y, axis=0)
+        r, p_value = _pearson(size, xtx, xty, yty)
+        result = {'n': size}
+        for j, target in enumerate(targets):
+            b = coef[k, j]
+            residual = yty[j] - 2 * b @ xty[:, j] + b @ xtx @ b
+            entry = {}
+            for i, feature in enumerate(features):
+                entry[EFFECT_NAMES.get(feature, f'{feature}_effect')] = {
+                    'mean': float(b[i]),
+                    'std': float(coef_std[k, j, i]),
+                    'ci_low': float(coef_low[k, j, i]),
+                    'ci_high': float(coef_high[k, j, i]),
+                    'correlation': float(r[i, j]),
+                    'p_value': float(p_value[i, j])
+                }
+            entry['baseline'] = {
+                'mean': float(intercept[k, j]),
+                'std': float(intercept_std[k, j]),
+                'ci_low': float(intercept_low[k, j]),
+                'ci_high': float(intercept_high[k, j])
+            }
+            entry['model_score'] = float(1 - residual / yty[j]) if yty[j] > 0 else float('nan')
+            result[target] = entry
+        return result
+
+    return {
+        'features': list(features),
+        'targets': list(targets),
+        'n_bootstrap': n_iterations,
+        'all': group_result(0),
+        f'by_{group_by}': {value: group_result(k) for k, value in enumerate(values, start=1)},
+    }
+
+class OnlineBayesianRegression:
+    """
+    Bayesian ridge regression of accuracy on age and social media hours,
+    updated one participant at a time.
+
+    Only sufficient statistics are stored (count, sums, X^T X, X^T y, y^T y),
+    so update() is O(p^2). Standardization is derived from the same sums,
+    so the posterior matches a full refit on StandardScaler-scaled features
+    without revisiting historical rows.
+    """
+
+    def __init__(self, n_features=len(ONLINE_FEATURES)):
+        self.n = 0
+        self.sum_x = np.zeros(n_features)
+        self.sum_xx = np.zeros((n_features, n_features))
+        self.sum_y = 0.0
+        self.sum_xy = np.zeros(n_features)
+        self.sum_yy = 0.0
+        # Store generation the statistics were built from, if known
+        self.generation = None
+
+    def update(self, x, y):
+        """Add one observation."""
+        x = np.asarray(x, dtype=float)
+        y = float(y)
+        self.n += 1
+        self.sum_x += x
+        self.sum_xx += np.outer(x, x)
+        self.sum_y += y
+        self.sum_xy += x * y
+        self.sum_yy += y * y
+
+    @classmethod
+    def from_dataframe(cls, data_df):
+        """Rebuild the statistics from the full dataset, leaving out rows with missing values."""
+        X = data_df[ONLINE_FEATURES].to_numpy(dtype=float)
+        y = data_df[ONLINE_TARGET].to_numpy(dtype=float)
+        complete = ~(np.isnan(X).any(axis=1) | np.isnan(y))
+        X, y = X[complete], y[complete]
+        model = cls(X.shape[1])
+        model.n = len(y)
+        model.sum_x = X.sum(axis=0)
+        model.sum_xx = X.T @ X
+        model.sum_y = float(y.sum())
+        model.sum_xy = X.T @ y
+        model.sum_yy = float(y @ y)
+        return model
+
+    def standardized_stats(self):
+        """Sufficient statistics of the standardized features, as StandardScaler would scale them."""
+        mean = self.sum_x / self.n
+        scale = np.sqrt(np.clip(np.diag(self.sum_xx) / self.n - mean ** 2, 0, None))
+        # StandardScaler leaves constant features unscaled
+        scale[scale == 0] = 1.0
+        centered_xx = self.sum_xx - self.n * np.outer(mean, mean)
+        centered_xy = self.sum_xy - mean * self.sum_y
+        sum_zz = centered_xx / np.outer(scale, scale)
+        sum_zy = centered_xy / scale
+        return mean, scale, sum_zz, sum_zy
+
+    def posterior(self):
+        """Posterior mean, std and 95% credible intervals of the standardized effects."""
+        _, _, sum_zz, sum_zy = self.standardized_stats()
+        p = len(sum_zy)
+        coef, intercept, alpha, lam = fit_bayesian_ridge_stats(
+            np.array([self.n]), np.zeros((1, p)), sum_zz[None], np.array([self.sum_y]),
+            sum_zy[None], np.array([self.sum_yy]),
+            max_iter=1000, tol=1e-6, alpha_init=1e-6, lambda_init=1e-6
+        )
+        coef, intercept, alpha, lam = coef[0], intercept[0], alpha[0], lam[0]
+        # Posterior covariance of the coefficients, as BayesianRidge.sigma_
+        sigma = np.linalg.inv(alpha * sum_zz + lam * np.eye(p))
+        coef_std = np.sqrt(np.diag(sigma))
+        # The intercept is the mean of y; its uncertainty is the noise over n
+        intercept_std = np.sqrt(1.0 / (alpha * self.n))
+
+        def effect(mean, std):
+            return {
+                'mean': float(mean),
+                'std': float(std),
+                'ci_low': float(mean - CREDIBLE_Z * std),
+                'ci_high': float(mean + CREDIBLE_Z * std)
+            }
+
+        return {
+            'age_effect': effect(coef[0], coef_std[0]),
+            'social_media_effect': effect(coef[1], coef_std[1]),
+            'baseline_accuracy': effect(intercept, intercept_std),
+            'n': self.n
+        }
+
+    def to_dict(self):
+        return {
+            'n': self.n,
+            'sum_x': self.sum_x.tolist(),
+            'sum_xx': self.sum_xx.tolist(),
+            'sum_y': self.sum_y,
+            'sum_xy': self.sum_xy.tolist(),
+            'sum_yy': self.sum_yy,
+            'generation': self.generation
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        model = cls(len(state['sum_x']))
+        model.n = state['n']
+        model.sum_x = np.array(state['sum_x'], dtype=float)
+        model.sum_xx = np.array(state['sum_xx'], dtype=float)
+        model.sum_y = state['sum_y']
+        model.sum_xy = np.array(state['sum_xy'], dtype=float)
+        model.sum_yy = state['sum_yy']
+        model.generation = state.get('generation')
+        return model
+
+    def save(self, path=None):
+        path = Path(path or ONLINE_MODEL_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=None):
+        """Load saved statistics, or return None if there are none."""
+        try:
+            with open(path or ONLINE_MODEL_PATH) as f:
+                return cls.from_dict(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+_online_lock = threading.Lock()
+_online_model = None
+
+def load_online_model(generation=None):
+    """
+    Make the saved online model the process-wide one. Returns False if there
+    is none, or if a generation is given and the model was built from another.
+    """
+    global _online_model
+    model = OnlineBayesianRegression.load()
+    if model is None or (generation is not None and model.generation != generation):
+        return False
+    with _online_lock:
+        _online_model = model
+    return True
+
+def get_online_model(load_data=None):
+    """
+    Return the process-wide online model.
+    If no saved state exists, it is rebuilt from load_data() when given.
+    """
+    global _online_model
+    with _online_lock:
+        if _online_model is None:
+            _online_model = OnlineBayesianRegression.load()
+            if _online_model is None:
+                if load_data is not None:
+                    _online_model = OnlineBayesianRegression.from_dataframe(load_data())
+                else:
+                    _online_model = OnlineBayesianRegression()
+                _online_model.save()
+        return _online_model
+
+@profiled()
+def update_online_model(user_data):
+    """
+    Fold one stored participant into the online model and persist it.
+    Participants with a missing feature or accuracy are left out, as from_dataframe does.
+    """
+    model = get_online_model()
+    x = np.array([_as_float(user_data.get(name)) for name in ONLINE_FEATURES])
+    y = _as_float(user_data.get(ONLINE_TARGET))
+    if np.isnan(x).any() or np.isnan(y):
+        return model
+    with _online_lock:
+        model.update(x, y)
+        model.save()
+    return model
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def set_online_model(model):
+    """Make model the process-wide online model and persist it."""
+    global _online_model
+    with _online_lock:
+        _online_model = model
+        model.save()
+    return model
+
+def check_online_model(data_df, model=None, rtol=1e-6, atol=1e-9):
+    """
+    Compare the online model with a rebuild from data_df and with a
+    BayesianRidge refit on the same data. Returns a dict of the checks.
+    """
+    model = model or get_online_model()
+    rebuilt = OnlineBayesianRegression.from_dataframe(data_df)
+    stats_match = model.n == rebuilt.n and all(
+        np.allclose(getattr(model, name), getattr(rebuilt, name), rtol=rtol, atol=atol)
+        for name in ('sum_x', 'sum_xx', 'sum_y', 'sum_xy', 'sum_yy')
+    )
+
+    X_scaled = StandardScaler().fit_transform(data_df[ONLINE_FEATURES].astype(float))
+    brr = BayesianRidge(max_iter=1000, tol=1e-6, alpha_init=1e-6, lambda_init=1e-6)
+    brr.fit(X_scaled, data_df[ONLINE_TARGET].astype(float))
+    posterior = model.posterior()
+    online_coef = [posterior['age_effect']['mean'], posterior['social_media_effect']['mean']]
+    max_coef_diff = float(np.max(np.abs(np.array(online_coef) - brr.coef_)))
+
+    return {
+        'stats_match': bool(stats_match),
+        'max_coef_diff': max_coef_diff,
+        'coef_match': bool(np.allclose(online_coef, brr.coef_, rtol=rtol, atol=atol))
+    }
+
 # Example usage:
 if __name__ == "__main__":
     # Create sample data
@@ -84,7 +594,7 @@ if __name__ == "__main__":
         'accuracy': np.random.normal(0.7, 0.1, 100)
     })
     
-    results = perform_bayesian_analysis(data)
+    results = perform_bayesian_analysis(data, random_state=42)
     
     # Print results in a formatted way
     print("\nAnalysis Results:")
@@ -1,38 +1,429 @@
-import statistics
 import streamlit as st
-import pandas as pd
-import numpy as np
-from scipy import stats
-import plotly.express as px
-import plotly.graph_objects as go
-from pathlib import Path
-import json
-from analysis import perform_bayesian_analysis
-from database import save_user_response, load_all_responses
-import matplotlib.pyplot as plt
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import profiling
+from profiling import stage
+from results_cache import VersionedCache
+# database (pandas, gspread, google-auth, sklearn) and plots (plotly,
+# matplotlib) are imported by the pages that use them, so the form page
+# does not wait for the analytics and storage stack to load
+from media import (
+    load_media_manifest, dataset_fingerprint, image_derivative, read_video_rendition, prefetch_pairs
+)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_media_manifest(fingerprint, archive_stamp):
+    # A packed archive built from this dataset (or shipped without it) serves
+    # every asset from one memory-mapped file; see media_archive
+    from media_archive import open_media_archive
+    archive = open_media_archive()
+    if archive is not None and archive.is_current():
+        return {'pairs': archive.pairs, 'archive': archive}
+    return load_media_manifest()
 
 def load_media_paths():
-    """Load paths to deepfake and real media files."""
-    # Replace these paths with your actual dataset paths
-    media_config = {
-        'images': {
-            'real': sorted(Path('data/celeb-df/real/images').glob('*.jpg')),
-            'fake': sorted(Path('data/celeb-df/fake/images').glob('*.jpg'))
-        },
-        'videos': {
-            'no_audio': {
-                'real': sorted(Path('data/celeb-df/real/videos').glob('*.mp4')),
-                'fake': sorted(Path('data/celeb-df/fake/videos').glob('*.mp4'))
-            },
-            'with_audio': {
-                'real': sorted(Path('data/audio_dataset/real').glob('*.mp4')),
-                'fake': sorted(Path('data/audio_dataset/fake').glob('*.mp4'))
+    """Load paths to deepfake and real media files from the cached media manifest."""
+    # The manifest is rebuilt only when a dataset folder changes, and the
+    # archive reopened only when it is rebuilt; otherwise every rerun reuses
+    # the same in-memory copy.
+    from media_archive import archive_stamp
+    fingerprint = tuple(sorted(dataset_fingerprint().items()))
+    return _load_media_manifest(fingerprint, archive_stamp())
+
+@st.cache_resource
+def get_results_cache():
+    """Analysis results and figures shared by every session."""
+    return VersionedCache()
+
+def media_source(item):
+    """
+    What st.image/st.video take for an asset: a copy of an archive slice
+    (they accept bytes but not memoryviews), else the file path.
+    """
+    return bytes(item) if isinstance(item, memoryview) else str(item)
+
+def render_image(media_config, path, caption):
+    archive = media_config.get('archive')
+    image = archive.image(path) if archive else image_derivative(media_config, path)
+    st.image(media_source(image), caption=caption)
+
+def render_video(media_config, path):
+    """Show a clip's poster frame, loading the video player only when it is opened."""
+    archive = media_config.get('archive')
+    rendition = archive.video(path) if archive else read_video_rendition(media_config, path)
+    if rendition['poster'] is None:
+        st.video(media_source(rendition['video']))
+        return
+    st.image(media_source(rendition['poster']), use_container_width=True)
+    label = "▶ Play video"
+    if rendition['duration']:
+        label += f" ({rendition['duration']:.0f}s)"
+    with st.expander(label):
+        st.video(media_source(rendition['video']))
+
+def render_form_page():
+    """User Information Form"""
+    with st.form("user_info"):
+        st.header("📋 Let's Start with Your Details")
+        st.markdown("Tell us a bit about yourself before diving into the deepfake detection test.")
+
+        name = st.text_input("🔤 Your Name")
+        age = st.number_input("🎂 Your Age", max_value=100)
+        gender = st.selectbox("👤 Gender", ["Male", "Female", "Other"])
+
+        st.subheader("📱 Social Media Habits")
+        st.markdown("On average, how many hours a day do you spend on the following platforms?")
+        facebook = st.number_input("🌐 Facebook", min_value=0.0, max_value=24.0, step=0.5)
+        instagram = st.number_input("📸 Instagram", min_value=0.0, max_value=24.0, step=0.5)
+        twitter = st.number_input("🐦 Twitter", min_value=0.0, max_value=24.0, step=0.5)
+        tiktok = st.number_input("🎥 WhatsApp", min_value=0.0, max_value=24.0, step=0.5)
+
+        if st.form_submit_button("🚀 Start Test"):
+            st.session_state.user_data = {
+                'name': name,
+                'age': age,
+                'gender': gender,
+                'social_media_hours': facebook + instagram + twitter + tiktok
             }
+            st.session_state.page = 'test'
+            st.session_state.test_page = 0
+            st.session_state.test_answers = {}
+            st.rerun()
+
+# Test sections in order: manifest section, profiling stage, heading and intro
+TEST_SECTIONS = [
+    ('images', 'images', "🖼️ Image Analysis", """
+                Below are pairs of images. One is real, and the other is a deepfake. Can you figure out which is which? 
+                Be sure to trust your instincts!
+            """),
+    ('no_audio', 'videos', "🎥 Video Analysis", """
+                Now, let's up the ante! You'll watch pairs of videos. Can you spot the deepfake? 
+                Focus on details like facial movements, eye blinks, or anything that seems "off."
+            """),
+    ('with_audio', 'audio_videos', "🔊 Video with Audio Analysis", """
+                Lastly, let's see if audio makes it easier or harder to detect deepfakes. Watch and listen carefully!
+            """),
+]
+# "paginated" shows a few pairs per page; "single" shows the whole test as one form
+TEST_MODE = os.environ.get('DDHA_TEST_MODE', 'paginated')
+# Pairs per page of the paginated test
+PAIRS_PER_PAGE = {'images': 5, 'no_audio': 2, 'with_audio': 2}
+
+def pair_labels(section, i):
+    """Captions, familiarity questions and fake-choice question of one pair."""
+    if section == 'images':
+        first, second = f"Image {i*2 + 1}", f"Image {i*2 + 2}"
+        familiarity = [f"Do you recognize the person in {first} (Pair {i+1})?",
+                       f"Do you recognize the person in {second} (Pair {i+1})?"]
+        question = f"Which image do you think is fake? (Pair {i+1})"
+    elif section == 'no_audio':
+        first, second = f"Video {2*i + 1+40}", f"Video {2*i + 2+40}"
+        familiarity = [f"Do you recognize the person in {first} (Pair {i+1})?",
+                       f"Do you recognize the person in {second} (Pair {i+1})?"]
+        question = f"Which video do you think is fake? (Pair {i+1})"
+    else:
+        first, second = f"Video {2*i + 1+56}", f"Video {2*i + 2+56}"
+        familiarity = [f"Do you recognize the person in {first}? ",
+                       f"Do you recognize the person in {second}? "]
+        question = f"Which video do you think is fake? (Audio Pair {i+1})"
+    return (first, second), familiarity, question
+
+def render_pair(media_config, section, i, pair, answer=None, key=None):
+    """
+    Show one real/fake pair and return (response, fam1, fam2). answer
+    preselects earlier choices; key names the widgets so callbacks can read them.
+    """
+    captions, familiarity_questions, question = pair_labels(section, i)
+    answer = answer or (None, "No", "No")
+    fam = []
+    for column, path, caption, fam_question, fam_answer, part in zip(
+            st.columns(2), pair, captions, familiarity_questions, answer[1:], ('fam1', 'fam2')):
+        with column:
+            if section == 'images':
+                render_image(media_config, path, caption)
+            else:
+                render_video(media_config, path)
+            fam.append(st.radio(fam_question, ["No", "Yes"], index=["No", "Yes"].index(fam_answer),
+                                key=key and f"{key}:{part}"))
+    options = list(captions)
+    response = st.radio(
+        question, options,
+        index=options.index(answer[0]) if answer[0] in options else None,
+        key=key and f"{key}:response"
+    )
+    return response, fam[0], fam[1]
+
+def test_pages(media_config):
+    """Split the test into pages of (section, [(index, pair), ...])."""
+    pages = []
+    for section, _, _, _ in TEST_SECTIONS:
+        pairs = list(enumerate(media_config['pairs'][section]))
+        size = PAIRS_PER_PAGE[section]
+        for start in range(0, len(pairs), size):
+            pages.append((section, pairs[start:start + size]))
+    return pages
+
+def submit_responses(responses, familiarity):
+    """Validate the answers, save them and go to the results page."""
+    if None in responses:  # Check for unselected responses
+        st.error("Please answer all questions before submitting!")
+        return
+    # Process responses here
+    st.session_state.user_data['responses'] = responses
+    st.session_state.user_data['familiarity'] = familiarity
+    with stage('save'):
+        from database import save_user_response
+        save_user_response(st.session_state.user_data)
+    st.session_state.page = 'results'
+    st.rerun()
+
+def render_test_page():
+    """Media Test Page"""
+    media_config = load_media_paths()
+    st.header("🔍 Deepfake Detection Test")
+    st.markdown("""
+        Get ready to put your skills to the test! You'll be shown a series of images and videos. 
+        Your task is to identify which ones are fake. Don't worry—this is all for science! 
+    """)
+    if TEST_MODE == 'single':
+        render_single_test(media_config)
+    else:
+        render_paginated_test(media_config)
+
+def render_single_test(media_config):
+    """The whole test as one form."""
+    with st.form("detection_test"):
+        responses = []
+        familiarity = []
+        for section, stage_name, heading, intro in TEST_SECTIONS:
+            with stage(stage_name):
+                st.subheader(heading)
+                st.markdown(intro)
+                for i, pair in enumerate(media_config['pairs'][section]):
+                    response, fam1, fam2 = render_pair(media_config, section, i, pair)
+                    responses.append(response)
+                    familiarity.append(fam1)
+                    familiarity.append(fam2)
+
+        if st.form_submit_button("📤 Submit Responses"):
+            submit_responses(responses, familiarity)
+
+def store_page_answers(keys, move):
+    """Form callback: keep the page's answers and move by `move` pages."""
+    answers = st.session_state.test_answers
+    for key in keys:
+        answers[key] = tuple(st.session_state[f"{key}:{part}"] for part in ('response', 'fam1', 'fam2'))
+    st.session_state.test_page += move
+
+@st.cache_resource
+def get_prefetch_executor():
+    """Background thread that prepares the media of the next test page."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch')
+
+_prefetch_lock = threading.Lock()
+
+@st.cache_resource
+def get_prefetched_pages():
+    """Media paths of the pages already queued for prefetching in this process."""
+    return set()
+
+def prefetch_page(media_config, section, pairs):
+    """Queue a page's media for preparation, once per page and process."""
+    paths = tuple(path for pair in pairs for path in pair)
+    queued = get_prefetched_pages()
+    with _prefetch_lock:
+        if paths in queued:
+            return
+        queued.add(paths)
+    get_prefetch_executor().submit(prefetch_pairs, media_config, section, pairs)
+
+def render_paginated_test(media_config):
+    """
+    The test a few pairs at a time. Answers are kept in session state between
+    pages, only the current page's media is loaded, and the next page's media
+    is prepared in the background while this one is answered.
+    """
+    pages = test_pages(media_config)
+    answers = st.session_state.setdefault('test_answers', {})
+    page = st.session_state.test_page = min(st.session_state.get('test_page', 0), len(pages) - 1)
+    section, pairs = pages[page]
+    _, stage_name, heading, intro = next(entry for entry in TEST_SECTIONS if entry[0] == section)
+
+    st.progress((page + 1) / len(pages), text=f"Page {page + 1} of {len(pages)}")
+    if page + 1 < len(pages):
+        next_section, next_pairs = pages[page + 1]
+        next_pairs = [pair for _, pair in next_pairs]
+        if 'archive' in media_config:
+            media_config['archive'].prefetch([path for pair in next_pairs for path in pair])
+        else:
+            prefetch_page(media_config, next_section, next_pairs)
+
+    keys = [f"{section}:{i}" for i, _ in pairs]
+    with st.form(f"detection_test_{page}"):
+        with stage(stage_name):
+            st.subheader(heading)
+            if pairs[0][0] == 0:
+                st.markdown(intro)
+            for (i, pair), key in zip(pairs, keys):
+                render_pair(media_config, section, i, pair, answers.get(key), key=key)
+
+        columns = st.columns(2)
+        if page > 0:
+            columns[0].form_submit_button("⬅️ Back", on_click=store_page_answers, args=(keys, -1))
+        if page + 1 < len(pages):
+            columns[1].form_submit_button("Next ➡️", on_click=store_page_answers, args=(keys, 1))
+            submit = False
+        else:
+            submit = columns[1].form_submit_button(
+                "📤 Submit Responses", on_click=store_page_answers, args=(keys, 0)
+            )
+
+    if submit:
+        responses = []
+        familiarity = []
+        for page_section, page_pairs in pages:
+            for i, _ in page_pairs:
+                response, fam1, fam2 = answers.get(f"{page_section}:{i}", (None, "No", "No"))
+                responses.append(response)
+                familiarity.append(fam1)
+                familiarity.append(fam2)
+        submit_responses(responses, familiarity)
+
+def render_hardest_pairs(user_response, count=5):
+    """The pairs participants most often get wrong, and how recognizing the people changes that."""
+    import pandas as pd
+    from database import item_statistics
+    from scoring import ANSWER_KEY, encode_responses
+
+    stats = item_statistics()
+    if stats is None:
+        st.caption("Pair statistics are being updated with the latest responses.")
+        return
+    items = stats.summary()
+    if not items:
+        return
+    correct = encode_responses([user_response['responses']])[0] == ANSWER_KEY
+    table = pd.DataFrame(items).sort_values('difficulty').head(count)
+    table['you'] = ['✅' if correct[pair] else '❌' for pair in table['pair']]
+    st.subheader("🧩 Hardest Pairs")
+    st.markdown("Share of participants who spotted the fake, overall and depending on "
+                "whether they recognized the people shown.")
+    st.dataframe(
+        table[['labels', 'category', 'difficulty', 'difficulty_recognized', 'difficulty_unrecognized',
+               'discrimination', 'answered', 'you']].rename(columns={
+            'labels': 'Pair', 'category': 'Category', 'difficulty': 'Correct',
+            'difficulty_recognized': 'Correct (recognized)', 'difficulty_unrecognized': 'Correct (not recognized)',
+            'discrimination': 'Discrimination', 'answered': 'Answers', 'you': 'You'
+        }),
+        hide_index=True,
+        column_config={
+            column: st.column_config.NumberColumn(format="%.2f")
+            for column in ['Correct', 'Correct (recognized)', 'Correct (not recognized)', 'Discrimination']
         }
-    }
-    return media_config
+    )
 
-def main():
+def render_live_effects():
+    """Posterior of the online model, which every submission updates without refitting."""
+    from database import online_model
+
+    model = online_model()
+    if model is None or model.n < 3:
+        return
+    posterior = model.posterior()
+    st.markdown(f"**Live estimate from all {posterior['n']} participants so far** "
+                "(standardized effects on accuracy, 95% credible interval):")
+    st.dataframe(
+        [{'Effect': label, 'Mean': posterior[key]['mean'],
+          'Low': posterior[key]['ci_low'], 'High': posterior[key]['ci_high']}
+         for key, label in [('baseline_accuracy', 'Baseline accuracy'), ('age_effect', 'Age'),
+                            ('social_media_effect', 'Social media hours')]],
+        hide_index=True,
+        column_config={column: st.column_config.NumberColumn(format="%.3f") for column in ['Mean', 'Low', 'High']}
+    )
+
+def render_results_page():
+    """Results Page"""
+    st.header("📊 Analysis Results")
+    st.markdown("""
+        Let's see how you performed! Below are some insights based on your responses and other participants' data.
+    """)
+
+    from database import (
+        find_participant, get_dataset_version, load_all_responses, participant_percentiles, sync_responses
+    )
+    from plots import build_results
+
+    # Find this participant through the ID index rather than by name.
+    # One sync serves every read of this render.
+    with stage('load'):
+        pending = sync_responses()
+        user_response = find_participant(st.session_state.user_data.get('participant_id'), pending)
+        if user_response is None:
+            # Not readable back yet; the session holds the scores computed on submit
+            if 'accuracy' not in st.session_state.user_data:
+                st.info("Your results are still being saved. Please refresh the page in a moment.")
+                return
+            user_response = st.session_state.user_data
+        percentiles = participant_percentiles(user_response, pending)
+    # Analysis and figures come from the shared cache; the full table is
+    # only loaded when they have to be recomputed
+    with stage('analysis'):
+        results, fresh = get_results_cache().get(
+            get_dataset_version(), lambda: build_results(load_all_responses(pending))
+        )
+        analysis_results = results['analysis']
+
+    # Display user-specific accuracy
+    user_accuracy = float(user_response['accuracy'])
+    st.subheader("🏆 Your Overall Accuracy")
+    st.markdown(f"**Your detection accuracy:** {user_accuracy:.2f} (out of 1.0)")
+    if percentiles['accuracy'] is not None:
+        st.markdown(f"You scored better than **{percentiles['accuracy']:.0f}%** of participants.")
+    category_labels = {'images': 'Images', 'withAudio': 'Videos with audio', 'withoutAudio': 'Videos without audio'}
+    columns = st.columns(len(category_labels))
+    for column, (metric, label) in zip(columns, category_labels.items()):
+        percentile = percentiles[metric]
+        column.metric(
+            label,
+            f"{float(user_response[metric]):.2f}",
+            f"better than {percentile:.0f}%" if percentile is not None else None,
+            delta_color="off"
+        )
+
+    # Per-pair counters are updated on every submission, so this reads no responses
+    with stage('item_stats'):
+        render_hardest_pairs(user_response)
+
+    with stage('plots'):
+        # Display correlation plots
+        st.subheader("📈 Correlation Analysis")
+        st.markdown(f"**Following are the combined accuracy details of all the users who have taken this test till now.** ")
+        if not fresh:
+            st.caption("Charts are being updated with the latest responses.")
+        st.plotly_chart(results['fig_age'])
+        st.plotly_chart(results['fig_social'])
+        st.plotly_chart(results['fig_fam'])
+        st.pyplot(results['fig_categories'])
+        st.plotly_chart(results['fig_gender'])
+
+    # Display Bayesian analysis results
+    st.subheader("🔮 Bayesian Analysis Results")
+    st.markdown("Here's a statistical breakdown of your performance and how it relates to others:")
+    st.json(analysis_results)
+    with stage('live_effects'):
+        render_live_effects()
+    with st.expander("Effects by category and gender"):
+        st.markdown("Effects of age, social media use and familiarity on each score, "
+                    "for all participants and for each gender (standardized features).")
+        st.json(results['group_analysis'], expanded=False)
+
+    if st.button("🔄 Start New Test"):
+        st.session_state.page = 'form'
+        st.rerun()
+
+def render_app():
     st.set_page_config(page_title="Can you detect a deepfake?", layout="wide")
     st.title("🎭 How Good Are You at Detecting Deepfakes? 🎭")
     
@@ -46,218 +437,42 @@ def main():
     if 'page' not in st.session_state:
         st.session_state.page = 'form'
     
-    # User Information Form
-    if st.session_state.page == 'form':
-        with st.form("user_info"):
-            st.header("📋 Let's Start with Your Details")
-            st.markdown("Tell us a bit about yourself before diving into the deepfake detection test.")
-            
-            name = st.text_input("🔤 Your Name")
-            age = st.number_input("🎂 Your Age", max_value=100)
-            gender = st.selectbox("👤 Gender", ["Male", "Female", "Other"])
-            
-            st.subheader("📱 Social Media Habits")
-            st.markdown("On average, how many hours a day do you spend on the following platforms?")
-            facebook = st.number_input("🌐 Facebook", min_value=0.0, max_value=24.0, step=0.5)
-            instagram = st.number_input("📸 Instagram", min_value=0.0, max_value=24.0, step=0.5)
-            twitter = st.number_input("🐦 Twitter", min_value=0.0, max_value=24.0, step=0.5)
-            tiktok = st.number_input("🎥 WhatsApp", min_value=0.0, max_value=24.0, step=0.5)
-            
-            if st.form_submit_button("🚀 Start Test"):
-                st.session_state.user_data = {
-                    'name': name,
-                    'age': age,
-                    'gender': gender,
-                    'social_media_hours': facebook + instagram + twitter + tiktok
-                }
-                st.session_state.page = 'test'
-                st.rerun()
-
-    # Media Test Page
-    elif st.session_state.page == 'test':
-        media_config = load_media_paths()
-        st.header("🔍 Deepfake Detection Test")
-        st.markdown("""
-            Get ready to put your skills to the test! You'll be shown a series of images and videos. 
-            Your task is to identify which ones are fake. Don't worry—this is all for science! 
-        """)
-        
-        with st.form("detection_test"):
-            responses = []
-            familiarity = []
-
-            # Display Images
-            st.subheader("🖼️ Image Analysis")
-            st.markdown("""
-                Below are pairs of images. One is real, and the other is a deepfake. Can you figure out which is which? 
-                Be sure to trust your instincts!
-            """)
-            for i, (real_img, fake_img) in enumerate(zip(
-                media_config['images']['real'][:20], 
-                media_config['images']['fake'][:20]
-            )):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.image(str(real_img), caption=f"Image {i*2 + 1}")
-                    fam1 = st.radio(
-                        f"Do you recognize the person in Image {i*2 + 1} (Pair {i+1})?",
-                        ["No", "Yes"]
-                    )
-                with col2:
-                    st.image(str(fake_img), caption=f"Image {i*2 + 2}")
-                    fam2 = st.radio(
-                        f"Do you recognize the person in Image {i*2 + 2} (Pair {i+1})?",
-                        ["No", "Yes"]
-                    )
-                response = st.radio(
-                    f"Which image do you think is fake? (Pair {i+1})",
-                    [f"Image {i*2+ + 1}", f"Image {i*2 + 2}"],index=None
-                )
-                responses.append(response)
-                familiarity.append(fam1)
-                familiarity.append(fam2)
+    # Each page is timed as one stage when profiling is enabled
+    with stage(st.session_state.page):
+        if st.session_state.page == 'form':
+            render_form_page()
+        elif st.session_state.page == 'test':
+            render_test_page()
+        elif st.session_state.page == 'results':
+            render_results_page()
 
-            # Display Videos
-            st.subheader("🎥 Video Analysis")
-            st.markdown("""
-                Now, let's up the ante! You'll watch pairs of videos. Can you spot the deepfake? 
-                Focus on details like facial movements, eye blinks, or anything that seems "off."
-            """)
-            for i, (real_video, fake_video) in enumerate(zip(
-                media_config['videos']['no_audio']['real'][:8],
-                media_config['videos']['no_audio']['fake'][:8]
-            )):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.video(str(real_video))
-                    fam1 = st.radio(
-                        f"Do you recognize the person in Video {2*i + 1+40} (Pair {i+1})?",
-                        ["No", "Yes"]
-                    )
-                with col2:
-                    st.video(str(fake_video))
-                    fam2 = st.radio(
-                        f"Do you recognize the person in Video {2*i + 2+40} (Pair {i+1})?",
-                        ["No", "Yes"]
-                    )
-                response = st.radio(
-                    f"Which video do you think is fake? (Pair {i+1})",
-                    [f"Video {2*i + 1+40}", f"Video {2*i + 2+40}"],index=None
-                )
-                responses.append(response)
-                familiarity.append(fam1)
-                familiarity.append(fam2)
+# Set DDHA_WARMUP=1 to load the results-page stack in the background at startup
+WARMUP = os.environ.get('DDHA_WARMUP', '') not in ('', '0')
 
-            # Display Audio Videos
-            st.subheader("🔊 Video with Audio Analysis")
-            st.markdown("""
-                Lastly, let's see if audio makes it easier or harder to detect deepfakes. Watch and listen carefully!
-            """)
-            for i, (real_video, fake_video) in enumerate(zip(
-                media_config['videos']['with_audio']['real'][:8],
-                media_config['videos']['with_audio']['fake'][:8]
-            )):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.video(str(real_video))
-                    fam1 = st.radio(
-                        f"Do you recognize the person in Video {2*i + 1+56}? ",
-                        ["No", "Yes"]
-                    )
-                with col2:
-                    st.video(str(fake_video))
-                    fam2 = st.radio(
-                        f"Do you recognize the person in Video {2*i + 2+56}? ",
-                        ["No", "Yes"]
-                    )
-                response = st.radio(
-                    f"Which video do you think is fake? (Audio Pair {i+1})",
-                    [f"Video {2*i+1+56}", f"Video {2*i+2+56}"],index=None
-                )
-                responses.append(response)
-                familiarity.append(fam1)
-                familiarity.append(fam2)
+def warm_up():
+    """Import the storage and analytics modules and sync the response cache."""
+    try:
+        import plots
+        import database
+        database.get_dataset_version()
+    except Exception as e:
+        print(f"Error warming up: {e}")
 
-            if st.form_submit_button("📤 Submit Responses"):
-                if None in responses:  # Check for unselected responses
-                    st.error("Please answer all questions before submitting!")
-                else:
-                    # Process responses here
-                    st.session_state.user_data['responses'] = responses
-                    st.session_state.user_data['familiarity'] = familiarity
-                    save_user_response(st.session_state.user_data)
-                    st.session_state.page = 'results'
-                    st.rerun()
-
-    # Results Page
-    elif st.session_state.page == 'results':
-        st.header("📊 Analysis Results")
-        st.markdown("""
-            Let's see how you performed! Below are some insights based on your responses and other participants' data.
-        """)
-        
-        # Load all responses and perform Bayesian analysis
-        all_responses = load_all_responses()
-        analysis_results = perform_bayesian_analysis(all_responses)
-        
-        # Calculate and display user-specific accuracy
-        user_response = all_responses[all_responses['name'] == st.session_state.user_data['name']]
-        user_accuracy = float(user_response['accuracy'].values[0])
-        st.subheader("🏆 Your Overall Accuracy")
-        st.markdown(f"**Your detection accuracy:** {user_accuracy:.2f} (out of 1.0)")
-        
-        # Display correlation plots
-        st.subheader("📈 Correlation Analysis")
-        st.markdown(f"**Following are the combined accuracy details of all the users who have taken this test till now.** ")
-        # Age vs Detection Accuracy
-        fig_age = px.scatter(all_responses, x='age', y='accuracy',
-                            title='Age vs Detection Accuracy',
-                            trendline="ols")
-        st.plotly_chart(fig_age)
-        
-        # Social Media Hours vs Detection Accuracy
-        fig_social = px.scatter(all_responses, x='social_media_hours', 
-                                y='accuracy',
-                                title='Social Media Usage vs Detection Accuracy',
-                                trendline="ols")
-        st.plotly_chart(fig_social)
-        
-        # Familiarity vs Detection Accuracy
-        fig_fam = px.scatter(all_responses, x='fam_score', 
-                            y='accuracy',
-                            title='Familiarity vs Detection Accuracy',
-                            trendline="ols")
-        st.plotly_chart(fig_fam)
-        
-        all_responses['withAudio'] = all_responses['withAudio'].astype(float)
-        all_responses['withoutAudio'] = all_responses['withoutAudio'].astype(float)
-        all_responses['images'] = all_responses['images'].astype(float)
-        withaudio = all_responses['withAudio'].mean()
-        withoutaudio = all_responses['withoutAudio'].mean()
-        images = all_responses['images'].mean()
-        fig, ax = plt.subplots(figsize=(10, 5))
-        categories = ['Images', 'WithAudio', 'WithoutAudio']
-        accuracy = [images, withaudio, withoutaudio]
-
-        ax.bar(categories, accuracy, color=['skyblue', 'lightgreen', 'lightcoral'], width=0.5, alpha=0.8)
-        ax.set_xlabel('Categories')
-        ax.set_ylabel('Accuracy')
-        ax.set_title('Accuracy for Images, With Audio, and Without Audio')
-        st.pyplot(fig)
-        
-        # Gender comparison
-        fig_gender = px.box(all_responses, x='gender', y='accuracy',
-                            title='Detection Accuracy by Gender')
-        st.plotly_chart(fig_gender)
-        
-        # Display Bayesian analysis results
-        st.subheader("🔮 Bayesian Analysis Results")
-        st.markdown("Here's a statistical breakdown of your performance and how it relates to others:")
-        st.json(analysis_results)
-        
-        if st.button("🔄 Start New Test"):
-            st.session_state.page = 'form'
-            st.rerun()
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """Run warm_up() once per server process, off the script thread."""
+    thread = threading.Thread(target=warm_up, name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def main():
+    if WARMUP:
+        start_warm_up()
+    if 'profile_session' not in st.session_state:
+        st.session_state.profile_session = uuid.uuid4().hex
+    with profiling.rerun(st.session_state.profile_session, st.session_state.get('page')):
+        render_app()
+    profiling.render_debug_panel(st.session_state.profile_session)
 
 if __name__ == "__main__":
     main()
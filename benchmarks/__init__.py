@@ -0,0 +1 @@
+"""Benchmarks for the response pipeline, run with `python -m benchmarks.run`."""
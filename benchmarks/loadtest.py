@@ -0,0 +1,302 @@
+"""
+Load test: concurrent headless sessions walk through form -> test ->
+submit -> results against an in-process FakeWorksheet that can inject
+latency and errors.
+
+Concurrency is raised step by step. Each step reports per-interaction and
+per-stage latency percentiles, error rates, RSS growth per session and
+throughput, and the report names the step at which latency degrades.
+
+    python -m benchmarks.loadtest --levels 1 2 4 8 --latency 0.2 --error-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+APP_PATH = 'app.py'
+# Interactions timed from the simulated user's side
+INTERACTIONS = ['form', 'start_test', 'test_page', 'submit']
+
+
+def _rss():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    values = np.asarray(values)
+    return {
+        'count': int(len(values)),
+        'p50_seconds': float(np.percentile(values, 50)),
+        'p95_seconds': float(np.percentile(values, 95)),
+        'p99_seconds': float(np.percentile(values, 99)),
+        'max_seconds': float(values.max()),
+    }
+
+
+def isolate(workdir, sheet, backend='sheets'):
+    """
+    Point the storage, journal, online model and item statistics at workdir. The sheets
+    backend reads and writes the fake sheet; sqlite starts from its rows.
+    """
+    import analysis
+    import database
+    import item_stats
+    from journal import ResponseJournal, WriteBehindWriter
+    from response_cache import ResponseCache
+    from storage import SheetsStorage, SQLiteStorage
+
+    database.set_sheet_factory(lambda: sheet)
+    if backend == 'sqlite':
+        storage = SQLiteStorage(workdir / 'responses.db')
+        storage.append_rows(sheet.get_all_values()[1:])
+    else:
+        storage = SheetsStorage(database.call_sheet, ResponseCache(directory=workdir / 'responses'))
+    database.set_storage(storage)
+    database._writer = WriteBehindWriter(
+        database._append_rows, journal=ResponseJournal(workdir / 'responses.journal')
+    ).start()
+    analysis.ONLINE_MODEL_PATH = workdir / 'online_model.json'
+    analysis._online_model = None
+    item_stats.ITEM_STATS_PATH = workdir / 'item_stats.json'
+    item_stats._item_stats = None
+
+
+def share_test_runtime():
+    """
+    AppTest installs a mock Runtime before each run and removes it after, so
+    runs in other threads lose theirs midway. Serve one shared mock instead,
+    the way a real server has one Runtime for all sessions.
+
+    Each run also patches config.get_option to report global.appTest, and
+    overlapping runs restore each other's patch; setting the option itself
+    keeps widget values recorded whichever getter a run ends up with.
+    """
+    from unittest.mock import MagicMock
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    config.set_option('global.appTest', True)
+
+
+class SessionError(Exception):
+    pass
+
+
+def run_session(seed, think_time=0.0):
+    """Drive one participant through the app; returns {interaction: [seconds, ...]}."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    timings = {}
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+
+    def step(name, action):
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+        start = time.perf_counter()
+        action()
+        timings.setdefault(name, []).append(time.perf_counter() - start)
+        if at.exception:
+            raise SessionError(f"{name}: {at.exception[0].message}")
+
+    step('form', at.run)
+    at.text_input[0].input(f'load-{seed}')
+    at.number_input[0].set_value(rng.randint(18, 70))
+    step('start_test', at.button[0].click().run)
+
+    while at.session_state.page == 'test':
+        for radio in at.radio:
+            if radio.index is None:
+                radio.set_value(rng.choice(radio.options))
+        button = at.button[-1]
+        step('submit' if 'Submit' in button.label else 'test_page', button.click().run)
+        if 'submit' in timings:
+            break
+
+    if at.session_state.page != 'results':
+        raise SessionError(f"ended on page {at.session_state.page!r}")
+    return timings, at.session_state.profile_session
+
+
+def run_level(concurrency, sessions, think_time, seed):
+    """Run sessions with at most concurrency of them at once."""
+    import gc
+    gc.collect()
+    rss_before = _rss()
+    timings = {name: [] for name in INTERACTIONS}
+    session_ids = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(k):
+        try:
+            result, session_id = run_session(seed + k, think_time)
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+            return
+        with lock:
+            session_ids.append(session_id)
+            for name, values in result.items():
+                timings[name].extend(values)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(sessions)))
+    wall = time.perf_counter() - start
+    gc.collect()
+    completed = sessions - len(errors)
+    return {
+        'concurrency': concurrency,
+        'sessions': sessions,
+        'completed': completed,
+        'error_rate': len(errors) / sessions,
+        'errors': errors[:10],
+        'wall_seconds': wall,
+        'sessions_per_second': completed / wall,
+        'rss_growth_per_session_bytes': int((_rss() - rss_before) / max(sessions, 1)),
+        'interactions': {name: _percentiles(values) for name, values in timings.items()},
+        'session_ids': session_ids,
+    }
+
+
+def stage_latencies(log_path, session_ids):
+    """Per-stage latency percentiles from the profiling log of the given sessions."""
+    session_ids = set(session_ids)
+    stages = {}
+    if not log_path.exists():
+        return stages
+    with open(log_path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record['session'] not in session_ids:
+                continue
+            for entry in record['stages']:
+                stages.setdefault(entry['stage'], []).append(entry['wall_seconds'])
+    return {name: _percentiles(values) for name, values in sorted(stages.items())}
+
+
+def find_knee(levels, factor):
+    """First level whose p95 latency exceeds factor times that of the first level."""
+    def p95(level):
+        return max(stats['p95_seconds'] for stats in level['interactions'].values() if stats)
+
+    baseline = p95(levels[0])
+    for k, level in enumerate(levels[1:], start=1):
+        if p95(level) > factor * baseline:
+            return {
+                'degrades_at_concurrency': level['concurrency'],
+                'p95_seconds': p95(level),
+                'baseline_p95_seconds': baseline,
+                # Best throughput reached while latency was still acceptable
+                'sustained_sessions_per_second': max(
+                    previous['sessions_per_second'] for previous in levels[:k]
+                ),
+            }
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive concurrent sessions through the app against a fake sheet.")
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="concurrent sessions per step")
+    parser.add_argument('--rounds', type=int, default=2, help="sessions per concurrent slot in each step")
+    parser.add_argument('--participants', type=int, default=1000, help="rows already in the sheet")
+    parser.add_argument('--storage', choices=['sheets', 'sqlite'], default='sheets')
+    parser.add_argument('--latency', type=float, default=0.1, help="seconds added to every sheet call")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of sheet calls that fail")
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help="mean pause in seconds before each interaction")
+    parser.add_argument('--degrade-factor', type=float, default=2.0,
+                        help="p95 growth over the first step that counts as degraded")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='loadtest_output.json')
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='ddha-loadtest-'))
+    # Profile every stage into the scratch directory; must be set before the app modules load
+    os.environ['DDHA_PROFILE'] = '1'
+    os.environ['DDHA_PROFILE_LOG'] = str(workdir / 'profile.jsonl')
+    os.environ['DDHA_PROFILE_PROM'] = str(workdir / 'profile.prom')
+    sys.path.insert(0, os.getcwd())
+
+    import database
+    from benchmarks.synthetic import generate_sheet_values
+    from fake_sheet import FakeWorksheet
+
+    values = generate_sheet_values(args.participants, args.seed)
+    sheet = FakeWorksheet(headers=values[0], rows=values[1:], latency=args.latency,
+                          error_rate=args.error_rate, seed=args.seed)
+    isolate(workdir, sheet, args.storage)
+    share_test_runtime()
+
+    # One untimed session loads the modules, the online model and the shared caches
+    print("Warming up...")
+    run_session(args.seed - 1)
+
+    levels = []
+    for concurrency in args.levels:
+        sessions = concurrency * args.rounds
+        print(f"{concurrency} concurrent sessions ({sessions} total)...")
+        level = run_level(concurrency, sessions, args.think_time, args.seed + 1_000_000 * concurrency)
+        level['stages'] = stage_latencies(workdir / 'profile.jsonl', level.pop('session_ids'))
+        levels.append(level)
+        for name, stats in level['interactions'].items():
+            if stats:
+                print(f"  {name:12s} p50 {stats['p50_seconds']:7.2f} s  p95 {stats['p95_seconds']:7.2f} s")
+        print(f"  {level['sessions_per_second']:.2f} sessions/s, "
+              f"errors {level['error_rate']:.0%}, "
+              f"RSS +{level['rss_growth_per_session_bytes'] / 2**20:.1f} MiB/session")
+
+    writer = database.get_response_writer()
+    delivered = writer.flush(timeout=60)
+    knee = find_knee(levels, args.degrade_factor)
+    report = {
+        'config': vars(args),
+        'levels': levels,
+        'knee': knee,
+        'sheet_calls': database.get_sheet_metrics(),
+        'writer': {'delivered': writer.delivered, 'failures': writer.failures, 'drained': delivered},
+        'sheet_rows': sheet.row_count - 1,
+    }
+    calls = report['sheet_calls']
+    print(f"Sheet calls: {sum(op['calls'] for op in calls.values())}, "
+          f"errors {sum(op['errors'] for op in calls.values())}, "
+          f"retries {sum(op['retries'] for op in calls.values())}")
+    if knee:
+        print(f"Latency degrades at {knee['degrades_at_concurrency']} concurrent sessions "
+              f"(p95 {knee['p95_seconds']:.2f} s vs {knee['baseline_p95_seconds']:.2f} s); "
+              f"sustained {knee['sustained_sessions_per_second']:.2f} sessions/s before that.")
+    else:
+        print("Latency did not degrade within the tested levels.")
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
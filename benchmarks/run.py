@@ -0,0 +1,138 @@
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+import database
+from analysis import perform_bayesian_analysis, perform_group_analysis
+from benchmarks.synthetic import generate_sheet_values
+from fake_sheet import FakeWorksheet
+from plots import build_results
+from response_cache import ResponseCache, parse_rows
+from scoring import encode_responses, score_matrix
+from storage import SheetsStorage
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000]
+# Slow, per-row or full-refit benchmarks are skipped above these sizes
+MAX_ROWWISE_SIZE = 10_000
+MAX_FIGURE_SIZE = 100_000
+
+
+def measure(fn, repeat, rows):
+    """Time fn() repeat times, then once more under tracemalloc for peak memory."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings = np.array(timings)
+    return {
+        'repeat': repeat,
+        'p50_seconds': float(np.percentile(timings, 50)),
+        'p95_seconds': float(np.percentile(timings, 95)),
+        'min_seconds': float(timings.min()),
+        'rows_per_second': float(rows / np.median(timings)) if rows else None,
+        'peak_memory_bytes': int(peak),
+    }
+
+
+def _sheet_bytes(values):
+    """UTF-8 size of the sheet's cells, roughly what a full download transfers."""
+    return sum(len(str(cell).encode('utf-8')) for row in values for cell in row)
+
+
+def bench_size(n, repeat, seed, cache_dir):
+    values = generate_sheet_values(n, seed)
+    sheet = FakeWorksheet(headers=values[0], rows=values[1:])
+    database.set_sheet_factory(lambda: sheet)
+    results = {}
+
+    def load_cold():
+        # Fresh cache: download and parse every row
+        database.set_storage(SheetsStorage(
+            database.call_sheet, ResponseCache(directory=tempfile.mkdtemp(dir=cache_dir), sync_interval=0)
+        ))
+        return database.load_all_responses()
+    results['load_all_responses_cold'] = measure(load_cold, repeat, n)
+
+    df = load_cold()
+    results['load_all_responses_warm'] = measure(database.load_all_responses, repeat, n)
+    results['parse_rows'] = measure(lambda: parse_rows(values[1:], values[0]), repeat, n)
+    # The same rows with JSON list cells, as stored before they were packed
+    legacy_values = generate_sheet_values(n, seed, legacy=True)
+    results['parse_rows_legacy'] = measure(lambda: parse_rows(legacy_values[1:], legacy_values[0]), repeat, n)
+    results['parse_rows']['sheet_bytes'] = _sheet_bytes(values)
+    results['parse_rows_legacy']['sheet_bytes'] = _sheet_bytes(legacy_values)
+
+    codes = encode_responses(df['responses'])
+    lengths = df['responses'].apply(len).to_numpy()
+    results['encode_responses'] = measure(lambda: encode_responses(df['responses']), repeat, n)
+    results['score_matrix'] = measure(lambda: score_matrix(codes, lengths), repeat, n)
+    if n <= MAX_ROWWISE_SIZE:
+        def score_rowwise():
+            for responses in df['responses']:
+                database.calculate_accuracy(responses)
+                database.calculate_images(responses)
+                database.calculate_with_audio(responses)
+                database.calculate_without_audio(responses)
+        results['calculate_rowwise'] = measure(score_rowwise, repeat, n)
+
+    results['perform_bayesian_analysis'] = measure(
+        lambda: perform_bayesian_analysis(df, random_state=seed), repeat, n)
+    results['perform_group_analysis'] = measure(
+        lambda: perform_group_analysis(df, random_state=seed), repeat, n)
+    if n <= MAX_FIGURE_SIZE:
+        results['build_results'] = measure(lambda: build_results(df), max(1, repeat // 2), n)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading, scoring, analysis and figures.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="participant counts to benchmark (up to 1000000)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_output.json')
+    args = parser.parse_args()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'sizes': {},
+    }
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for n in args.sizes:
+            print(f"Benchmarking {n} participants...")
+            report['sizes'][str(n)] = bench_size(n, args.repeat, args.seed, cache_dir)
+            for name, stats in report['sizes'][str(n)].items():
+                print(f"  {name:28s} p50 {stats['p50_seconds'] * 1000:9.2f} ms  "
+                      f"p95 {stats['p95_seconds'] * 1000:9.2f} ms  "
+                      f"peak {stats['peak_memory_bytes'] / 2**20:8.1f} MiB")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Cold-start cost of each page: every scenario runs in a fresh interpreter,
+renders one page headlessly with AppTest and reports the time taken, the
+resident memory and which heavy libraries ended up imported.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Libraries worth knowing about when they are loaded
+HEAVY_MODULES = ['pandas', 'pyarrow', 'scipy', 'sklearn', 'matplotlib', 'plotly.express',
+                 'gspread', 'google.auth', 'PIL.Image']
+SCENARIOS = ['form', 'results']
+
+
+def _rss():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        import resource
+        # Peak rather than current RSS, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_scenario(page, participants):
+    """Render one page in this (fresh) process and return its measurements."""
+    import time
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    baseline = {'seconds': time.perf_counter() - start, 'rss_bytes': _rss(), 'modules': len(sys.modules)}
+
+    at = AppTest.from_file('app.py', default_timeout=300)
+    if page == 'results':
+        # Results page of a participant already in a local stand-in sheet;
+        # importing database counts towards the page, building the sheet does not
+        start = time.perf_counter()
+        import database
+        import_seconds = time.perf_counter() - start
+        import tempfile
+        from benchmarks.synthetic import generate_sheet_values
+        from fake_sheet import FakeWorksheet
+        from response_cache import ResponseCache
+        from storage import SheetsStorage
+        values = generate_sheet_values(participants)
+        sheet = FakeWorksheet(headers=values[0], rows=values[1:])
+        database.set_sheet_factory(lambda: sheet)
+        # Start from an empty cache outside the app's data directory
+        database.set_storage(SheetsStorage(database.call_sheet, ResponseCache(directory=tempfile.mkdtemp())))
+        import item_stats
+        item_stats.ITEM_STATS_PATH = Path(tempfile.mkdtemp()) / 'item_stats.json'
+        at.session_state['page'] = 'results'
+        at.session_state['user_data'] = {'participant_id': values[1][values[0].index('participant_id')]}
+
+    else:
+        import_seconds = 0.0
+
+    start = time.perf_counter()
+    at.run()
+    seconds = import_seconds + time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return {
+        'page': page,
+        'baseline': baseline,
+        'first_render_seconds': seconds,
+        'rss_bytes': _rss(),
+        'rss_delta_bytes': _rss() - baseline['rss_bytes'],
+        'modules': len(sys.modules) - baseline['modules'],
+        'heavy_modules': [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def measure_scenario(page, repeat, participants):
+    """Run a scenario repeat times, each in a new interpreter."""
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.startup', '--child', page,
+             '--participants', str(participants)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    seconds = np.array([run['first_render_seconds'] for run in runs])
+    rss = np.array([run['rss_bytes'] for run in runs])
+    return {
+        'repeat': repeat,
+        'p50_seconds': float(np.percentile(seconds, 50)),
+        'max_seconds': float(seconds.max()),
+        'p50_rss_bytes': int(np.percentile(rss, 50)),
+        'rss_delta_bytes': int(np.median([run['rss_delta_bytes'] for run in runs])),
+        'modules_loaded': runs[-1]['modules'],
+        'heavy_modules': runs[-1]['heavy_modules'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time and memory of the form and results pages.")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--participants', type=int, default=1000,
+                        help="rows in the stand-in sheet for the results page")
+    parser.add_argument('--output', default=None, help="also write the report as JSON")
+    parser.add_argument('--child', choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args.participants)))
+        return
+
+    report = {}
+    for page in SCENARIOS:
+        report[page] = stats = measure_scenario(page, args.repeat, args.participants)
+        print(f"{page:8s} first render p50 {stats['p50_seconds']:6.2f} s  "
+              f"RSS {stats['p50_rss_bytes'] / 2**20:7.1f} MiB "
+              f"(+{stats['rss_delta_bytes'] / 2**20:.1f} MiB over streamlit)  "
+              f"heavy: {', '.join(stats['heavy_modules']) or '-'}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import json
+
+import numpy as np
+
+from media import PAIRS_PER_SECTION, read_media_manifest
+from response_cache import SHEET_COLUMNS
+from scoring import (
+    CATEGORIES, SECTIONS, encode_responses, familiarity_cells, familiarity_scores, response_cells, score_matrix
+)
+
+# Sections of the media manifest, in test order, for each scoring category
+_MANIFEST_SECTIONS = {'images': 'images', 'withoutAudio': 'no_audio', 'withAudio': 'with_audio'}
+
+
+def shown_pairs():
+    """Pairs per category actually shown by the test (limited by the available media)."""
+    manifest = read_media_manifest()
+    counts = {}
+    for category in CATEGORIES:
+        section = _MANIFEST_SECTIONS[category]
+        if manifest is not None:
+            counts[category] = len(manifest['pairs'][section])
+        else:
+            counts[category] = PAIRS_PER_SECTION[section]
+    return counts
+
+
+def generate_rows(n, seed=0, pairs=None, legacy=False):
+    """
+    Generate n synthetic participants as sheet rows, exactly as
+    save_user_response writes them (packed list cells, computed scores).
+    legacy=True writes the lists as JSON, as rows stored before packing.
+
+    Each participant gets a latent skill, so accuracy varies realistically
+    between people and correlates mildly with age and social media use.
+    """
+    rng = np.random.default_rng(seed)
+    pairs = pairs or shown_pairs()
+
+    age = np.clip(rng.normal(30, 10, n).round(), 15, 80).astype(int)
+    # Four platforms entered in half-hour steps
+    social = (rng.integers(0, 9, size=(n, 4)) * 0.5).sum(axis=1)
+    gender = rng.choice(['Male', 'Female', 'Other'], size=n, p=[0.48, 0.48, 0.04])
+    skill = np.clip(0.62 - 0.002 * (age - 30) + 0.01 * (social - 8) + rng.normal(0, 0.1, n), 0.05, 0.95)
+
+    # One column of labels per pair, then transposed into per-participant lists
+    response_columns = []
+    familiarity_columns = []
+    for category, prefix, first, _ in SECTIONS:
+        count = pairs[category]
+        correct = rng.random((n, count)) < skill[:, None]
+        recognised = rng.random((n, count, 2)) < 0.15
+        for k in range(count):
+            real_label = f'{prefix} {first + 2 * k}'
+            fake_label = f'{prefix} {first + 2 * k + 1}'
+            response_columns.append(np.where(correct[:, k], fake_label, real_label).tolist())
+            familiarity_columns.append(np.where(recognised[:, k, 0], 'Yes', 'No').tolist())
+            familiarity_columns.append(np.where(recognised[:, k, 1], 'Yes', 'No').tolist())
+    responses = [list(row) for row in zip(*response_columns)]
+    familiarity = [list(row) for row in zip(*familiarity_columns)]
+
+    # Submissions arrive a few minutes apart, in row order
+    submitted = np.datetime64('2024-01-01T00:00:00') + np.cumsum(rng.integers(1, 600, n)).astype('timedelta64[s]')
+    submitted_at = [f'{value}+00:00' for value in submitted.astype(str)]
+
+    n_responses = sum(pairs.values())
+    scores = score_matrix(encode_responses(responses), np.full(n, n_responses))
+    fam_score = familiarity_scores(familiarity)
+    if legacy:
+        response_column = [json.dumps(labels) for labels in responses]
+        familiarity_column = [json.dumps(answers) for answers in familiarity]
+    else:
+        response_column = response_cells(responses)
+        familiarity_column = familiarity_cells(familiarity)
+
+    return [
+        [
+            f'participant_{i}', int(age[i]), str(gender[i]), float(social[i]),
+            response_column[i], familiarity_column[i],
+            float(scores['accuracy'][i]), float(fam_score[i]),
+            float(scores['withAudio'][i]), float(scores['withoutAudio'][i]),
+            float(scores['images'][i]), f'{seed:08x}{i:024x}', submitted_at[i],
+        ]
+        for i in range(n)
+    ]
+
+
+def generate_sheet_values(n, seed=0, pairs=None, legacy=False):
+    """Header plus n rows as strings, the way Worksheet.get_all_values returns them."""
+    rows = generate_rows(n, seed, pairs, legacy)
+    return [list(SHEET_COLUMNS)] + [[str(value) for value in row] for row in rows]
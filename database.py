@@ -1,57 +1,250 @@
+import hashlib
 import json
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
 from pathlib import Path
-import pandas as pd
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from google.oauth2.service_account import Credentials
-import streamlit as st
+# pandas (through storage and response_cache) is imported when responses
+# are first read, and Streamlit only for the sheet credentials
+from journal import WriteBehindWriter
+from profiling import profiled, stage
+from population import SCORE_METRICS
+from response_cache import SHEET_COLUMNS, chain_digest, normalize_headers, parse_rows
+from scoring import (
+    ANSWER_KEY, encode_responses, familiarity_cells, familiarity_scores, response_cells, score_matrix,
+    score_responses
+)
+from storage import SCORE_COLUMNS, SQLITE_PATH, SheetsStorage, SQLiteStorage
+
+SHEET_NAME = 'ddhumanability'
+# Where responses are stored: "sheets" (Google Sheets) or "sqlite"
+STORAGE_BACKEND = os.environ.get('DDHA_STORAGE', 'sheets')
+SQLITE_STORAGE_PATH = os.environ.get('DDHA_SQLITE_PATH', str(SQLITE_PATH))
+SHEET_SCOPES = [
+    'https://spreadsheets.google.com/feeds',
+    'https://www.googleapis.com/auth/drive'
+]
+
+# Retry policy for Sheets calls: exponential backoff with jitter
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+# HTTP statuses worth retrying; 401 means the token went stale, so reconnecting helps
+RETRYABLE_STATUS = {401, 429, 500, 502, 503, 504}
+# Calls that can be repeated safely. A failed append may still have been
+# applied, so appends are never retried here (see SheetsStorage.append_rows).
+IDEMPOTENT_OPERATIONS = {'get_values', 'get_all_values', 'update'}
+# Reopen the spreadsheet periodically even if nothing failed
+CLIENT_MAX_AGE = 30 * 60
+
+# Process-wide worksheet shared by every Streamlit session
+_sheet_lock = threading.Lock()
+_sheet = None
+_sheet_opened_at = 0.0
+_sheet_factory = None
+
+_metrics_lock = threading.Lock()
+_metrics = {}
+
+# Background writer delivering journaled submissions in batches
+_writer_lock = threading.Lock()
+_writer = None
+
+# Process-wide storage backend, chosen by DDHA_STORAGE
+_storage_lock = threading.Lock()
+_storage = None
+_synced_deliveries = 0
+
+# State derived from the stored rows (the online model and the per-pair
+# answer counters). Each submission is
+# folded in once journaled; when there is no saved state, or the store's
+# generation moved on because rows were rewritten in place, it is rebuilt in
+# the background, and submissions journaled meanwhile are folded in after.
+# The lock is held around journaling, so every submission is either in the
+# rows a rebuild reads or in the backlog.
+_derived_lock = threading.Lock()
+# None until loaded, then 'rebuilding' or 'ready'
+_derived_status = None
+# Store generation the derived state belongs to, see _store_generation
+_derived_generation = None
+_derived_backlog = []
+
 # Configure Google Sheets access
-def get_google_sheet():
+def open_google_sheet():
     """
     Authenticate and get access to the Google Sheet.
     Make sure to set up a service account and download the credentials JSON.
     """
+    # The Google client libraries are only needed once a sheet is opened
+    import gspread
+    import streamlit as st
+    from google.oauth2.service_account import Credentials
+
     # Define the scope
     credentials_dict = st.secrets["google_sheets"]
         
     # Create credentials using the dictionary
     creds = Credentials.from_service_account_info(
         credentials_dict, 
-        scopes=[
-            'https://spreadsheets.google.com/feeds',
-            'https://www.googleapis.com/auth/drive'
-        ]
+        scopes=SHEET_SCOPES
     )
     
-    # Authorize and open spreadsheet
+    # Authorize and open spreadsheet. gspread's session refreshes the
+    # access token on its own when it expires.
     client = gspread.authorize(creds)
     
     # Open the specific spreadsheet 
-    sheet = client.open('ddhumanability').sheet1
+    sheet = client.open(SHEET_NAME).sheet1
     
     return sheet
 
+def set_sheet_factory(factory):
+    """
+    Replace how the worksheet is opened, e.g. with a local FakeWorksheet.
+    Pass None to go back to Google Sheets.
+    """
+    global _sheet_factory
+    _sheet_factory = factory
+    reset_google_sheet()
+
+def reset_google_sheet():
+    """Drop the cached worksheet so the next call reconnects."""
+    global _sheet
+    with _sheet_lock:
+        _sheet = None
+
+def get_google_sheet():
+    """Return the shared worksheet, connecting on first use or when it has aged out."""
+    global _sheet, _sheet_opened_at
+    with _sheet_lock:
+        if _sheet is None or time.monotonic() - _sheet_opened_at > CLIENT_MAX_AGE:
+            start = time.perf_counter()
+            _sheet = (_sheet_factory or open_google_sheet)()
+            _sheet_opened_at = time.monotonic()
+            _record_call('connect', time.perf_counter() - start)
+        return _sheet
+
+def _record_call(operation, latency=None, error=False, backoff=None):
+    with _metrics_lock:
+        stats = _metrics.setdefault(operation, {
+            'calls': 0, 'errors': 0, 'retries': 0, 'backoff_seconds': 0.0,
+            'total_seconds': 0.0, 'max_seconds': 0.0, 'last_seconds': 0.0
+        })
+        if latency is not None:
+            stats['calls'] += 1
+            stats['total_seconds'] += latency
+            stats['max_seconds'] = max(stats['max_seconds'], latency)
+            stats['last_seconds'] = latency
+        if error:
+            stats['errors'] += 1
+        if backoff is not None:
+            stats['retries'] += 1
+            stats['backoff_seconds'] += backoff
+
+def get_sheet_metrics():
+    """Per-operation call counts, latencies, errors and retry/backoff totals."""
+    with _metrics_lock:
+        snapshot = {name: dict(stats) for name, stats in _metrics.items()}
+    for stats in snapshot.values():
+        stats['mean_seconds'] = stats['total_seconds'] / stats['calls'] if stats['calls'] else 0.0
+    return snapshot
+
+def _is_retryable(error):
+    import gspread
+    import requests
+    from google.auth.exceptions import TransportError
+    if isinstance(error, gspread.exceptions.APIError):
+        return error.code in RETRYABLE_STATUS
+    # Dropped connections and timeouts; other OSErrors (files, permissions) are not transient
+    return isinstance(error, (TransportError, requests.exceptions.ConnectionError,
+                              requests.exceptions.Timeout, ConnectionError, TimeoutError))
+
+def call_sheet(operation, *args, **kwargs):
+    """
+    Call a worksheet method with reconnect, retry and backoff.
+    Only IDEMPOTENT_OPERATIONS are retried. Non-retryable errors and the
+    last failed attempt are raised to the caller.
+    """
+    attempts = RETRY_ATTEMPTS if operation in IDEMPOTENT_OPERATIONS else 1
+    for attempt in range(attempts):
+        start = time.perf_counter()
+        try:
+            sheet = get_google_sheet()
+            with stage(f'sheets.{operation}'):
+                result = getattr(sheet, operation)(*args, **kwargs)
+        except Exception as e:
+            _record_call(operation, time.perf_counter() - start, error=True)
+            if not _is_retryable(e) or attempt == attempts - 1:
+                raise
+            reset_google_sheet()
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+            delay *= random.uniform(0.5, 1.0)
+            _record_call(operation, backoff=delay)
+            time.sleep(delay)
+            continue
+        _record_call(operation, time.perf_counter() - start)
+        return result
+
+def get_storage():
+    """Return the process-wide storage backend, opening it on first use."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_BACKEND == 'sqlite':
+                _storage = SQLiteStorage(SQLITE_STORAGE_PATH)
+            elif STORAGE_BACKEND == 'sheets':
+                _storage = SheetsStorage(call_sheet)
+            else:
+                raise ValueError(f"unknown DDHA_STORAGE backend {STORAGE_BACKEND!r}")
+        return _storage
+
+def set_storage(storage):
+    """Replace the storage backend, e.g. with a SQLiteStorage on a scratch file."""
+    global _storage, _synced_deliveries, _derived_status
+    with _storage_lock:
+        _storage = storage
+        _synced_deliveries = 0
+    with _derived_lock:
+        _derived_status = None
+        _derived_backlog.clear()
+
+def _append_rows(rows):
+    get_storage().append_rows(rows)
+
+def get_response_writer():
+    """Return the process-wide write-behind writer, starting it on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindWriter(_append_rows).start()
+        return _writer
+
+@profiled()
 def save_user_response(user_data):
-    """Save user response to Google Sheets."""
-    # Calculate accuracy
-    correct_answers = calculate_accuracy(user_data['responses'])
-    user_data['accuracy'] = correct_answers / len(user_data['responses'])
+    """
+    Save user response to the storage backend.
+    The row is fsynced to a local journal and appended to the store in the
+    background, so this returns without waiting on the Sheets API.
+    """
+    # Every submission gets its own ID; the caller keeps it in session state
+    user_data.setdefault('participant_id', uuid.uuid4().hex)
+    # Microseconds, so time filters rarely see two submissions at the same instant
+    user_data.setdefault('submitted_at', datetime.now(timezone.utc).isoformat(timespec='microseconds'))
+
+    # Calculate accuracy and per-category metrics against the answer key
+    scores = score_responses(user_data['responses'])
+    user_data['accuracy'] = scores['accuracy']
     
     # Calculate familiarity score
     noofyes = count_familiarity(user_data['familiarity'])
     user_data['fam_score'] = noofyes / len(user_data['familiarity'])
     
-    # Calculate additional metrics
-    withAudio = calculate_with_audio(user_data['responses'])
-    images = calculate_images(user_data['responses'])
-    withoutAudio = calculate_without_audio(user_data['responses'])
-    
-    user_data['withAudio'] = withAudio
-    user_data['withoutAudio'] = withoutAudio
-    user_data['images'] = images
-    
-    # Get the Google Sheet
-    sheet = get_google_sheet()
+    user_data['withAudio'] = scores['withAudio']
+    user_data['withoutAudio'] = scores['withoutAudio']
+    user_data['images'] = scores['images']
     
     # Prepare the row to be added
     row_to_add = [
@@ -59,102 +252,244 @@ def save_user_response(user_data):
         user_data.get('age', ''),
         user_data.get('gender', ''),
         user_data.get('social_media_hours', ''),
-        json.dumps(user_data.get('responses', [])),
-        json.dumps(user_data.get('familiarity', [])),
+        response_cells([user_data.get('responses', [])])[0],
+        familiarity_cells([user_data.get('familiarity', [])])[0],
         user_data.get('accuracy', ''),
         user_data.get('fam_score', ''),
         user_data.get('withAudio', ''),
         user_data.get('withoutAudio', ''),
-        user_data.get('images', '')
+        user_data.get('images', ''),
+        user_data.get('participant_id', ''),
+        user_data.get('submitted_at', '')
     ]
-    
-    # Append the row to the end of the sheet
+
+    with _derived_lock:
+        # Journal the row locally; the background writer appends it to the store
+        get_response_writer().submit(row_to_add)
+        # Nothing past this point can lose the submission
+        try:
+            _ensure_derived_state()
+        except Exception as e:
+            print(f"Error loading the derived state: {e}")
+        if _derived_status == 'ready':
+            _fold_submission(user_data)
+        else:
+            _derived_backlog.append(user_data)
+
+
+def _fold_submission(user_data):
+    """
+    Fold a journaled submission into the online model and the per-pair
+    answer counters; failures are reported, not raised.
+    """
+    from analysis import update_online_model
+    from item_stats import update_item_stats
     try:
-        sheet.append_row(row_to_add, value_input_option='RAW')
-        print("Response saved successfully.")
+        update_online_model(user_data)
     except Exception as e:
-        print(f"Error saving response: {e}")
+        print(f"Error updating online model: {e}")
+    try:
+        update_item_stats(user_data)
+    except Exception as e:
+        print(f"Error updating item statistics: {e}")
 
 
-def load_all_responses():
-    """Load all responses from Google Sheets into a pandas DataFrame."""
-    sheet = get_google_sheet()
-    
-    # Get all values from the sheet
-    all_data = sheet.get_all_values()
-    
-    # The first row is assumed to be the header
-    headers = all_data[0]
-    
-    # The rest are data rows
-    data_rows = all_data[1:]
-    
-    # Create a DataFrame
-    df = pd.DataFrame(data_rows, columns=headers)
-    
-    # Parse JSON columns if they exist
-    if 'responses' in df.columns:
-        df['responses'] = df['responses'].apply(json.loads)
-    if 'familiarity' in df.columns:
-        df['familiarity'] = df['familiarity'].apply(json.loads)
-    
+def item_statistics():
+    """The per-pair answer statistics, or None while they are being rebuilt."""
+    from item_stats import get_item_stats
+    with _derived_lock:
+        if not _derived_state_ready():
+            return None
+        return get_item_stats()
+
+
+def online_model():
+    """A snapshot of the online model, or None while it is being rebuilt."""
+    from analysis import OnlineBayesianRegression, get_online_model
+    with _derived_lock:
+        if not _derived_state_ready():
+            return None
+        # Submissions are folded in under the same lock, so the copy is consistent
+        return OnlineBayesianRegression.from_dict(get_online_model().to_dict())
+
+
+def _derived_state_ready():
+    """Load or start rebuilding the derived state; whether it is ready. Called with _derived_lock held."""
+    try:
+        _ensure_derived_state()
+    except Exception as e:
+        print(f"Error loading the derived state: {e}")
+        return False
+    return _derived_status == 'ready'
+
+
+def _store_generation():
+    """Which rows derived state is built from: the backend and its rewrite generation."""
+    storage = get_storage()
+    return f'{storage.name}:{storage.generation()}'
+
+
+def _ensure_derived_state():
+    """
+    Load the saved online model and item statistics, or start rebuilding
+    them if either is missing or belongs to an older generation of the
+    store. Called with _derived_lock held.
+    """
+    global _derived_status, _derived_generation
+    generation = _store_generation()
+    if _derived_status is not None and generation == _derived_generation:
+        return
+    _derived_generation = generation
+    from analysis import load_online_model
+    from item_stats import load_item_stats
+    if load_online_model(generation) and load_item_stats(generation):
+        _derived_status = 'ready'
+        _derived_backlog.clear()
+        return
+    _derived_status = 'rebuilding'
+    threading.Thread(target=_rebuild_derived_state, args=(generation,), name='derived-rebuild',
+                     daemon=True).start()
+
+
+def _rebuild_derived_state(generation):
+    """Rebuild the derived state from every stored and journaled row, off the request path."""
+    global _derived_status
+    from analysis import OnlineBayesianRegression, set_online_model
+    from item_stats import ItemStats, set_item_stats
+    try:
+        data_df = load_all_responses()
+        # A row delivered while the journal was read can appear twice
+        ids = data_df['participant_id'].fillna('').astype(str)
+        data_df = data_df[(ids == '') | ~ids.duplicated()]
+        model = OnlineBayesianRegression.from_dataframe(data_df)
+        stats = ItemStats.from_dataframe(data_df)
+        model.generation = stats.generation = generation
+    except Exception as e:
+        print(f"Error rebuilding the derived state: {e}")
+        with _derived_lock:
+            # The next submission tries again; its backlog is kept
+            if _derived_generation == generation:
+                _derived_status = None
+        return
+    included = set(ids)
+    with _derived_lock:
+        if _derived_generation != generation:
+            # The store was rewritten meanwhile; a newer rebuild is running
+            return
+        try:
+            set_online_model(model)
+        except Exception as e:
+            print(f"Error saving the online model: {e}")
+        try:
+            set_item_stats(stats)
+        except Exception as e:
+            print(f"Error saving item statistics: {e}")
+        for user_data in _derived_backlog:
+            if user_data['participant_id'] not in included:
+                _fold_submission(user_data)
+        _derived_backlog.clear()
+        _derived_status = 'ready'
+
+
+def sync_responses():
+    """
+    Bring the stored responses up to date for find_participant and
+    participant_percentiles. Returns the rows still waiting in the journal
+    as a DataFrame; the full table is only read by load_all_responses.
+    """
+    global _synced_deliveries
+    storage = get_storage()
+    writer = get_response_writer()
+    pending = writer.pending_rows()
+    # Rows delivered since the last sync are no longer pending, so fetch
+    # them now instead of waiting for the next scheduled sync
+    delivered = writer.delivered
+    force = delivered != _synced_deliveries
+
+    # Sheets fetch only the rows added since the last sync; SQLite has nothing to fetch
+    storage.sync(force=force)
+    _synced_deliveries = delivered
+
+    pending_rows = [[str(value) for value in row] for row in pending]
+    return parse_rows(pending_rows, storage.headers)
+
+
+@profiled()
+def load_all_responses(pending=None):
+    """
+    Load all stored responses into a pandas DataFrame. pending is a result
+    of sync_responses() to reuse instead of syncing again.
+    """
+    import pandas as pd
+    if pending is None:
+        pending = sync_responses()
+    df = get_storage().load()
+
+    # Include rows that are journaled but not yet in the sheet, so a
+    # participant always finds their own submission. A row flushed while
+    # the sheet is being read can briefly appear twice.
+    if len(pending):
+        df = pd.concat([df, pending], ignore_index=True)
+    else:
+        df = df.copy()
+
     return df
 
 
-# The rest of the functions remain the same as in the original script
+@profiled()
+def find_participant(participant_id, pending=None):
+    """Return a participant's stored row as a Series, or None if unknown."""
+    if pending is None:
+        pending = sync_responses()
+    # A just-submitted row may still be in the journal
+    if 'participant_id' in pending.columns:
+        matches = pending[pending['participant_id'] == participant_id]
+        if len(matches):
+            return matches.iloc[-1]
+    return get_storage().find(participant_id)
+
+
+@profiled()
+def participant_percentiles(participant, pending=None):
+    """
+    Percentile of a participant's overall and per-category scores within the
+    population, from incrementally maintained histograms (Sheets) or SQL
+    counts (SQLite). participant is a stored row or a dict with the scores.
+    """
+    if pending is None:
+        pending = sync_responses()
+    storage = get_storage()
+    percentiles = {}
+    for metric in SCORE_METRICS:
+        extra = pending[metric].to_numpy(dtype=float) if metric in pending.columns else None
+        percentiles[metric] = storage.percentile(
+            metric, float(participant[metric]), extra=extra
+        )
+    return percentiles
+
+
+@profiled()
+def get_dataset_version():
+    """
+    Cheap identifier of the current response data: row count plus a rolling
+    content hash, covering synced rows and rows still waiting in the journal.
+    """
+    pending = get_response_writer().pending_rows()
+    row_count, digest = get_storage().version()
+    if pending:
+        digest = chain_digest(digest, [[str(value) for value in row] for row in pending])
+    return row_count + len(pending), digest[:16]
+
+
+# Scoring helpers, kept for callers scoring a single response list
 def calculate_without_audio(responses):
-    correct_pairs = 0
-    
-    # Iterate through pairs (1-2, 3-4, 5-6, etc.)
-    for i in range(1+40, 17+40, 2):
-        pair_key1 = f'Video {i}'
-        pair_key2 = f'Video {i+1}'
-        print(pair_key1)
-        print(pair_key2)
-        # Odd-numbered videos (1, 3, 5, ...) should be real
-        # Even-numbered videos (2, 4, 6, ...) should be fake
-        is_odd_real = pair_key1 not in responses
-        is_even_fake = pair_key2 in responses
-        print(is_odd_real)
-        print(is_even_fake)
-        if is_odd_real and is_even_fake:
-            correct_pairs += 1
-    
-    return correct_pairs/8
+    return score_responses(responses)['withoutAudio']
 
 def calculate_images(responses):
-    correct_pairs = 0
-    for i in range(1, 41, 2):
-        pair_key1 = f'Image {i}'
-        pair_key2 = f'Image {i+1}'
-        
-        # Odd-numbered images (1, 3, 5, ...) should be real
-        # Even-numbered images (2, 4, 6, ...) should be fake
-        is_odd_real = pair_key1 not in responses
-        is_even_fake = pair_key2 in responses
-        
-        if is_odd_real and is_even_fake:
-            correct_pairs += 1
-    
-    return correct_pairs/20
+    return score_responses(responses)['images']
 
 def calculate_with_audio(responses):
-    correct_pairs = 0
-    
-    # Iterate through pairs (1-2, 3-4, 5-6, etc.)
-    for i in range(1+56, 17+56, 2):
-        pair_key1 = f'Video {i}'
-        pair_key2 = f'Video {i+1}'
-        
-        # Odd-numbered videos (1, 3, 5, ...) should be real
-        # Even-numbered videos (2, 4, 6, ...) should be fake
-        is_odd_real = pair_key1 not in responses
-        is_even_fake = pair_key2 in responses
-        
-        if is_odd_real and is_even_fake:
-            correct_pairs += 1
-    
-    return correct_pairs/8
+    return score_responses(responses)['withAudio']
 
 def count_familiarity(responses):
     count = 0
@@ -167,40 +502,157 @@ def calculate_accuracy(responses):
     """
     Calculate number of correct responses based on ground truth.
     
-    Ground truth rules:
-    - 25 image pairs: Odd-numbered images are real (1), even-numbered images are fake (0)
-    - 15 video pairs without audio: Odd-numbered videos are real (1), even-numbered videos are fake (0)
-    - 10 videos with audio: Odd-numbered videos are real (1), even-numbered videos are fake (0)
+    Ground truth rules (see scoring.ANSWER_KEY):
+    - 20 image pairs: Odd-numbered images are real, even-numbered images are fake
+    - 8 video pairs without audio: Odd-numbered videos are real, even-numbered videos are fake
+    - 8 video pairs with audio: Odd-numbered videos are real, even-numbered videos are fake
     
     Args:
-    responses (list): List of response strings indicating the predicted label
+    responses (list): List of chosen labels, e.g. "Image 2" or "Video 41"
     
     Returns:
     int: Number of correct responses
     """
-    # Create ground truth dictionary
-    ground_truth = {}
-    
-    # Add 25 image pairs
-    for i in range(1, 41):
-        ground_truth[f'Image {i}'] = 1 if i % 2 == 0 else 0
-    
-    # Add 15 video pairs without audio
-    for i in range(1+40, 17+40):
-        ground_truth[f'Video {i}'] = 1 if i % 2 == 0 else 0
-    
-    # Add 10 video pairs with audio
-    for i in range(57, 57+1):
-        ground_truth[f'Video {i}'] = 1 if i % 2 == 0 else 0
-    
-    # Calculate correct responses
-    correct = 0
-    for response, (key, truth) in zip(responses, ground_truth.items()):
-        # Extract the predicted label from the response string
-        # Assumes response is in format like "Image 1: 1" or "Video 2: 0"
-        predicted_label = int(response.split()[-1])
-        
-        if predicted_label % 2 == 0:
-            correct += 1
-    
-    return correct
\ No newline at end of file
+    return round(score_responses(responses)['accuracy'] * len(responses))
+
+
+@profiled()
+def rescore_all_responses(answer_key=ANSWER_KEY, dry_run=False):
+    """
+    Recompute accuracy, fam_score and the category scores of every stored
+    row against answer_key, and write them back in a single update.
+    The write bumps the store's generation, so running apps drop their
+    cached rows and rebuild what they derived from them.
+    Returns the number of rows whose scores changed.
+    """
+    import numpy as np
+
+    storage = get_storage()
+    df = storage.read_all()
+    if not len(df):
+        return 0
+
+    codes = encode_responses(df['responses'])
+    scores = score_matrix(codes, df['responses'].apply(len), answer_key)
+    scores['fam_score'] = familiarity_scores(df['familiarity'])
+    new_values = np.column_stack([scores[column] for column in SCORE_COLUMNS])
+    old_values = df[SCORE_COLUMNS].to_numpy(dtype=float)
+    changed = int(np.count_nonzero(~np.isclose(new_values, old_values).all(axis=1)))
+    if dry_run or not changed:
+        return changed
+
+    storage.write_scores(df, new_values)
+    return changed
+
+
+@profiled()
+def pack_stored_responses(dry_run=False):
+    """
+    Rewrite the responses and familiarity cells of every stored row in the
+    packed encoding (see scoring.response_cells), in a single update. Cells
+    the packed form cannot hold exactly stay JSON. The SQLite backend keeps
+    one row per item and has nothing to convert. The update bumps the
+    store's generation, so running apps download the packed rows again.
+    Returns (rows read, rows whose cells changed).
+    """
+    storage = get_storage()
+    if not isinstance(storage, SheetsStorage):
+        return 0, 0
+    headers, rows = storage.read_raw()
+    if not rows:
+        return 0, 0
+    df = parse_rows(rows, headers)
+    columns = ['responses', 'familiarity']
+    positions = [headers.index(column) for column in columns]
+    old_cells = [[row[k] if k < len(row) else '' for k in positions] for row in rows]
+    new_cells = list(zip(response_cells(df['responses']), familiarity_cells(df['familiarity'])))
+    changed = sum(list(new) != old for new, old in zip(new_cells, old_cells))
+    if dry_run or not changed:
+        return len(rows), changed
+
+    # responses and familiarity are adjacent in the sheet
+    storage.write_columns(columns, new_cells)
+    return len(rows), changed
+
+
+# Responses saved by the app before it used Google Sheets
+LEGACY_JSON_PATH = Path('data/responses.json')
+
+def migrate_responses(source='sheet', json_path=LEGACY_JSON_PATH, target=None, batch_size=1000):
+    """
+    Import responses into a SQLite store from the Google Sheet or from the
+    legacy JSON file. Rows without a participant ID get one derived from
+    their source position and content, so importing again adds nothing.
+    Rows still in the local journal are left to the write-behind writer,
+    which delivers them to whichever backend is configured. Importing bumps
+    the target's generation, so apps reading it rebuild their derived state.
+    Returns (rows read, rows inserted).
+    """
+    target = target or SQLiteStorage(SQLITE_STORAGE_PATH)
+    if source == 'json':
+        with open(json_path) as f:
+            records = json.load(f)
+    elif source == 'sheet':
+        records = SheetsStorage(call_sheet).read_all().to_dict('records')
+    else:
+        raise ValueError(f"unknown migration source {source!r}")
+
+    rows = []
+    id_column = SHEET_COLUMNS.index('participant_id')
+    for position, record in enumerate(records):
+        row = [record.get(column, '') for column in SHEET_COLUMNS]
+        if not row[id_column]:
+            # Hashed without the later submitted_at column, so IDs of earlier imports stay the same
+            content = json.dumps(row[:id_column + 1], sort_keys=True, default=str)
+            row[id_column] = 'legacy-' + hashlib.sha256(f'{source}:{position}:{content}'.encode('utf-8')).hexdigest()[:24]
+        rows.append(row)
+    inserted = sum(
+        target.append_rows(rows[start:start + batch_size]) for start in range(0, len(rows), batch_size)
+    )
+    if inserted:
+        # Submissions folded in by a running app do not include the imported rows
+        target.bump_generation()
+    return len(rows), inserted
+
+
+if __name__ == "__main__":
+    import argparse
+    from export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_responses
+    parser = argparse.ArgumentParser(description="Maintenance tasks for the response store.")
+    parser.add_argument('command', choices=['rescore', 'migrate', 'pack', 'item-stats', 'export'])
+    parser.add_argument('--dry-run', action='store_true', help="only count rows that would change")
+    parser.add_argument('--source', choices=['sheet', 'json'], default='sheet',
+                        help="where migrate reads responses from")
+    parser.add_argument('--json-path', default=str(LEGACY_JSON_PATH))
+    parser.add_argument('--to', default=SQLITE_STORAGE_PATH, help="SQLite file migrate writes to")
+    parser.add_argument('--output', default='data/export/responses.parquet', help="file export writes to")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, help="export format (default: from --output)")
+    parser.add_argument('--since-row', type=int, default=0,
+                        help="export only rows after this store row; pass the last row reported by the "
+                             "previous export to continue from it exactly")
+    parser.add_argument('--since', help="export only rows submitted strictly after this ISO timestamp; "
+                                        "rows from the same instant are skipped, so continue exports with "
+                                        "--since-row")
+    parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.command == 'rescore':
+        changed = rescore_all_responses(dry_run=args.dry_run)
+        print(f"{changed} rows {'would change' if args.dry_run else 'rescored'}.")
+    elif args.command == 'migrate':
+        read, inserted = migrate_responses(args.source, args.json_path, SQLiteStorage(args.to))
+        print(f"Imported {inserted} of {read} rows into {args.to}.")
+    elif args.command == 'pack':
+        read, changed = pack_stored_responses(dry_run=args.dry_run)
+        print(f"{changed} of {read} rows {'would be packed' if args.dry_run else 'packed'}.")
+    elif args.command == 'item-stats':
+        # Rebuilding here would miss rows still in the journal; the app rebuilds from both
+        get_storage().bump_generation()
+        print("Item statistics and the online model will be rebuilt on the app's next submission "
+              "or results page.")
+    elif args.command == 'export':
+        # Reads the store directly: submissions still queued in the journal are not exported
+        result = export_responses(get_storage(), args.output, args.format, args.since_row, args.since,
+                                  args.chunk_size)
+        print(f"Exported {result['rows']} rows to {args.output} "
+              f"(last row {result['last_row']}, last submitted {result['last_submitted_at']}).")
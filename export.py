@@ -0,0 +1,175 @@
+"""
+Streaming export of the stored responses.
+
+Rows are read from the response store a chunk at a time, the list columns
+are expanded into typed per-pair columns, and each chunk is written out
+before the next is read, so memory stays bounded by the chunk size
+however many participants there are. Every chunk has the same columns and
+types, whatever answers it happens to contain:
+
+    row                      store row the participant came from
+    name ... submitted_at    the participant columns (responses and familiarity expanded)
+    <category>_<k>_choice    1 or 2 for the pair's first or second item, empty if unanswered
+    <category>_<k>_correct   whether that choice was the fake item
+    <category>_<k>_recognized_first / _recognized_second
+                             the familiarity answers for the pair's two people
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from profiling import profiled
+from response_cache import NUMERIC_COLUMNS, SHEET_COLUMNS
+from scoring import ANSWER_KEY, CATEGORIES, N_PAIRS, PAIR_CATEGORY, item_answers
+
+EXPORT_FORMATS = ['csv', 'parquet', 'ndjson']
+EXPORT_CHUNK_SIZE = 5_000
+_SUFFIX_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+# <category>_<k> of every pair, k counting from 1 within the category
+PAIR_NAMES = [
+    f'{CATEGORIES[category]}_{int(np.count_nonzero(PAIR_CATEGORY[:pair] == category)) + 1:02d}'
+    for pair, category in enumerate(PAIR_CATEGORY)
+]
+
+
+def expand_items(frame, rows=None):
+    """
+    Participants as a flat, typed DataFrame: one column per participant
+    field and four per pair, see the module docstring. rows are the store
+    rows the participants came from.
+    """
+    n = len(frame)
+    out = {'row': pd.array(np.arange(1, n + 1) if rows is None else rows, dtype='Int64')}
+    for column in SHEET_COLUMNS:
+        if column in ('responses', 'familiarity'):
+            continue
+        values = frame[column] if column in frame.columns else pd.Series([None] * n, dtype=object)
+        values = values.mask(values == '')
+        if column in NUMERIC_COLUMNS:
+            out[column] = pd.to_numeric(values, errors='coerce').astype(float).to_numpy()
+        elif column == 'submitted_at':
+            out[column] = pd.to_datetime(values, utc=True, errors='coerce', format='ISO8601').array
+        else:
+            out[column] = pd.array(values, dtype='string')
+
+    participants, pairs, codes, recognized = item_answers(frame['responses'].tolist(),
+                                                          frame['familiarity'].tolist())
+    choice = np.zeros((n, N_PAIRS), dtype=np.int8)
+    familiar = np.zeros((n, N_PAIRS, 2), dtype=bool)
+    choice[participants, pairs] = codes
+    familiar[participants, pairs] = recognized
+    answered = choice > 0
+    correct = choice == ANSWER_KEY
+    for pair, name in enumerate(PAIR_NAMES):
+        # Unanswered pairs are missing, not wrong
+        missing = ~answered[:, pair]
+        out[f'{name}_choice'] = pd.arrays.IntegerArray(choice[:, pair], missing)
+        out[f'{name}_correct'] = pd.arrays.BooleanArray(correct[:, pair], missing)
+        out[f'{name}_recognized_first'] = pd.arrays.BooleanArray(familiar[:, pair, 0], missing.copy())
+        out[f'{name}_recognized_second'] = pd.arrays.BooleanArray(familiar[:, pair, 1], missing.copy())
+    return pd.DataFrame(out)
+
+
+class _CsvWriter:
+    def __init__(self, f):
+        self.f = f
+        self.header = True
+
+    def write(self, chunk):
+        chunk.to_csv(self.f, index=False, header=self.header)
+        self.header = False
+
+    def close(self):
+        if self.header:
+            # Nothing was exported: still write the header
+            self.write(expand_items(_empty_frame()))
+
+
+class _NdjsonWriter:
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, chunk):
+        text = chunk.to_json(orient='records', lines=True, date_format='iso')
+        self.f.write(text if text.endswith('\n') else text + '\n')
+
+    def close(self):
+        pass
+
+
+class _ParquetWriter:
+    """One row group per chunk, all with the schema of an empty expansion."""
+
+    def __init__(self, f):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.schema = pa.Schema.from_pandas(expand_items(_empty_frame()), preserve_index=False)
+        self.writer = pq.ParquetWriter(f, self.schema)
+
+    def write(self, chunk):
+        self.writer.write_table(self.pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        self.writer.close()
+
+
+_WRITERS = {'csv': _CsvWriter, 'ndjson': _NdjsonWriter, 'parquet': _ParquetWriter}
+
+
+def _empty_frame():
+    return pd.DataFrame({column: pd.Series(dtype=object) for column in SHEET_COLUMNS})
+
+
+def export_format(path, fmt=None):
+    """The export format: fmt if given, otherwise guessed from path's suffix."""
+    fmt = fmt or _SUFFIX_FORMATS.get(Path(path).suffix.lower())
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format for {path}; use one of {', '.join(EXPORT_FORMATS)}")
+    return fmt
+
+
+@profiled()
+def export_responses(storage, path, fmt=None, since_row=0, since_time=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream the stored responses after store row since_row (and, if given,
+    submitted strictly after the ISO timestamp since_time) to path,
+    chunk_size rows at a time. The file is replaced atomically once complete.
+    Returns the number of rows written, the last row and the latest
+    submission time.
+
+    Incremental exports should pass the returned last_row as the next
+    since_row: rows are only ever appended, so it is an exact cursor. A
+    time cursor skips rows submitted in the same instant as the last one
+    exported.
+    """
+    fmt = export_format(path, fmt)
+    if since_time is not None:
+        # Stored timestamps are UTC ISO strings, which compare in time order
+        since_time = pd.Timestamp(since_time)
+        since_time = (since_time.tz_localize('UTC') if since_time.tzinfo is None
+                      else since_time.tz_convert('UTC')).isoformat()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    exported, last_row, last_submitted = 0, since_row, None
+    f = open(tmp_path, 'wb') if fmt == 'parquet' else open(tmp_path, 'w', newline='', encoding='utf-8')
+    with f:
+        writer = _WRITERS[fmt](f)
+        for rows, frame in storage.iter_rows(since_row, chunk_size, since_time):
+            chunk = expand_items(frame, rows)
+            writer.write(chunk)
+            exported += len(chunk)
+            last_row = int(rows[-1])
+            latest = chunk['submitted_at'].max()
+            if pd.notna(latest) and (last_submitted is None or latest > last_submitted):
+                last_submitted = latest
+        writer.close()
+    os.replace(tmp_path, path)
+    return {
+        'rows': exported,
+        'last_row': last_row,
+        'last_submitted_at': last_submitted.isoformat() if last_submitted is not None else None,
+    }
@@ -0,0 +1,111 @@
+import random
+import re
+import threading
+import time
+
+
+class FakeSheetError(ConnectionError):
+    """Injected failure raised by FakeWorksheet, retried like a network error."""
+
+
+def _column_index(letters):
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + ord(char) - ord('A') + 1
+    return index
+
+
+def _parse_range(range_name):
+    """Parse an A1 range like 'A2:K', 'A2:K100' or '5:5' into 1-based bounds (None = open)."""
+    bounds = []
+    for part in range_name.split(':'):
+        match = re.fullmatch(r'([A-Za-z]*)(\d*)', part)
+        col, row = match.groups()
+        bounds.append((_column_index(col) if col else None, int(row) if row else None))
+    if len(bounds) == 1:
+        bounds.append(bounds[0])
+    (col1, row1), (col2, row2) = bounds
+    return row1 or 1, row2, col1 or 1, col2
+
+
+class FakeWorksheet:
+    """
+    In-memory stand-in for a gspread Worksheet.
+
+    Implements the calls the app makes and can inject latency and errors,
+    so the storage code can be exercised without Google credentials. With
+    fail_after_write, injected failures of writes happen after the write was
+    applied, like a reply lost in transit.
+    """
+
+    def __init__(self, headers=None, rows=None, latency=0.0, error_rate=0.0, seed=None,
+                 fail_after_write=False):
+        self.rows = [list(headers)] if headers else []
+        self.rows.extend(list(row) for row in rows or [])
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail_after_write = fail_after_write
+        self.calls = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self, name, write=False):
+        """Count a call and wait out the latency. Returns whether a write must fail once applied."""
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            fail = bool(self.error_rate) and self._random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail and not (write and self.fail_after_write):
+            raise FakeSheetError(f"injected failure in {name}")
+        return fail
+
+    def _reply(self, name, fail):
+        if fail:
+            raise FakeSheetError(f"injected failure after {name} was applied")
+
+    @property
+    def row_count(self):
+        return len(self.rows)
+
+    def append_row(self, values, value_input_option='RAW'):
+        fail = self._call('append_row', write=True)
+        with self._lock:
+            self.rows.append([str(value) for value in values])
+        self._reply('append_row', fail)
+
+    def append_rows(self, values, value_input_option='RAW'):
+        fail = self._call('append_rows', write=True)
+        with self._lock:
+            self.rows.extend([str(value) for value in row] for row in values)
+        self._reply('append_rows', fail)
+
+    def get_all_values(self):
+        self._call('get_all_values')
+        with self._lock:
+            return [list(row) for row in self.rows]
+
+    def get_values(self, range_name=None):
+        self._call('get_values')
+        with self._lock:
+            if range_name is None:
+                return [list(row) for row in self.rows]
+            row1, row2, col1, col2 = _parse_range(range_name)
+            selected = self.rows[row1 - 1:row2]
+        return [row[col1 - 1:col2] for row in selected]
+
+    def update(self, values, range_name=None, value_input_option='RAW'):
+        # gspread 6 argument order: values first, the range as a keyword
+        fail = self._call('update', write=True)
+        row1, _, col1, _ = _parse_range(range_name or 'A1')
+        with self._lock:
+            for offset, new_values in enumerate(values):
+                index = row1 - 1 + offset
+                while len(self.rows) <= index:
+                    self.rows.append([])
+                row = self.rows[index]
+                end = col1 - 1 + len(new_values)
+                if len(row) < end:
+                    row.extend([''] * (end - len(row)))
+                row[col1 - 1:end] = [str(value) for value in new_values]
+        self._reply('update', fail)
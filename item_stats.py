@@ -0,0 +1,232 @@
+"""
+Per-pair answer statistics, updated one submission at a time.
+
+For every pair of the answer key the store counts correct and incorrect
+answers split by which of the two people the participant recognized and
+by demographic bucket (age band x gender), plus the sums needed for the
+item-rest correlation. Queries read a fixed-size slice of the counters, so
+their cost does not depend on the number of participants.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from profiling import profiled
+from scoring import ANSWER_KEY, CATEGORIES, N_PAIRS, PAIR_CATEGORY, PAIR_LABELS, item_answers
+
+ITEM_STATS_PATH = Path('data/cache/item_stats.json')
+# Which of the pair's two people (real first, fake second) the participant recognized
+FAMILIARITY_BUCKETS = ['neither', 'real', 'fake', 'both']
+# Lower edges of the age bands after the first
+AGE_EDGES = [25, 35, 45, 55]
+AGE_BANDS = ['<25', '25-34', '35-44', '45-54', '55+']
+# Genders offered by the form; anything else is counted as 'Other'
+GENDERS = ['Male', 'Female', 'Other']
+CORRECT, INCORRECT = 0, 1
+# Item-rest sums per pair: answers, correct, rest score, rest score squared, correct x rest score
+_MOMENTS = 5
+
+
+def age_band(age):
+    """Index into AGE_BANDS of each age; unknown ages fall in the first band."""
+    age = np.nan_to_num(np.asarray(age, dtype=float), nan=0.0)
+    return np.searchsorted(AGE_EDGES, age, side='right')
+
+
+def gender_index(gender):
+    return np.array([GENDERS.index(value) if value in GENDERS else len(GENDERS) - 1
+                     for value in np.atleast_1d(gender)], dtype=np.int64)
+
+
+class ItemStats:
+    """Answer counters and item-rest sums for every pair of the answer key."""
+
+    def __init__(self):
+        self.n = 0
+        # counts[pair, familiarity bucket, age band, gender, CORRECT/INCORRECT]
+        self.counts = np.zeros(
+            (N_PAIRS, len(FAMILIARITY_BUCKETS), len(AGE_BANDS), len(GENDERS), 2), dtype=np.int64
+        )
+        self.moments = np.zeros((N_PAIRS, _MOMENTS), dtype=np.int64)
+        # Store generation the counters were built from, if known
+        self.generation = None
+
+    def add(self, responses_list, familiarity_list, ages, genders):
+        """Fold in a batch of participants' answers."""
+        rows, pairs, codes, recognized = item_answers(responses_list, familiarity_list)
+        correct = codes == ANSWER_KEY[pairs]
+        # Bucket index: bit 0 for the real person, bit 1 for the fake one
+        buckets = recognized[:, 0] + 2 * recognized[:, 1].astype(np.int64)
+        ages = age_band(ages)[rows]
+        genders = gender_index(genders)[rows]
+        np.add.at(self.counts, (pairs, buckets, ages, genders, np.where(correct, CORRECT, INCORRECT)), 1)
+
+        # Rest score: the participant's other correct answers
+        totals = np.bincount(rows, weights=correct, minlength=len(responses_list)).astype(np.int64)
+        rest = totals[rows] - correct
+        for column, values in enumerate([np.ones_like(rest), correct, rest, rest * rest, correct * rest]):
+            self.moments[:, column] += np.bincount(pairs, weights=values, minlength=N_PAIRS).astype(np.int64)
+        self.n += len(responses_list)
+
+    def update(self, user_data):
+        """Fold in one submission."""
+        self.add([user_data['responses']], [user_data['familiarity']],
+                 [user_data.get('age')], [user_data.get('gender')])
+
+    @classmethod
+    def from_dataframe(cls, data_df):
+        """Rebuild the counters from the full dataset."""
+        stats = cls()
+        if len(data_df):
+            stats.add(data_df['responses'].tolist(), data_df['familiarity'].tolist(),
+                      data_df['age'].to_numpy(), data_df['gender'].tolist())
+        return stats
+
+    def _select(self, pair, familiarity=None, age=None, gender=None):
+        """(correct, incorrect) counts of a pair, optionally for one bucket of each split."""
+        counts = self.counts[pair]
+        if familiarity is not None:
+            counts = counts[FAMILIARITY_BUCKETS.index(familiarity)][None]
+        if age is not None:
+            counts = counts[:, AGE_BANDS.index(age)][:, None]
+        if gender is not None:
+            counts = counts[:, :, GENDERS.index(gender)][:, :, None]
+        totals = counts.reshape(-1, 2).sum(axis=0)
+        return int(totals[CORRECT]), int(totals[INCORRECT])
+
+    def difficulty(self, pair, familiarity=None, age=None, gender=None):
+        """
+        Classical item difficulty: share of answers to pair that were
+        correct (lower is harder), optionally within one familiarity bucket,
+        age band and gender. None when nobody in the selection answered it.
+        """
+        correct, incorrect = self._select(pair, familiarity, age, gender)
+        total = correct + incorrect
+        return correct / total if total else None
+
+    def discrimination(self, pair):
+        """
+        Item-rest correlation: how much more often participants who do well on
+        the other pairs get this one right. None when undefined.
+        """
+        n, correct, rest, rest_squared, correct_rest = self.moments[pair].astype(float)
+        if n < 2:
+            return None
+        p = correct / n
+        mean_rest = rest / n
+        covariance = correct_rest / n - p * mean_rest
+        variance = p * (1 - p) * (rest_squared / n - mean_rest ** 2)
+        return float(covariance / np.sqrt(variance)) if variance > 0 else None
+
+    def summary(self):
+        """One dict per answered pair: labels, answers, difficulty overall and by familiarity, discrimination."""
+        items = []
+        for pair in range(N_PAIRS):
+            answered = int(self.moments[pair, 0])
+            if not answered:
+                continue
+            recognized = [self._select(pair, bucket) for bucket in FAMILIARITY_BUCKETS[1:]]
+            correct = sum(c for c, _ in recognized)
+            total = sum(c + i for c, i in recognized)
+            items.append({
+                'pair': pair,
+                'category': CATEGORIES[PAIR_CATEGORY[pair]],
+                'labels': ' / '.join(PAIR_LABELS[pair]),
+                'answered': answered,
+                'difficulty': self.difficulty(pair),
+                'difficulty_recognized': correct / total if total else None,
+                'difficulty_unrecognized': self.difficulty(pair, 'neither'),
+                'discrimination': self.discrimination(pair),
+            })
+        return items
+
+    def to_dict(self):
+        return {'n': self.n, 'counts': self.counts.tolist(), 'moments': self.moments.tolist(),
+                'generation': self.generation}
+
+    @classmethod
+    def from_dict(cls, state):
+        stats = cls()
+        counts = np.array(state['counts'], dtype=np.int64)
+        moments = np.array(state['moments'], dtype=np.int64)
+        if counts.shape != stats.counts.shape or moments.shape != stats.moments.shape:
+            # Saved for a different answer key or bucket layout
+            return None
+        stats.n = state['n']
+        stats.counts = counts
+        stats.moments = moments
+        stats.generation = state.get('generation')
+        return stats
+
+    def save(self, path=None):
+        path = Path(path or ITEM_STATS_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=None):
+        """Load saved counters, or return None if there are none."""
+        try:
+            with open(path or ITEM_STATS_PATH) as f:
+                return cls.from_dict(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+
+_item_stats_lock = threading.Lock()
+_item_stats = None
+
+
+def load_item_stats(generation=None):
+    """
+    Make the saved item statistics the process-wide ones. Returns False if
+    there are none, or if a generation is given and they were built from another.
+    """
+    global _item_stats
+    stats = ItemStats.load()
+    if stats is None or (generation is not None and stats.generation != generation):
+        return False
+    with _item_stats_lock:
+        _item_stats = stats
+    return True
+
+
+def get_item_stats(load_data=None):
+    """
+    Return the process-wide item statistics.
+    If no saved state exists, they are rebuilt from load_data() when given.
+    """
+    global _item_stats
+    with _item_stats_lock:
+        if _item_stats is None:
+            _item_stats = ItemStats.load()
+            if _item_stats is None:
+                _item_stats = ItemStats.from_dataframe(load_data()) if load_data is not None else ItemStats()
+                _item_stats.save()
+        return _item_stats
+
+
+@profiled()
+def update_item_stats(user_data):
+    """Fold one stored participant into the item statistics and persist them."""
+    stats = get_item_stats()
+    with _item_stats_lock:
+        stats.update(user_data)
+        stats.save()
+    return stats
+
+
+def set_item_stats(stats):
+    """Make stats the process-wide item statistics and persist them."""
+    global _item_stats
+    with _item_stats_lock:
+        _item_stats = stats
+        stats.save()
+    return stats
+
@@ -0,0 +1,197 @@
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Append-only log of submitted rows, kept next to data/responses.json
+JOURNAL_PATH = Path('data/responses.journal')
+
+# Flush policy for the background writer
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 1.0
+MAX_BACKOFF = 60.0
+
+
+class ResponseJournal:
+    """
+    Durable local log of rows waiting to be written to the response store.
+
+    Each row is one JSON line, fsynced before append() returns. A sidecar
+    file records the byte offset up to which rows have been delivered,
+    so undelivered rows survive a restart and are replayed.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = Path(path)
+        self.offset_path = self.path.with_name(self.path.name + '.offset')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def append(self, row):
+        """Append a row and fsync it; returns the end offset of the record."""
+        line = (json.dumps(row) + '\n').encode('utf-8')
+        with self._lock:
+            with open(self.path, 'ab') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+                return f.tell()
+
+    def committed_offset(self):
+        try:
+            return int(self.offset_path.read_text() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def pending(self):
+        """Return [(end_offset, row), ...] for every row not yet delivered."""
+        offset = self.committed_offset()
+        records = []
+        with self._lock:
+            try:
+                with open(self.path, 'r+b') as f:
+                    if offset > os.fstat(f.fileno()).st_size:
+                        # The log was compacted after the offset was written: replay
+                        # all of it, since duplicates are safer than lost rows
+                        offset = 0
+                    f.seek(offset)
+                    for line in f:
+                        start, offset = offset, offset + len(line)
+                        if not line.endswith(b'\n'):
+                            # A torn final line from a crash mid-write is not a record;
+                            # cut it off so the next append starts on a fresh line
+                            f.truncate(start)
+                            os.fsync(f.fileno())
+                            break
+                        try:
+                            records.append((offset, json.loads(line)))
+                        except json.JSONDecodeError:
+                            print(f"Skipping unreadable journal record at bytes {start}-{offset} of {self.path}")
+            except FileNotFoundError:
+                pass
+        return records
+
+    def commit(self, offset):
+        """
+        Mark everything up to offset as delivered, compacting the log once it
+        is drained. Offsets must be committed in the order rows were appended.
+        """
+        with self._lock:
+            self._write_offset(offset)
+            if offset == self.path.stat().st_size:
+                # Reset the offset before truncating: a crash in between
+                # replays rows (duplicates) rather than losing new ones.
+                self._write_offset(0)
+                with open(self.path, 'r+b') as f:
+                    f.truncate(0)
+                    os.fsync(f.fileno())
+
+    def _write_offset(self, offset):
+        tmp_path = self.offset_path.with_name(self.offset_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.offset_path)
+
+
+class WriteBehindWriter:
+    """
+    Background thread that delivers journaled rows in batches.
+
+    submit() only journals the row, so its latency is one local fsync.
+    Failed batches stay in the journal and are retried with exponential
+    backoff. Delivery is at-least-once: a crash between a successful
+    append and the offset commit re-sends that batch.
+    """
+
+    def __init__(self, append_rows, journal=None, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, max_backoff=MAX_BACKOFF):
+        self.append_rows = append_rows
+        self.journal = journal or ResponseJournal()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.delivered = 0
+        self.failures = 0
+        self.last_error = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._pending_lock = threading.Lock()
+        # Rows left over from a previous run are replayed first
+        self._pending = self.journal.pending()
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def submit(self, row):
+        """Durably journal a row and schedule it for delivery."""
+        # One lock keeps _pending in journal order, so a delivered batch never
+        # commits past a row another thread appended but has not queued yet
+        with self._pending_lock:
+            offset = self.journal.append(row)
+            self._pending.append((offset, row))
+        self._wakeup.set()
+
+    def pending_rows(self):
+        """Rows accepted locally but not yet delivered to the store."""
+        with self._pending_lock:
+            return [row for _, row in self._pending]
+
+    def flush(self, timeout=None):
+        """Wait until every submitted row is delivered; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._wakeup.set()
+        while self.pending_rows():
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stop(self, timeout=5.0):
+        """Try to drain the journal, then stop the thread. Undelivered rows stay journaled."""
+        if self._thread.is_alive():
+            self.flush(timeout)
+            self._stopping.set()
+            self._wakeup.set()
+            self._thread.join(timeout)
+
+    def _run(self):
+        backoff = 0.0
+        # After a failure nothing is sent before this time, however often
+        # submit() or flush() wake the thread
+        next_attempt = 0.0
+        while not self._stopping.is_set():
+            wait = next_attempt - time.monotonic() if backoff else self.flush_interval
+            self._wakeup.wait(max(wait, 0.0))
+            self._wakeup.clear()
+            if time.monotonic() < next_attempt:
+                continue
+            with self._pending_lock:
+                batch = self._pending[:self.batch_size]
+            if not batch:
+                continue
+            try:
+                self.append_rows([row for _, row in batch])
+            except Exception as e:
+                self.failures += 1
+                self.last_error = repr(e)
+                backoff = min(self.max_backoff, max(1.0, backoff * 2))
+                next_attempt = time.monotonic() + backoff
+                print(f"Error saving {len(batch)} responses, retrying in {backoff:.0f}s: {e}")
+                continue
+            backoff = 0.0
+            self.journal.commit(batch[-1][0])
+            with self._pending_lock:
+                # Count before removing, so readers that no longer see a row
+                # as pending always see the delivery
+                self.delivered += len(batch)
+                del self._pending[:len(batch)]
+                more = bool(self._pending)
+            if more:
+                self._wakeup.set()
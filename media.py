@@ -0,0 +1,373 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+
+# Dataset folders scanned for quiz media, keyed by (section, label)
+MEDIA_DIRS = {
+    ('images', 'real'): ('data/celeb-df/real/images', '*.jpg'),
+    ('images', 'fake'): ('data/celeb-df/fake/images', '*.jpg'),
+    ('no_audio', 'real'): ('data/celeb-df/real/videos', '*.mp4'),
+    ('no_audio', 'fake'): ('data/celeb-df/fake/videos', '*.mp4'),
+    ('with_audio', 'real'): ('data/audio_dataset/real', '*.mp4'),
+    ('with_audio', 'fake'): ('data/audio_dataset/fake', '*.mp4'),
+}
+
+# Number of real/fake pairs shown per section of the test
+PAIRS_PER_SECTION = {'images': 20, 'no_audio': 8, 'with_audio': 8}
+
+MANIFEST_PATH = Path('data/cache/media_manifest.json')
+MANIFEST_VERSION = 2
+
+# Display-sized image derivatives, keyed by content hash and width. Only
+# sources wider than the display width get one (the dataset's 256px images
+# are served as they are). They are JPEG because st.image passes JPEG and
+# PNG through unchanged but re-encodes anything else on every render.
+DERIVATIVE_DIR = Path('data/cache/images')
+DISPLAY_WIDTH = 256
+JPEG_QUALITY = 85
+
+# Low-bitrate, faststart video renditions plus a poster frame per clip
+RENDITION_DIR = Path('data/cache/videos')
+RENDITION_MAX_WIDTH = 640
+RENDITION_CRF = 30
+RENDITION_MAXRATE = '600k'
+POSTER_OFFSET = 0.5
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dataset_fingerprint():
+    """
+    Cheap fingerprint of the media folders.
+    Adding, removing or renaming a file changes the directory mtime,
+    so comparing these values is enough to detect a stale manifest.
+    """
+    fingerprint = {}
+    for directory, _ in MEDIA_DIRS.values():
+        try:
+            fingerprint[directory] = os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            fingerprint[directory] = None
+    return fingerprint
+
+
+def image_width(path):
+    """Pixel width of an image, read from its header."""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        return img.width
+
+
+def build_media_manifest(previous=None):
+    """
+    Scan the dataset and build the media manifest.
+
+    Checksums from a previous manifest are reused for files whose size
+    and mtime did not change, so a rebuild only hashes new files.
+    """
+    known = {}
+    if previous:
+        known = {entry['path']: entry for entry in previous['files'].values()}
+
+    files = {}
+    listing = {}
+    for (section, label), (directory, pattern) in MEDIA_DIRS.items():
+        paths = []
+        for path in sorted(Path(directory).glob(pattern)):
+            stat = path.stat()
+            old = known.get(str(path))
+            unchanged = old and old['size'] == stat.st_size and old['mtime_ns'] == stat.st_mtime_ns
+            checksum = old['sha256'] if unchanged else file_checksum(path)
+            files[str(path)] = {
+                'path': str(path),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': checksum,
+            }
+            if section == 'images':
+                # Decides whether the image needs a display-sized derivative
+                files[str(path)]['width'] = (old.get('width') if unchanged else None) or image_width(path)
+            paths.append(str(path))
+        listing.setdefault(section, {})[label] = paths
+
+    # Pair the sorted real and fake lists the same way the test always has
+    pairs = {
+        section: [list(pair) for pair in zip(
+            listing[section]['real'][:count],
+            listing[section]['fake'][:count]
+        )]
+        for section, count in PAIRS_PER_SECTION.items()
+    }
+
+    # Files sharing a checksum are byte-for-byte copies of each other
+    by_checksum = {}
+    for entry in files.values():
+        by_checksum.setdefault(entry['sha256'], []).append(entry['path'])
+    duplicates = [paths for paths in by_checksum.values() if len(paths) > 1]
+
+    return {
+        'version': MANIFEST_VERSION,
+        'fingerprint': dataset_fingerprint(),
+        'files': files,
+        'listing': listing,
+        'pairs': pairs,
+        'duplicates': duplicates,
+    }
+
+
+def write_media_manifest(manifest, path=MANIFEST_PATH):
+    """Atomically write the manifest to disk."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = temp_path(path)
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def read_media_manifest(path=MANIFEST_PATH):
+    """Read the manifest from disk, or return None if missing or unreadable."""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def load_media_manifest(path=MANIFEST_PATH):
+    """Return an up-to-date manifest, rebuilding it only when the dataset changed."""
+    manifest = read_media_manifest(path)
+    if manifest is not None and manifest['fingerprint'] == dataset_fingerprint():
+        return manifest
+    manifest = build_media_manifest(previous=manifest)
+    write_media_manifest(manifest, path)
+    return manifest
+
+
+def temp_path(target):
+    """Per-thread scratch file next to target, so concurrent sessions never clash."""
+    return target.with_name(f"{target.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+
+
+def image_derivative(manifest, path, width=DISPLAY_WIDTH):
+    """
+    Return the path of the file to serve for an image: the source itself if
+    it is no wider than width, otherwise a JPEG copy scaled down to width,
+    created on first use.
+
+    Derivatives are named after the source checksum, so they are shared by
+    identical files and never go stale when an image is replaced.
+    """
+    entry = manifest['files'][str(path)]
+    if entry['width'] <= width:
+        return Path(path)
+    target = DERIVATIVE_DIR / f"{entry['sha256'][:16]}-{width}.jpg"
+    if target.exists():
+        return target
+
+    from PIL import Image
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with Image.open(path) as img:
+        img = img.convert('RGB')
+        height = round(img.height * width / img.width)
+        img = img.resize((width, height), Image.LANCZOS)
+        tmp_path = temp_path(target)
+        img.save(tmp_path, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    os.replace(tmp_path, target)
+    return target
+
+
+def build_image_derivatives(manifest, width=DISPLAY_WIDTH):
+    """
+    Create the derivatives of every image used by the test so the first
+    visitor does not pay for them. Returns the derivatives, not counting
+    images served as they are.
+    """
+    created = []
+    for pair in manifest['pairs']['images']:
+        for path in pair:
+            served = image_derivative(manifest, path, width)
+            if served != Path(path):
+                created.append(served)
+    return created
+
+
+def find_ffmpeg():
+    """Locate an ffmpeg binary: the one bundled with imageio-ffmpeg, else the one on PATH."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return shutil.which('ffmpeg')
+
+
+def _rendition_paths(manifest, path):
+    stem = manifest['files'][str(path)]['sha256'][:16]
+    return (
+        RENDITION_DIR / f"{stem}.mp4",
+        RENDITION_DIR / f"{stem}.jpg",
+        RENDITION_DIR / f"{stem}.json",
+    )
+
+
+def build_video_rendition(manifest, path, ffmpeg=None):
+    """
+    Transcode one clip into a small faststart MP4, grab a poster frame and record its duration.
+
+    Outputs are named after the source checksum, so duplicate clips share
+    one rendition. Raises RuntimeError if ffmpeg is missing or fails.
+    """
+    ffmpeg = ffmpeg or find_ffmpeg()
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg not found; install imageio-ffmpeg or add ffmpeg to PATH")
+    video_path, poster_path, meta_path = _rendition_paths(manifest, path)
+    if meta_path.exists():
+        return read_video_rendition(manifest, path)
+
+    RENDITION_DIR.mkdir(parents=True, exist_ok=True)
+    scale = f"scale='min({RENDITION_MAX_WIDTH},iw)':-2"
+
+    # moov atom up front lets the browser start playback before the whole file arrives
+    tmp_video = temp_path(video_path)
+    result = subprocess.run([
+        ffmpeg, '-y', '-loglevel', 'info', '-i', str(path),
+        '-vf', scale, '-c:v', 'libx264', '-preset', 'veryfast',
+        '-crf', str(RENDITION_CRF), '-maxrate', RENDITION_MAXRATE, '-bufsize', '1200k',
+        '-pix_fmt', 'yuv420p', '-c:a', 'aac', '-b:a', '64k',
+        '-movflags', '+faststart', '-f', 'mp4', str(tmp_video)
+    ], capture_output=True, text=True)
+    if result.returncode != 0:
+        tmp_video.unlink(missing_ok=True)
+        raise RuntimeError(f"ffmpeg failed for {path}: {result.stderr[-500:]}")
+
+    # ffmpeg reports the input duration on stderr as HH:MM:SS.ss
+    duration = None
+    match = re.search(r'Duration: (\d+):(\d+):(\d+\.\d+)', result.stderr)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    tmp_poster = temp_path(poster_path)
+    offset = min(POSTER_OFFSET, duration / 2) if duration else 0
+    result = subprocess.run([
+        ffmpeg, '-y', '-loglevel', 'error', '-ss', str(offset), '-i', str(path),
+        '-frames:v', '1', '-vf', scale, '-q:v', '4', '-f', 'image2', str(tmp_poster)
+    ], capture_output=True, text=True)
+    if result.returncode != 0:
+        tmp_video.unlink(missing_ok=True)
+        tmp_poster.unlink(missing_ok=True)
+        raise RuntimeError(f"ffmpeg poster failed for {path}: {result.stderr[-500:]}")
+
+    os.replace(tmp_video, video_path)
+    os.replace(tmp_poster, poster_path)
+    meta = {
+        'source': str(path),
+        'duration': duration,
+        'source_size': manifest['files'][str(path)]['size'],
+        'size': video_path.stat().st_size,
+    }
+    tmp_meta = temp_path(meta_path)
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f)
+    # The metadata file is written last and marks the rendition as complete
+    os.replace(tmp_meta, meta_path)
+    return read_video_rendition(manifest, path)
+
+
+def read_video_rendition(manifest, path):
+    """
+    Return the cached rendition of a clip as a dict with 'video', 'poster' and 'duration'.
+
+    Transcoding is too slow to do during a page render, so when no rendition
+    has been built yet the original file is returned without a poster.
+    """
+    video_path, poster_path, meta_path = _rendition_paths(manifest, path)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'video': Path(path), 'poster': None, 'duration': None}
+    return {'video': video_path, 'poster': poster_path, 'duration': meta['duration']}
+
+
+def build_video_renditions(manifest):
+    """Build renditions for every clip used by the test."""
+    ffmpeg = find_ffmpeg()
+    built = []
+    for section in ('no_audio', 'with_audio'):
+        for pair in manifest['pairs'][section]:
+            for path in pair:
+                built.append(build_video_rendition(manifest, path, ffmpeg=ffmpeg))
+    return built
+
+
+def prefetch_pairs(manifest, section, pairs):
+    """
+    Prepare the media of upcoming pairs as they will be served: build
+    missing image derivatives and read the images and video posters once so
+    they are in the OS page cache. Whole video files are not read ahead;
+    they are many times the size of everything else on a page.
+    """
+    for real, fake in pairs:
+        for path in (real, fake):
+            if section == 'images':
+                item = image_derivative(manifest, path)
+            else:
+                item = read_video_rendition(manifest, path)['poster']
+            if item is not None:
+                Path(item).read_bytes()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prepare quiz media ahead of deployment.")
+    parser.add_argument('--force', action='store_true', help="re-hash every file")
+    parser.add_argument('--derivatives', action='store_true', help="also build resized images")
+    parser.add_argument('--renditions', action='store_true', help="also build video renditions and posters")
+    parser.add_argument('--pack', action='store_true',
+                        help="pack the served media into one memory-mapped archive")
+    args = parser.parse_args()
+
+    # Build (or refresh) the manifest
+    previous = None if args.force else read_media_manifest()
+    manifest = build_media_manifest(previous=previous)
+    write_media_manifest(manifest)
+    print(f"Wrote {MANIFEST_PATH} with {len(manifest['files'])} files.")
+    for section, pairs in manifest['pairs'].items():
+        print(f"  {section}: {len(pairs)} pairs")
+    for paths in manifest['duplicates']:
+        print(f"  duplicate content: {', '.join(paths)}")
+
+    if args.derivatives:
+        created = build_image_derivatives(manifest)
+        size = sum(path.stat().st_size for path in created)
+        print(f"Image derivatives: {len(created)} files, {size / 1024:.0f} KiB in {DERIVATIVE_DIR}")
+
+    if args.renditions:
+        built = build_video_renditions(manifest)
+        size = sum(item['video'].stat().st_size for item in built)
+        print(f"Video renditions: {len(built)} clips, {size / 1024 / 1024:.1f} MiB in {RENDITION_DIR}")
+
+    if args.pack:
+        from media_archive import ARCHIVE_PATH, MediaArchive, write_media_archive
+        entries, size = write_media_archive(manifest)
+        corrupt = MediaArchive().verify()
+        print(f"Media archive: {entries} entries, {size / 1024 / 1024:.1f} MiB in {ARCHIVE_PATH}"
+              + (f"; {len(corrupt)} entries fail their hash check" if corrupt else ""))
@@ -0,0 +1,187 @@
+"""
+Packed archive of the media the test serves.
+
+One file holds every display image, video rendition and poster of the
+selected pairs, each starting on a page boundary:
+
+    header   magic, format version, entry count, offset of the table, size of the metadata
+    blobs    the asset bytes
+    table    one (offset, length, sha256) record per entry
+    metadata JSON: entry keys in table order, the pairs, clip durations and
+             the dataset fingerprint the archive was built from
+
+The reader maps the file once and hands out memoryview slices of it, so
+looking up an asset costs no open or read and every session shares the same
+page-cache pages. st.image and st.video only take bytes, so the app still
+copies the slice of each asset it renders.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from media import temp_path, dataset_fingerprint, image_derivative, read_video_rendition
+
+ARCHIVE_PATH = Path(os.environ.get('DDHA_MEDIA_ARCHIVE', 'data/cache/media.pack'))
+ARCHIVE_MAGIC = b'DDHAPACK'
+ARCHIVE_VERSION = 1
+_HEADER = struct.Struct('<8sIIQQ')
+_TABLE_DTYPE = np.dtype([('offset', '<u8'), ('length', '<u8'), ('sha256', 'u1', (32,))])
+# Blobs start on page boundaries, so no page holds the tail of one asset and the head of the next
+_ALIGNMENT = mmap.PAGESIZE
+VIDEO_SECTIONS = ('no_audio', 'with_audio')
+
+
+def _key(kind, path):
+    return f'{kind}:{path}'
+
+
+def _assets(manifest):
+    """(key, file) of every asset the test serves, as render_pair picks them."""
+    assets = []
+    durations = {}
+    for section, pairs in manifest['pairs'].items():
+        for pair in pairs:
+            for path in pair:
+                if section not in VIDEO_SECTIONS:
+                    assets.append((_key('image', path), image_derivative(manifest, path)))
+                    continue
+                rendition = read_video_rendition(manifest, path)
+                assets.append((_key('video', path), rendition['video']))
+                if rendition['poster'] is not None:
+                    assets.append((_key('poster', path), rendition['poster']))
+                durations[path] = rendition['duration']
+    return assets, durations
+
+
+def write_media_archive(manifest, path=ARCHIVE_PATH):
+    """
+    Pack the served media of manifest's pairs into one archive, atomically.
+    Builds missing image derivatives; clips without a rendition are packed as
+    their original file. Returns the number of entries and the archive size.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    assets, durations = _assets(manifest)
+    table = np.zeros(len(assets), dtype=_TABLE_DTYPE)
+    tmp_path = temp_path(path)
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * _HEADER.size)
+        for k, (_, source) in enumerate(assets):
+            f.write(b'\0' * (-f.tell() % _ALIGNMENT))
+            offset = f.tell()
+            digest = hashlib.sha256()
+            with open(source, 'rb') as src:
+                for chunk in iter(lambda: src.read(1 << 20), b''):
+                    digest.update(chunk)
+                    f.write(chunk)
+            table[k] = (offset, f.tell() - offset, np.frombuffer(digest.digest(), dtype=np.uint8))
+        table_offset = f.tell()
+        f.write(table.tobytes())
+        metadata = json.dumps({
+            'keys': [key for key, _ in assets],
+            'pairs': manifest['pairs'],
+            'durations': durations,
+            'fingerprint': manifest['fingerprint'],
+        }).encode('utf-8')
+        f.write(metadata)
+        f.seek(0)
+        f.write(_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, len(assets), table_offset, len(metadata)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(assets), path.stat().st_size
+
+
+class MediaArchive:
+    """Read-only, memory-mapped view of a packed media archive; safe to share between threads."""
+
+    def __init__(self, path=ARCHIVE_PATH):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, version, count, table_offset, metadata_length = _HEADER.unpack_from(self._mmap)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError(f"{self.path} is not a version {ARCHIVE_VERSION} media archive")
+        self.table = np.frombuffer(self._mmap, dtype=_TABLE_DTYPE, count=count, offset=table_offset)
+        metadata_offset = table_offset + self.table.nbytes
+        metadata = json.loads(bytes(self._view[metadata_offset:metadata_offset + metadata_length]))
+        self.index = {key: k for k, key in enumerate(metadata['keys'])}
+        self.pairs = metadata['pairs']
+        self.durations = metadata['durations']
+        self.fingerprint = metadata['fingerprint']
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def get(self, key):
+        """Bytes of one entry as a memoryview into the mapping, or None if absent."""
+        k = self.index.get(key)
+        if k is None:
+            return None
+        offset, length = int(self.table['offset'][k]), int(self.table['length'][k])
+        return self._view[offset:offset + length]
+
+    def image(self, path):
+        return self.get(_key('image', path))
+
+    def video(self, path):
+        """The clip as a dict with 'video', 'poster' and 'duration', like read_video_rendition."""
+        return {
+            'video': self.get(_key('video', path)),
+            'poster': self.get(_key('poster', path)),
+            'duration': self.durations.get(path),
+        }
+
+    def prefetch(self, paths):
+        """Ask the kernel to read the entries of paths ahead of their first use."""
+        if not hasattr(self._mmap, 'madvise'):
+            return
+        for path in paths:
+            for kind in ('image', 'video', 'poster'):
+                k = self.index.get(_key(kind, path))
+                if k is None or not self.table['length'][k]:
+                    continue
+                offset = int(self.table['offset'][k])
+                # madvise ranges must start on a page boundary, as every blob does
+                self._mmap.madvise(mmap.MADV_WILLNEED, offset, int(self.table['length'][k]))
+
+    def verify(self):
+        """Keys whose bytes no longer match their recorded hash."""
+        return [
+            key for key, k in self.index.items()
+            if hashlib.sha256(self.get(key)).digest() != self.table['sha256'][k].tobytes()
+        ]
+
+    def is_current(self):
+        """
+        Whether the archive can stand in for the dataset folders: they are
+        absent (a deployment that ships only the archive) or unchanged since
+        the archive was built.
+        """
+        fingerprint = dataset_fingerprint()
+        if all(value is None for value in fingerprint.values()):
+            return True
+        return fingerprint == self.fingerprint
+
+
+def archive_stamp(path=ARCHIVE_PATH):
+    """(mtime in ns, size) of the archive file, or None if there is none; changes when it is rebuilt."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def open_media_archive(path=ARCHIVE_PATH):
+    """Open the archive, or return None if there is none or it is unreadable."""
+    try:
+        return MediaArchive(path)
+    except (FileNotFoundError, ValueError, struct.error):
+        return None
@@ -0,0 +1,134 @@
+import os
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from matplotlib.figure import Figure
+
+from analysis import perform_bayesian_analysis, perform_group_analysis
+from profiling import profiled
+
+# Above this many participants, scatter and box plots are drawn from
+# server-side aggregates, so the figure size no longer grows with the data
+AGGREGATE_ABOVE = int(os.environ.get('DDHA_PLOT_AGGREGATE_ABOVE', 2000))
+# Bins per axis of the aggregated scatter heatmaps
+HEATMAP_BINS = 40
+
+
+def ols_line(x, y):
+    """
+    Least-squares slope and intercept of y on x, the fit px's "ols"
+    trendline draws, in one vectorized pass. Rows with NaN are dropped.
+    Returns None when there is no line to fit.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[keep], y[keep]
+    if len(x) < 2:
+        return None
+    x_mean, y_mean = x.mean(), y.mean()
+    sxx = np.square(x - x_mean).sum()
+    if sxx == 0:
+        return None
+    slope = ((x - x_mean) * (y - y_mean)).sum() / sxx
+    return slope, y_mean - slope * x_mean
+
+
+def scatter_figure(all_responses, x, y, title, aggregate_above=AGGREGATE_ABOVE):
+    """
+    Scatter of y against x with its OLS line: WebGL markers for small
+    datasets, a 2D histogram heatmap of participant counts above aggregate_above.
+    """
+    xs = all_responses[x].astype(float).to_numpy()
+    ys = all_responses[y].astype(float).to_numpy()
+    fig = go.Figure()
+    if len(all_responses) > aggregate_above:
+        keep = ~(np.isnan(xs) | np.isnan(ys))
+        counts, x_edges, y_edges = np.histogram2d(xs[keep], ys[keep], bins=HEATMAP_BINS)
+        fig.add_trace(go.Heatmap(
+            x=(x_edges[:-1] + x_edges[1:]) / 2,
+            y=(y_edges[:-1] + y_edges[1:]) / 2,
+            # Empty bins are left blank rather than drawn as zero
+            z=np.where(counts.T > 0, counts.T, np.nan),
+            colorscale='Blues',
+            colorbar={'title': 'participants'},
+            hovertemplate=f'{x}: %{{x:.2f}}<br>{y}: %{{y:.2f}}<br>participants: %{{z}}<extra></extra>',
+            name='participants'
+        ))
+    else:
+        fig.add_trace(go.Scattergl(x=xs, y=ys, mode='markers', name='participants'))
+
+    line = ols_line(xs, ys)
+    if line is not None:
+        slope, intercept = line
+        ends = np.array([np.nanmin(xs), np.nanmax(xs)])
+        fig.add_trace(go.Scatter(
+            x=ends, y=intercept + slope * ends, mode='lines',
+            name=f'OLS: {y} = {slope:.4f} * {x} + {intercept:.4f}'
+        ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+
+def box_figure(all_responses, x, y, title, aggregate_above=AGGREGATE_ABOVE):
+    """Box plot of y per group of x; above aggregate_above it is built from precomputed quantiles."""
+    if len(all_responses) <= aggregate_above:
+        return px.box(all_responses, x=x, y=y, title=title)
+
+    frame = all_responses[[x, y]].dropna().astype({y: float})
+    groups = frame.groupby(x)[y]
+    quantiles = groups.quantile([0.25, 0.5, 0.75]).unstack()
+    q1, median, q3 = quantiles[0.25], quantiles[0.5], quantiles[0.75]
+    iqr = q3 - q1
+    # Whiskers reach the furthest points within 1.5 IQR, as px.box draws them
+    bounds = frame[x].map(q1 - 1.5 * iqr), frame[x].map(q3 + 1.5 * iqr)
+    inside = frame[(frame[y] >= bounds[0]) & (frame[y] <= bounds[1])].groupby(x)[y]
+    fig = go.Figure(go.Box(
+        x=list(quantiles.index), q1=q1, median=median, q3=q3,
+        lowerfence=inside.min().reindex(quantiles.index), upperfence=inside.max().reindex(quantiles.index),
+        mean=groups.mean(), name=y, boxpoints=False
+    ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+
+def category_accuracy_figure(all_responses):
+    """Bar chart of mean accuracy for images, with audio and without audio."""
+    withaudio = all_responses['withAudio'].astype(float).mean()
+    withoutaudio = all_responses['withoutAudio'].astype(float).mean()
+    images = all_responses['images'].astype(float).mean()
+    # A bare Figure (no pyplot) can be built off the main thread
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    categories = ['Images', 'WithAudio', 'WithoutAudio']
+    accuracy = [images, withaudio, withoutaudio]
+
+    ax.bar(categories, accuracy, color=['skyblue', 'lightgreen', 'lightcoral'], width=0.5, alpha=0.8)
+    ax.set_xlabel('Categories')
+    ax.set_ylabel('Accuracy')
+    ax.set_title('Accuracy for Images, With Audio, and Without Audio')
+    return fig
+
+
+@profiled()
+def build_results(all_responses, aggregate_above=AGGREGATE_ABOVE):
+    """Run the analysis and build every figure shown on the results page."""
+    return {
+        'analysis': perform_bayesian_analysis(all_responses),
+        # Effects per score category and per gender, fitted together
+        'group_analysis': perform_group_analysis(all_responses),
+        # Age vs Detection Accuracy
+        'fig_age': scatter_figure(all_responses, 'age', 'accuracy',
+                                  'Age vs Detection Accuracy', aggregate_above),
+        # Social Media Hours vs Detection Accuracy
+        'fig_social': scatter_figure(all_responses, 'social_media_hours', 'accuracy',
+                                     'Social Media Usage vs Detection Accuracy', aggregate_above),
+        # Familiarity vs Detection Accuracy
+        'fig_fam': scatter_figure(all_responses, 'fam_score', 'accuracy',
+                                  'Familiarity vs Detection Accuracy', aggregate_above),
+        'fig_categories': category_accuracy_figure(all_responses),
+        # Gender comparison
+        'fig_gender': box_figure(all_responses, 'gender', 'accuracy',
+                                 'Detection Accuracy by Gender', aggregate_above),
+    }
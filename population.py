@@ -0,0 +1,53 @@
+import numpy as np
+
+# Scores whose population distribution is tracked
+SCORE_METRICS = ['accuracy', 'images', 'withAudio', 'withoutAudio']
+# Bins over [0, 1]; finer than any score step (1/36), so distinct scores never share a bin
+HISTOGRAM_BINS = 1000
+
+
+def _bin_index(values):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    # The small offset keeps k/n scores that land on a bin edge in the same bin
+    return np.clip(np.floor(values * HISTOGRAM_BINS + 1e-9), 0, HISTOGRAM_BINS - 1).astype(np.int64)
+
+
+class ScoreHistogram:
+    """
+    Fixed-bin histograms of the population's scores.
+
+    add() folds in new participants without touching earlier ones, and
+    percentile() reads a cumulative count over the bins, so its cost does
+    not depend on how many participants there are.
+    """
+
+    def __init__(self, metrics=SCORE_METRICS, bins=HISTOGRAM_BINS):
+        self.metrics = list(metrics)
+        self.counts = {metric: np.zeros(bins, dtype=np.int64) for metric in self.metrics}
+
+    def add(self, frame):
+        """Add the scores of every row of a DataFrame."""
+        for metric in self.metrics:
+            if metric in frame.columns:
+                self.counts[metric] += np.bincount(
+                    _bin_index(frame[metric]), minlength=HISTOGRAM_BINS
+                )
+
+    def total(self, metric):
+        return int(self.counts[metric].sum())
+
+    def percentile(self, metric, value, extra=None):
+        """
+        Share of participants (0-100) scoring below value, counting ties as half.
+        extra holds scores not yet added, such as submissions still in the journal.
+        """
+        counts = self.counts[metric]
+        if extra is not None and len(extra):
+            counts = counts + np.bincount(_bin_index(extra), minlength=HISTOGRAM_BINS)
+        total = counts.sum()
+        if total == 0 or value is None or np.isnan(value):
+            return None
+        index = _bin_index([value])[0]
+        below = counts[:index].sum()
+        return float(100.0 * (below + 0.5 * counts[index]) / total)
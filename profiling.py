@@ -0,0 +1,208 @@
+"""
+Opt-in timing of the app's hot paths.
+
+Set DDHA_PROFILE=1 to record wall time, CPU time and RSS change for every
+instrumented stage. Each rerun is appended as one JSON line to
+DDHA_PROFILE_LOG (default data/cache/profile.jsonl) and running totals
+are exported in Prometheus text format to DDHA_PROFILE_PROM (default
+data/cache/profile.prom). DDHA_PROFILE_PANEL=1 also shows a debug panel
+in the sidebar. When disabled, stage() and profiled() cost nothing.
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import psutil
+    _process = psutil.Process()
+except ImportError:
+    _process = None
+
+ENABLED = os.environ.get('DDHA_PROFILE', '') not in ('', '0')
+PANEL = ENABLED and os.environ.get('DDHA_PROFILE_PANEL', '') not in ('', '0')
+LOG_PATH = Path(os.environ.get('DDHA_PROFILE_LOG', 'data/cache/profile.jsonl'))
+PROM_PATH = Path(os.environ.get('DDHA_PROFILE_PROM', 'data/cache/profile.prom'))
+# Minimum seconds between rewrites of the Prometheus file
+PROM_INTERVAL = 5.0
+# Sessions without a rerun for this long are dropped from the per-session totals
+SESSION_IDLE_SECONDS = 30 * 60
+
+_local = threading.local()
+_lock = threading.Lock()
+# stage -> {'count', 'wall_seconds', 'cpu_seconds', 'rss_delta_bytes'}
+_totals = {}
+# session id -> {'reruns', 'stages': {stage -> totals}, 'last_rerun', 'last_seen'}
+_sessions = {}
+# Serializes rewrites of the Prometheus file
+_prom_lock = threading.Lock()
+_last_prom_write = 0.0
+
+
+def _rss():
+    return _process.memory_info().rss if _process is not None else 0
+
+
+def _add(totals, name, wall, cpu, rss):
+    entry = totals.setdefault(name, {'count': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rss_delta_bytes': 0})
+    entry['count'] += 1
+    entry['wall_seconds'] += wall
+    entry['cpu_seconds'] += cpu
+    entry['rss_delta_bytes'] += rss
+
+
+@contextmanager
+def stage(name):
+    """Record one stage. Nested stages are named parent/child."""
+    if not ENABLED:
+        yield
+        return
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(name)
+    full_name = '/'.join(stack)
+    wall_start, cpu_start, rss_start = time.perf_counter(), time.thread_time(), _rss()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.thread_time() - cpu_start
+        rss = _rss() - rss_start
+        stack.pop()
+        with _lock:
+            _add(_totals, full_name, wall, cpu, rss)
+        rerun = getattr(_local, 'rerun', None)
+        if rerun is not None:
+            rerun['stages'].append({
+                'stage': full_name, 'wall_seconds': wall, 'cpu_seconds': cpu, 'rss_delta_bytes': rss
+            })
+
+
+def profiled(name=None):
+    """Decorator form of stage(); a no-op when profiling is disabled."""
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+        stage_name = name or f'{fn.__module__}.{fn.__name__}'
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def rerun(session_id, page=None):
+    """Wrap one script run; its stages are logged together and added to the session totals."""
+    if not ENABLED:
+        yield
+        return
+    _local.rerun = {'session': session_id, 'page': page, 'timestamp': time.time(), 'stages': []}
+    try:
+        with stage('rerun'):
+            yield
+    finally:
+        record = _local.rerun
+        _local.rerun = None
+        now = time.monotonic()
+        with _lock:
+            session = _sessions.setdefault(session_id, {'reruns': 0, 'stages': {}})
+            session['reruns'] += 1
+            for entry in record['stages']:
+                _add(session['stages'], entry['stage'], entry['wall_seconds'],
+                     entry['cpu_seconds'], entry['rss_delta_bytes'])
+            session['last_rerun'] = record
+            session['last_seen'] = now
+            for idle in [key for key, value in _sessions.items()
+                         if now - value['last_seen'] > SESSION_IDLE_SECONDS]:
+                del _sessions[idle]
+        _write_log(record)
+        _write_prometheus()
+
+
+def _write_log(record):
+    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with _lock, open(LOG_PATH, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def prometheus_text():
+    """Running totals in Prometheus text exposition format."""
+    lines = []
+    metrics = [
+        ('ddha_stage_calls_total', 'count', 'Number of times a stage ran'),
+        ('ddha_stage_wall_seconds_total', 'wall_seconds', 'Wall time spent in a stage'),
+        ('ddha_stage_cpu_seconds_total', 'cpu_seconds', 'Thread CPU time spent in a stage'),
+        ('ddha_stage_rss_delta_bytes_total', 'rss_delta_bytes', 'Process RSS change across a stage'),
+    ]
+    with _lock:
+        totals = {name: dict(entry) for name, entry in _totals.items()}
+        sessions = len(_sessions)
+    for metric, key, help_text in metrics:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        for name, entry in sorted(totals.items()):
+            lines.append(f'{metric}{{stage="{name}"}} {entry[key]}')
+    lines.append(f'# HELP ddha_sessions Sessions with a rerun in the last {SESSION_IDLE_SECONDS} seconds')
+    lines.append('# TYPE ddha_sessions gauge')
+    lines.append(f'ddha_sessions {sessions}')
+    return '\n'.join(lines) + '\n'
+
+
+def _write_prometheus(force=False):
+    global _last_prom_write
+    with _prom_lock:
+        now = time.monotonic()
+        if not force and now - _last_prom_write < PROM_INTERVAL:
+            return
+        _last_prom_write = now
+        PROM_PATH.parent.mkdir(parents=True, exist_ok=True)
+        # Unique per process and thread, in case another process exports to the same file
+        tmp_path = PROM_PATH.with_name(f'{PROM_PATH.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp_path.write_text(prometheus_text())
+        os.replace(tmp_path, PROM_PATH)
+
+
+if ENABLED:
+    # Export the final totals when the server shuts down
+    atexit.register(_write_prometheus, force=True)
+
+
+def session_summary(session_id):
+    with _lock:
+        session = _sessions.get(session_id)
+        return json.loads(json.dumps(session)) if session else None
+
+
+def render_debug_panel(session_id):
+    """Show the last rerun and the session totals in the sidebar."""
+    if not PANEL:
+        return
+    import streamlit as st
+    summary = session_summary(session_id)
+    with st.sidebar.expander("⏱️ Profiling", expanded=False):
+        if summary is None:
+            st.write("No reruns recorded yet.")
+            return
+        st.write(f"Reruns this session: {summary['reruns']}")
+        st.markdown("**Last rerun**")
+        st.table([
+            {'stage': entry['stage'], 'wall ms': round(entry['wall_seconds'] * 1000, 1),
+             'cpu ms': round(entry['cpu_seconds'] * 1000, 1),
+             'rss KiB': entry['rss_delta_bytes'] // 1024}
+            for entry in summary['last_rerun']['stages']
+        ])
+        st.markdown("**Session totals**")
+        st.table([
+            {'stage': name, 'calls': entry['count'],
+             'wall ms': round(entry['wall_seconds'] * 1000, 1),
+             'cpu ms': round(entry['cpu_seconds'] * 1000, 1)}
+            for name, entry in sorted(summary['stages'].items())
+        ])
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from population import ScoreHistogram
+from scoring import parse_familiarity_cells, parse_response_cells
+
+CACHE_DIR = Path('data/cache/responses')
+# Seconds between checks of the sheet for new rows
+SYNC_INTERVAL = 5.0
+# Merge part files once there are this many
+COMPACT_PARTS = 64
+
+# Columns of a response row, in the order save_user_response writes them
+SHEET_COLUMNS = [
+    'name', 'age', 'gender', 'social_media_hours', 'responses', 'familiarity',
+    'accuracy', 'fam_score', 'withAudio', 'withoutAudio', 'images', 'participant_id', 'submitted_at'
+]
+
+NUMERIC_COLUMNS = [
+    'age', 'social_media_hours', 'accuracy', 'fam_score',
+    'withAudio', 'withoutAudio', 'images'
+]
+# List columns and their cell decoders (packed or legacy JSON, see scoring)
+LIST_COLUMNS = {'responses': parse_response_cells, 'familiarity': parse_familiarity_cells}
+
+
+def column_letter(index):
+    """1-based column index to A1 letters (1 -> A, 27 -> AA)."""
+    letters = ''
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def chain_digest(digest, rows):
+    """Extend a rolling SHA-256 digest with rows, so appending rows never rehashes old ones."""
+    for row in rows:
+        digest = hashlib.sha256((digest + json.dumps(row)).encode('utf-8')).hexdigest()
+    return digest
+
+
+def normalize_headers(headers):
+    """
+    Complete a header row written before newer columns were added, e.g. a
+    sheet whose header stops at 'images' now that rows carry participant_id.
+    """
+    headers = list(headers)
+    if headers == SHEET_COLUMNS[:len(headers)]:
+        return headers + SHEET_COLUMNS[len(headers):]
+    return headers
+
+
+def parse_rows(rows, headers):
+    """Turn raw sheet rows (lists of strings) into a typed DataFrame."""
+    import pandas as pd
+    width = len(headers)
+    rows = [list(row[:width]) + [''] * (width - len(row)) for row in rows]
+    df = pd.DataFrame(rows, columns=headers)
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+    for column, parse_cells in LIST_COLUMNS.items():
+        if column in df.columns:
+            df[column] = parse_cells(df[column])
+    return df
+
+
+class ResponseCache:
+    """
+    Local, incrementally synced copy of the response sheet.
+
+    Only rows after the last synced one are fetched. Parsed rows are kept
+    in memory and persisted as Parquet part files, so a restart reads the
+    local copy instead of downloading and re-parsing the whole sheet.
+    """
+
+    def __init__(self, directory=CACHE_DIR, sync_interval=SYNC_INTERVAL):
+        self.directory = Path(directory)
+        self.meta_path = self.directory / 'meta.json'
+        # Bumped by maintenance commands that rewrite rows in place, see bump_generation
+        self.generation_path = self.directory / 'generation'
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._loaded = False
+        # Generation the cached rows were downloaded in
+        self._generation = None
+        self._last_sync = 0.0
+        self.headers = None
+        # Sheet row number of the last synced row (row 1 is the header)
+        self.last_row = 1
+        # Rolling hash over every synced row, in order
+        self.digest = ''
+        self.frame = None
+        # participant_id -> row position in frame
+        self.positions = {}
+        self.histogram = ScoreHistogram()
+
+    def _index(self, new_frame, offset):
+        if 'participant_id' in new_frame.columns:
+            for position, participant_id in enumerate(new_frame['participant_id'], offset):
+                if isinstance(participant_id, str) and participant_id:
+                    self.positions[participant_id] = position
+        self.histogram.add(new_frame)
+
+    def _load(self):
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            meta = None
+        import pandas as pd
+        parts = sorted(self.directory.glob('part-*.parquet'))
+        generation = self.generation()
+        self._generation = generation
+        if meta and parts and meta.get('generation', 0) == generation:
+            frame = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+            # Fewer rows than the metadata records means parts went missing
+            if len(frame) >= meta['last_row'] - 1:
+                self.headers = normalize_headers(meta['headers'])
+                self.last_row = meta['last_row']
+                self.digest = meta.get('digest', '')
+                # Rows written by a sync that crashed before its metadata are re-fetched
+                self.frame = frame.iloc[:self.last_row - 1]
+                self._index(self.frame, 0)
+        if self.frame is None:
+            # Nothing usable: start over from the sheet
+            self._clear_files()
+        self._loaded = True
+
+    def _write_meta(self):
+        tmp_path = self.meta_path.with_name('meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'headers': self.headers, 'last_row': self.last_row, 'digest': self.digest,
+                       'generation': self._generation}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _persist(self, new_frame, first_row):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        parts = sorted(self.directory.glob('part-*.parquet'))
+        if len(parts) + 1 >= COMPACT_PARTS:
+            # Rewrite everything as a single part starting at row 2
+            self.frame.to_parquet(self.directory / 'part-000000002.parquet.tmp', index=False)
+            for part in parts:
+                part.unlink()
+            os.replace(self.directory / 'part-000000002.parquet.tmp',
+                       self.directory / 'part-000000002.parquet')
+        else:
+            new_frame.to_parquet(self.directory / f'part-{first_row:09d}.parquet', index=False)
+        # Metadata is written last; rows beyond last_row are dropped on load
+        self._write_meta()
+
+    def sync(self, get_values, force=False):
+        """
+        Fetch rows added since the last sync and return the cached DataFrame.
+        get_values(range_name) must return the rows of an A1 range, like
+        gspread's Worksheet.get_values.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            generation = self.generation()
+            if generation != self._generation:
+                # Rows were rewritten in place; the local copy is stale
+                self._reset()
+                self._generation = generation
+            if not force and self.frame is not None and \
+                    time.monotonic() - self._last_sync < self.sync_interval:
+                return self.frame
+
+            if self.headers is None:
+                header_rows = get_values('1:1')
+                self.headers = normalize_headers(header_rows[0] if header_rows else [])
+
+            first_row = self.last_row + 1
+            last_column = column_letter(max(len(self.headers), 1))
+            new_rows = get_values(f'A{first_row}:{last_column}')
+            self._last_sync = time.monotonic()
+
+            if new_rows or self.frame is None:
+                new_frame = parse_rows(new_rows, self.headers)
+                self._index(new_frame, 0 if self.frame is None else len(self.frame))
+                if self.frame is None:
+                    self.frame = new_frame
+                else:
+                    import pandas as pd
+                    self.frame = pd.concat([self.frame, new_frame], ignore_index=True)
+                self.last_row += len(new_rows)
+                self.digest = chain_digest(self.digest, new_rows)
+                if new_rows:
+                    self._persist(new_frame, first_row)
+            return self.frame
+
+    def find(self, participant_id):
+        """Return the cached row of a participant as a Series, or None."""
+        with self._lock:
+            position = self.positions.get(participant_id)
+            if position is None:
+                return None
+            return self.frame.iloc[position]
+
+    def version(self):
+        """(row count, rolling content hash) of the synced rows."""
+        with self._lock:
+            return self.last_row - 1, self.digest
+
+    def generation(self):
+        """How many times rows of the sheet were rewritten in place (0 if never)."""
+        try:
+            return int(self.generation_path.read_text() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def bump_generation(self):
+        """
+        Record that rows of the sheet were rewritten in place. Processes using
+        this cache directory drop their copy on their next sync; nothing is
+        deleted here, so a running app keeps its copy until then.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.generation_path.with_name(f'generation.{os.getpid()}.tmp')
+        tmp_path.write_text(str(self.generation() + 1))
+        os.replace(tmp_path, self.generation_path)
+
+    def reset(self):
+        """Forget the local copy; the next sync downloads the sheet again."""
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self._clear_files()
+        self.headers = None
+        self.last_row = 1
+        self.digest = ''
+        self.frame = None
+        self.positions = {}
+        self.histogram = ScoreHistogram()
+        self._last_sync = 0.0
+
+    def _clear_files(self):
+        for part in self.directory.glob('part-*.parquet'):
+            part.unlink()
+        self.meta_path.unlink(missing_ok=True)
@@ -0,0 +1,76 @@
+import threading
+import traceback
+
+
+class VersionedCache:
+    """
+    Process-wide cache of one computed value, keyed by dataset version.
+
+    get() serves the cached value immediately, even if it was computed for
+    an older version, and hands the recomputation to a single background
+    worker (stale-while-revalidate). Only the very first request waits,
+    and concurrent callers share that one computation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._computed = threading.Condition(self._lock)
+        self.value = None
+        self.version = None
+        self.error = None
+        self._running = None
+        self._queued = None
+
+    def get(self, version, compute):
+        """
+        Return (value, fresh) for version, where fresh is False when an
+        older value is served while the new one is being computed.
+        """
+        with self._lock:
+            if self.value is not None and self.version == version:
+                return self.value, True
+            self._schedule(version, compute)
+            if self.value is not None:
+                return self.value, False
+            # Nothing to serve yet: wait for the worker
+            while self.value is None and self._running is not None:
+                self._computed.wait()
+            if self.value is None:
+                raise RuntimeError(f"Computing results failed: {self.error}")
+            return self.value, self.version == version
+
+    def _schedule(self, version, compute):
+        # Caller holds the lock
+        if self._running == version:
+            return
+        if self._running is not None:
+            # Only the newest pending version is worth computing next
+            self._queued = (version, compute)
+            return
+        self._running = version
+        threading.Thread(target=self._work, args=(version, compute),
+                         name='results-cache', daemon=True).start()
+
+    def _work(self, version, compute):
+        while True:
+            try:
+                value = compute()
+            except Exception:
+                value = None
+                error = traceback.format_exc()
+                print(f"Error computing results for version {version}: {error}")
+            with self._lock:
+                if value is not None:
+                    self.value, self.version, self.error = value, version, None
+                else:
+                    self.error = error
+                if self._queued is not None and self._queued[0] != version:
+                    version, compute = self._queued
+                    self._queued = None
+                    self._running = version
+                else:
+                    self._queued = None
+                    self._running = None
+                self._computed.notify_all()
+                if self._running is None:
+                    return
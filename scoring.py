@@ -0,0 +1,272 @@
+import base64
+import json
+
+import numpy as np
+
+# Test layout: (category, label prefix, first label number, number of pairs).
+# Pair k of a section offers labels first + 2k and first + 2k + 1.
+SECTIONS = [
+    ('images', 'Image', 1, 20),
+    ('withoutAudio', 'Video', 41, 8),
+    ('withAudio', 'Video', 57, 8),
+]
+CATEGORIES = [category for category, _, _, _ in SECTIONS]
+
+PAIR_LABELS = []
+PAIR_CATEGORY = []
+for _category_index, (_category, _prefix, _first, _count) in enumerate(SECTIONS):
+    for _k in range(_count):
+        PAIR_LABELS.append((f'{_prefix} {_first + 2 * _k}', f'{_prefix} {_first + 2 * _k + 1}'))
+        PAIR_CATEGORY.append(_category_index)
+N_PAIRS = len(PAIR_LABELS)
+PAIR_CATEGORY = np.array(PAIR_CATEGORY)
+CATEGORY_SIZES = np.bincount(PAIR_CATEGORY, minlength=len(SECTIONS))
+# (pairs, categories) indicator used to sum correct answers per category
+CATEGORY_MATRIX = np.eye(len(SECTIONS), dtype=np.int32)[PAIR_CATEGORY]
+
+# Response codes stored per pair
+UNANSWERED, CHOSE_FIRST, CHOSE_SECOND = 0, 1, 2
+
+# Answer key: the code of the correct (fake) choice for each pair.
+# Odd-numbered items are real and even-numbered ones are fake.
+ANSWER_KEY = np.full(N_PAIRS, CHOSE_SECOND, dtype=np.uint8)
+
+# label -> (pair index, code of choosing it)
+LABEL_INDEX = {}
+for _pair, (_first_label, _second_label) in enumerate(PAIR_LABELS):
+    LABEL_INDEX[_first_label] = (_pair, CHOSE_FIRST)
+    LABEL_INDEX[_second_label] = (_pair, CHOSE_SECOND)
+
+
+def encode_responses(responses_list):
+    """
+    Encode many participants' response label lists as a (participants, pairs)
+    uint8 matrix of UNANSWERED / CHOSE_FIRST / CHOSE_SECOND codes.
+    Labels that are not part of the answer key are ignored.
+    """
+    codes = np.zeros((len(responses_list), N_PAIRS), dtype=np.uint8)
+    rows, pairs, choices = [], [], []
+    for row, responses in enumerate(responses_list):
+        for label in responses:
+            hit = LABEL_INDEX.get(label)
+            if hit is not None:
+                rows.append(row)
+                pairs.append(hit[0])
+                choices.append(hit[1])
+    codes[rows, pairs] = choices
+    return codes
+
+
+def decode_responses(codes):
+    """Turn a response code matrix back into lists of chosen labels."""
+    return [
+        [PAIR_LABELS[pair][code - 1] for pair, code in enumerate(row) if code]
+        for row in codes
+    ]
+
+
+def score_matrix(codes, n_responses=None, answer_key=ANSWER_KEY):
+    """
+    Score every participant in one pass.
+
+    Category scores are correct pairs over the category size, as the test
+    always scored them. Overall accuracy is correct pairs over n_responses
+    (the number of answers given), defaulting to the answered pairs.
+    Returns a dict of float arrays keyed by 'accuracy' and each category.
+    """
+    codes = np.asarray(codes, dtype=np.uint8)
+    correct = codes == answer_key
+    per_category = correct @ CATEGORY_MATRIX
+    if n_responses is None:
+        n_responses = np.count_nonzero(codes, axis=1)
+    n_responses = np.asarray(n_responses, dtype=float)
+    total = per_category.sum(axis=1)
+    accuracy = np.divide(total, n_responses, out=np.zeros(len(codes)), where=n_responses > 0)
+    scores = {'accuracy': accuracy}
+    for index, category in enumerate(CATEGORIES):
+        scores[category] = per_category[:, index] / CATEGORY_SIZES[index]
+    return scores
+
+
+def score_responses(responses, answer_key=ANSWER_KEY):
+    """Score one participant's response labels; returns a dict of floats."""
+    scores = score_matrix(encode_responses([responses]), [len(responses)], answer_key)
+    return {name: float(values[0]) for name, values in scores.items()}
+
+
+def familiarity_scores(familiarity_list):
+    """Share of 'Yes' answers per participant."""
+    return np.array([
+        sum(answer == 'Yes' for answer in answers) / len(answers) if answers else 0.0
+        for answers in familiarity_list
+    ])
+
+
+def item_answers(responses_list, familiarity_list):
+    """
+    Flatten participants' answers into (participant, pair, code, recognized)
+    arrays, recognized being an (answers, 2) bool array for the pair's first
+    and second person. The k-th response comes with familiarity answers
+    2k and 2k + 1; labels outside the answer key are skipped.
+    """
+    rows, pairs, codes, recognized = [], [], [], []
+    for row, (responses, familiarity) in enumerate(zip(responses_list, familiarity_list)):
+        for k, label in enumerate(responses):
+            hit = LABEL_INDEX.get(label)
+            if hit is None:
+                continue
+            answers = list(familiarity[2 * k:2 * k + 2]) + ['No', 'No']
+            rows.append(row)
+            pairs.append(hit[0])
+            codes.append(hit[1])
+            recognized.append((answers[0] == 'Yes', answers[1] == 'Yes'))
+    return (np.array(rows, dtype=np.int64), np.array(pairs, dtype=np.int64),
+            np.array(codes, dtype=np.uint8), np.array(recognized, dtype=bool).reshape(-1, 2))
+
+
+# Packed cells of the responses and familiarity columns. Every cell is a
+# fixed 12-byte payload (a multiple of 3, so it base64-encodes to exactly
+# 16 characters with no padding), which lets a whole column be encoded or
+# decoded with one base64 call:
+#   responses:   format byte, answered bit per pair, chose-second bit per pair
+#   familiarity: format byte, answer count, one bit per answer ('Yes' = 1)
+# Legacy cells hold JSON lists and always start with '['.
+RESPONSES_FORMAT = 1
+FAMILIARITY_FORMAT = 1
+MAX_FAMILIARITY = 2 * N_PAIRS
+_CELL_BYTES = 12
+_CELL_CHARS = _CELL_BYTES // 3 * 4
+_PAIR_BYTES = (N_PAIRS + 7) // 8
+_FAMILIARITY_BYTES = (MAX_FAMILIARITY + 7) // 8
+# Chosen label per (pair, code), '' for unanswered
+_CODE_LABELS = np.array([['', first, second] for first, second in PAIR_LABELS], dtype=object)
+_YES_NO = np.array(['No', 'Yes'], dtype=object)
+
+
+def _to_cells(payload):
+    """(n, _CELL_BYTES) uint8 payloads -> list of base64 cells."""
+    encoded = base64.b64encode(np.ascontiguousarray(payload, dtype=np.uint8).tobytes())
+    return np.frombuffer(encoded, dtype=f'S{_CELL_CHARS}').astype(f'U{_CELL_CHARS}').tolist()
+
+
+def _from_cells(cells, expected_format):
+    """Base64 cells -> (n, _CELL_BYTES) uint8 payloads, checking their format byte."""
+    payload = np.frombuffer(base64.b64decode(''.join(cells)), dtype=np.uint8).reshape(len(cells), _CELL_BYTES)
+    if len(payload) and (payload[:, 0] != expected_format).any():
+        raise ValueError(f"unknown packed cell format {sorted(set(payload[:, 0].tolist()))}")
+    return payload
+
+
+def pack_responses(codes):
+    """Response code matrix (participants, pairs) -> packed cells."""
+    codes = np.asarray(codes, dtype=np.uint8)
+    payload = np.zeros((len(codes), _CELL_BYTES), dtype=np.uint8)
+    payload[:, 0] = RESPONSES_FORMAT
+    payload[:, 1:1 + _PAIR_BYTES] = np.packbits(codes != UNANSWERED, axis=1)
+    payload[:, 1 + _PAIR_BYTES:1 + 2 * _PAIR_BYTES] = np.packbits(codes == CHOSE_SECOND, axis=1)
+    return _to_cells(payload)
+
+
+def unpack_responses(cells):
+    """Packed cells -> response code matrix (participants, pairs)."""
+    payload = _from_cells(cells, RESPONSES_FORMAT)
+    answered = np.unpackbits(payload[:, 1:1 + _PAIR_BYTES], axis=1, count=N_PAIRS).astype(bool)
+    second = np.unpackbits(payload[:, 1 + _PAIR_BYTES:1 + 2 * _PAIR_BYTES], axis=1, count=N_PAIRS)
+    return np.where(answered, second + CHOSE_FIRST, UNANSWERED).astype(np.uint8)
+
+
+def pack_familiarity(answers, lengths):
+    """'Yes' matrix (participants, answers) and answer counts -> packed cells."""
+    answers = np.asarray(answers, dtype=bool)
+    payload = np.zeros((len(answers), _CELL_BYTES), dtype=np.uint8)
+    payload[:, 0] = FAMILIARITY_FORMAT
+    payload[:, 1] = lengths
+    bits = np.packbits(answers, axis=1)
+    payload[:, 2:2 + bits.shape[1]] = bits
+    return _to_cells(payload)
+
+
+def unpack_familiarity(cells):
+    """Packed cells -> ('Yes' matrix (participants, MAX_FAMILIARITY), answer counts)."""
+    payload = _from_cells(cells, FAMILIARITY_FORMAT)
+    answers = np.unpackbits(payload[:, 2:2 + _FAMILIARITY_BYTES], axis=1, count=MAX_FAMILIARITY).astype(bool)
+    return answers, payload[:, 1].astype(np.int64)
+
+
+def response_cells(responses_list):
+    """
+    Cells to store for many participants' response lists: packed when the
+    packed form decodes back to the same list, JSON otherwise (labels outside
+    the answer key, repeated pairs or answers out of test order).
+    """
+    responses_list = [list(responses) for responses in responses_list]
+    cells = pack_responses(encode_responses(responses_list)) if responses_list else []
+    decoded = parse_response_cells(cells)
+    return [cell if labels == responses else json.dumps(responses)
+            for cell, labels, responses in zip(cells, decoded, responses_list)]
+
+
+def familiarity_cells(familiarity_list):
+    """Cells to store for many participants' familiarity answers, packed where they fit."""
+    familiarity_list = [list(answers) for answers in familiarity_list]
+    lengths = np.array([len(answers) for answers in familiarity_list], dtype=np.int64)
+    answers = np.zeros((len(familiarity_list), MAX_FAMILIARITY), dtype=bool)
+    fits = (lengths <= MAX_FAMILIARITY) & np.array(
+        [all(answer in ('Yes', 'No') for answer in row) for row in familiarity_list], dtype=bool)
+    for row in np.flatnonzero(fits):
+        answers[row, :lengths[row]] = np.array(familiarity_list[row]) == 'Yes'
+    cells = pack_familiarity(answers, np.where(fits, lengths, 0)) if familiarity_list else []
+    return [cell if fit else json.dumps(raw) for cell, fit, raw in zip(cells, fits, familiarity_list)]
+
+
+def _parse_cells(cells, unpack_rows):
+    """Decode a column of packed, JSON, empty or already-parsed cells into lists."""
+    cells = list(cells)
+    parsed = [None] * len(cells)
+    packed = []
+    for row, cell in enumerate(cells):
+        if not isinstance(cell, str):
+            parsed[row] = list(cell) if cell is not None else []
+        elif not cell:
+            parsed[row] = []
+        elif cell[0] == '[':
+            parsed[row] = json.loads(cell)
+        else:
+            packed.append(row)
+    if packed:
+        for row, values in zip(packed, unpack_rows([cells[row] for row in packed])):
+            parsed[row] = values
+    return parsed
+
+
+def _split_rows(values, mask, keys):
+    """Per-row lists of values[mask], in row order; rows with equal keys share a mask."""
+    # Nearly every row answers the same items, so each group's lists come
+    # from one 2-D tolist() in C rather than a slice per row
+    groups, inverse = np.unique(keys, return_inverse=True)
+    rows = [None] * len(values)
+    for group in range(len(groups)):
+        members = np.flatnonzero(inverse == group)
+        columns = np.flatnonzero(mask[members[0]])
+        for row, labels in zip(members.tolist(), values[np.ix_(members, columns)].tolist()):
+            rows[row] = labels
+    return rows
+
+
+def parse_response_cells(cells):
+    """Response lists from stored cells, packed or legacy JSON."""
+    def unpack_rows(packed):
+        codes = unpack_responses(packed)
+        answered = codes != UNANSWERED
+        # The answered pairs as one integer per row
+        keys = answered @ (np.uint64(1) << np.arange(N_PAIRS, dtype=np.uint64))
+        return _split_rows(_CODE_LABELS[np.arange(N_PAIRS), codes], answered, keys)
+    return _parse_cells(cells, unpack_rows)
+
+
+def parse_familiarity_cells(cells):
+    """Familiarity answer lists from stored cells, packed or legacy JSON."""
+    def unpack_rows(packed):
+        answers, lengths = unpack_familiarity(packed)
+        return _split_rows(_YES_NO[answers.astype(np.int64)], np.arange(MAX_FAMILIARITY) < lengths[:, None], lengths)
+    return _parse_cells(cells, unpack_rows)
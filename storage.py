@@ -0,0 +1,433 @@
+"""
+Response storage backends.
+
+Both take rows in SHEET_COLUMNS order, the way save_user_response writes
+them, and serve the reads the app needs: the full table, one participant,
+score percentiles, a cheap version, a generation that in-place rewrites
+bump so other processes drop what they derived from the old rows, and the
+re-score round trip.
+"""
+import hashlib
+import math
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from population import SCORE_METRICS
+from response_cache import ResponseCache, SHEET_COLUMNS, column_letter, normalize_headers, parse_rows
+from scoring import CATEGORIES, LABEL_INDEX, PAIR_CATEGORY, parse_familiarity_cells, parse_response_cells
+
+SQLITE_PATH = Path('data/responses.db')
+# Columns rewritten by a re-score, in sheet order
+SCORE_COLUMNS = ['accuracy', 'fam_score', 'withAudio', 'withoutAudio', 'images']
+
+
+class SheetsStorage:
+    """The Google Sheet, read through the incrementally synced local cache."""
+
+    name = 'sheets'
+
+    def __init__(self, call_sheet, cache=None):
+        # call_sheet(operation, *args, **kwargs) calls a worksheet method with retries
+        self.call_sheet = call_sheet
+        self.cache = cache or ResponseCache()
+        # Set while an append may have been applied without being acknowledged
+        self._append_uncertain = False
+
+    @property
+    def headers(self):
+        return self.cache.headers or SHEET_COLUMNS
+
+    def append_rows(self, rows):
+        """
+        Append rows to the sheet. A failed append may still have been
+        applied, so the next call first drops rows whose participant ID the
+        sheet already holds. Returns the number of rows appended.
+        """
+        if self._append_uncertain:
+            rows = self._unstored(rows)
+        if rows:
+            self._append_uncertain = True
+            self.call_sheet('append_rows', rows, value_input_option='RAW')
+        self._append_uncertain = False
+        return len(rows)
+
+    def _unstored(self, rows):
+        """The rows whose participant ID is not in the sheet yet."""
+        header_rows = self.call_sheet('get_values', '1:1')
+        headers = normalize_headers(header_rows[0] if header_rows else [])
+        if 'participant_id' not in headers:
+            return rows
+        column = column_letter(headers.index('participant_id') + 1)
+        stored = {row[0] for row in self.call_sheet('get_values', f'{column}2:{column}') if row}
+        id_column = SHEET_COLUMNS.index('participant_id')
+        return [row for row in rows if len(row) <= id_column or row[id_column] not in stored]
+
+    def sync(self, force=False):
+        """Fetch rows added to the sheet since the last sync; find and percentile read the synced copy."""
+        self.load(force=force)
+
+    def load(self, force=False):
+        return self.cache.sync(lambda range_name: self.call_sheet('get_values', range_name), force=force)
+
+    def find(self, participant_id):
+        return self.cache.find(participant_id)
+
+    def percentile(self, metric, value, extra=None):
+        return self.cache.histogram.percentile(metric, value, extra=extra)
+
+    def version(self):
+        return self.cache.version()
+
+    def generation(self):
+        return self.cache.generation()
+
+    def bump_generation(self):
+        self.cache.bump_generation()
+
+    def read_raw(self):
+        """(headers, rows) of the sheet as unparsed strings, read fresh."""
+        all_data = self.call_sheet('get_all_values')
+        self._read_headers = normalize_headers(all_data[0]) if all_data else SHEET_COLUMNS
+        return self._read_headers, all_data[1:]
+
+    def iter_rows(self, after_row=0, chunk_size=10_000, submitted_after=None):
+        """
+        Yield (row numbers, DataFrame) chunks of at most chunk_size rows below
+        data row after_row (1 = first row under the header), read straight from
+        the sheet a range at a time, optionally only rows submitted after an
+        ISO timestamp. Memory is bounded by the chunk.
+        """
+        import pandas as pd
+        header_rows = self.call_sheet('get_values', '1:1')
+        headers = normalize_headers(header_rows[0] if header_rows else [])
+        last_column = column_letter(max(len(headers), 1))
+        since = pd.Timestamp(submitted_after) if submitted_after is not None else None
+        while True:
+            first = after_row + 2
+            rows = self.call_sheet('get_values', f'A{first}:{last_column}{first + chunk_size - 1}')
+            if not rows:
+                return
+            frame = parse_rows(rows, headers)
+            numbers = np.arange(after_row + 1, after_row + 1 + len(rows))
+            after_row += len(rows)
+            if since is not None:
+                # The sheet cannot filter; rows without a timestamp never match
+                submitted = pd.to_datetime(frame['submitted_at'], utc=True, errors='coerce', format='ISO8601')
+                keep = (submitted > since).to_numpy()
+                frame, numbers = frame[keep].reset_index(drop=True), numbers[keep]
+            if len(frame):
+                yield numbers, frame
+            if len(rows) < chunk_size:
+                return
+
+    def read_all(self):
+        """Every stored row, read fresh from the sheet."""
+        headers, rows = self.read_raw()
+        return parse_rows(rows, headers)
+
+    def write_columns(self, columns, values):
+        """
+        Overwrite contiguous columns of the rows last read, one list of values
+        per row, and bump the generation so processes drop their cached copies.
+        """
+        start = self._read_headers.index(columns[0]) if columns[0] in self._read_headers else -1
+        if start < 0 or self._read_headers[start:start + len(columns)] != list(columns):
+            raise ValueError(f"columns {', '.join(columns)} are not contiguous in the sheet header")
+        first = start + 1
+        last = first + len(columns) - 1
+        values = values.tolist() if isinstance(values, np.ndarray) else [list(row) for row in values]
+        self.call_sheet(
+            'update',
+            values,
+            range_name=f'{column_letter(first)}2:{column_letter(last)}{len(values) + 1}',
+            value_input_option='RAW'
+        )
+        # Cached copies were built from the old values
+        self.bump_generation()
+
+    def write_scores(self, frame, values):
+        """Overwrite the score columns of the rows returned by read_all()."""
+        # The score columns are contiguous in the sheet
+        self.write_columns(SCORE_COLUMNS, np.asarray(values))
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS participants (
+    id INTEGER PRIMARY KEY,
+    participant_id TEXT UNIQUE,
+    name TEXT,
+    age REAL,
+    gender TEXT,
+    social_media_hours REAL,
+    accuracy REAL,
+    fam_score REAL,
+    withAudio REAL,
+    withoutAudio REAL,
+    images REAL,
+    submitted_at TEXT
+);
+CREATE INDEX IF NOT EXISTS participants_accuracy ON participants (accuracy);
+CREATE INDEX IF NOT EXISTS participants_images ON participants (images);
+CREATE INDEX IF NOT EXISTS participants_withAudio ON participants (withAudio);
+CREATE INDEX IF NOT EXISTS participants_withoutAudio ON participants (withoutAudio);
+
+-- One row per answered pair; pair and code follow scoring.LABEL_INDEX and
+-- are NULL for labels outside the current answer key
+CREATE TABLE IF NOT EXISTS responses (
+    participant INTEGER NOT NULL REFERENCES participants (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    choice TEXT NOT NULL,
+    category TEXT,
+    pair INTEGER,
+    code INTEGER,
+    PRIMARY KEY (participant, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS responses_category ON responses (category, pair, code);
+
+-- One row per familiarity question, two per pair
+CREATE TABLE IF NOT EXISTS familiarity (
+    participant INTEGER NOT NULL REFERENCES participants (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    recognized INTEGER NOT NULL,
+    PRIMARY KEY (participant, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+"""
+
+# Participant columns in SHEET_COLUMNS order, without the list columns
+_PARTICIPANT_COLUMNS = [column for column in SHEET_COLUMNS if column not in ('responses', 'familiarity')]
+_TEXT_COLUMNS = {'name', 'gender', 'participant_id', 'submitted_at'}
+_INSERT_PARTICIPANT = (
+    f"INSERT INTO participants ({', '.join(_PARTICIPANT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in _PARTICIPANT_COLUMNS)}) "
+    "ON CONFLICT (participant_id) DO NOTHING"
+)
+_INSERT_RESPONSE = "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?)"
+_INSERT_FAMILIARITY = "INSERT INTO familiarity VALUES (?, ?, ?)"
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else number
+
+
+class SQLiteStorage:
+    """
+    Embedded SQLite store in WAL mode, so the page reads while the
+    background writer appends.
+
+    Participants, their per-pair answers and their familiarity answers live
+    in separate tables keyed by participant. Batches are written in one
+    transaction; percentiles and versions are computed by SQL queries.
+    """
+
+    name = 'sqlite'
+    headers = SHEET_COLUMNS
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._frame_lock = threading.Lock()
+        self._frame = None
+        self._frame_version = None
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        # Stores created before participants had submitted_at gain the column
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(participants)")}
+        if 'submitted_at' not in columns:
+            with connection:
+                connection.execute("ALTER TABLE participants ADD COLUMN submitted_at TEXT")
+        connection.execute("CREATE INDEX IF NOT EXISTS participants_submitted_at ON participants (submitted_at)")
+
+    def _connect(self):
+        """One connection per thread; WAL lets them read while another writes."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('PRAGMA foreign_keys=ON')
+            self._local.connection = connection
+        return connection
+
+    def append_rows(self, rows):
+        """Insert rows in one transaction; rows already stored are skipped. Returns the count inserted."""
+        connection = self._connect()
+        responses, familiarity = [], []
+        inserted = 0
+        records = [dict(zip(SHEET_COLUMNS, row)) for row in rows]
+        # Item lists arrive as packed or JSON cells, or as lists
+        response_lists = parse_response_cells([record.get('responses') for record in records])
+        familiarity_lists = parse_familiarity_cells([record.get('familiarity') for record in records])
+        with connection:
+            for record, response_list, familiarity_list in zip(records, response_lists, familiarity_lists):
+                values = [
+                    (record.get(column) or None) if column in _TEXT_COLUMNS else _number(record.get(column))
+                    for column in _PARTICIPANT_COLUMNS
+                ]
+                cursor = connection.execute(_INSERT_PARTICIPANT, values)
+                if not cursor.rowcount:
+                    # Re-delivered batch: this participant is already stored
+                    continue
+                inserted += 1
+                participant = cursor.lastrowid
+                for position, label in enumerate(response_list):
+                    hit = LABEL_INDEX.get(label)
+                    if hit is None:
+                        responses.append((participant, position, label, None, None, None))
+                    else:
+                        category = CATEGORIES[PAIR_CATEGORY[hit[0]]]
+                        responses.append((participant, position, label, category, hit[0], hit[1]))
+                for position, answer in enumerate(familiarity_list):
+                    familiarity.append((participant, position, int(answer == 'Yes')))
+            connection.executemany(_INSERT_RESPONSE, responses)
+            connection.executemany(_INSERT_FAMILIARITY, familiarity)
+            connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+        return inserted
+
+    def _read_frame(self, where='', params=(), limit=None):
+        """
+        Participants as a DataFrame indexed by row id, lists reassembled from
+        the item tables; every participant unless filtered by a WHERE clause
+        and limit.
+        """
+        import pandas as pd
+        connection = self._connect()
+        selection = f"FROM participants {where} ORDER BY id" + (f" LIMIT {int(limit)}" if limit else '')
+        frame = pd.read_sql_query(
+            f"SELECT id, {', '.join(_PARTICIPANT_COLUMNS)} {selection}",
+            connection, params=params, index_col='id'
+        )
+        ids = frame.index.to_numpy()
+        item_range, item_params = '', ()
+        if where or limit:
+            # Items of the selected participants only
+            item_range = f"WHERE participant IN (SELECT id {selection})"
+            item_params = tuple(params)
+        for column, query, convert in [
+            ('responses', f"SELECT participant, choice FROM responses {item_range} "
+                          "ORDER BY participant, position", None),
+            ('familiarity', f"SELECT participant, recognized FROM familiarity {item_range} "
+                            "ORDER BY participant, position", np.array(['No', 'Yes'], dtype=object)),
+        ]:
+            items = connection.execute(query, item_params).fetchall()
+            owners = np.fromiter((item[0] for item in items), dtype=np.int64, count=len(items))
+            values = np.array([item[1] for item in items], dtype=object)
+            if convert is not None and len(values):
+                values = convert[values.astype(np.int64)]
+            starts = np.searchsorted(owners, ids, side='left')
+            ends = np.searchsorted(owners, ids, side='right')
+            frame[column] = [values[start:end].tolist() for start, end in zip(starts, ends)]
+        return frame[SHEET_COLUMNS]
+
+    def sync(self, force=False):
+        """Nothing to fetch: find, percentile and version query the database directly."""
+
+    def load(self, force=False):
+        """The full table, re-read only when the stored data has changed."""
+        version = self.version()
+        with self._frame_lock:
+            if force or self._frame is None or self._frame_version != version:
+                self._frame = self._read_frame().reset_index(drop=True)
+                self._frame_version = version
+            return self._frame
+
+    def find(self, participant_id):
+        import pandas as pd
+        connection = self._connect()
+        row = connection.execute(
+            f"SELECT id, {', '.join(_PARTICIPANT_COLUMNS)} FROM participants WHERE participant_id = ?",
+            (participant_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = dict(zip(_PARTICIPANT_COLUMNS, row[1:]))
+        record['responses'] = [choice for choice, in connection.execute(
+            "SELECT choice FROM responses WHERE participant = ? ORDER BY position", (row[0],))]
+        record['familiarity'] = ['Yes' if recognized else 'No' for recognized, in connection.execute(
+            "SELECT recognized FROM familiarity WHERE participant = ? ORDER BY position", (row[0],))]
+        return pd.Series({column: record[column] for column in SHEET_COLUMNS})
+
+    def percentile(self, metric, value, extra=None):
+        """Share of participants (0-100) scoring below value, counting ties as half."""
+        if metric not in SCORE_METRICS:
+            raise ValueError(f"unknown score metric {metric!r}")
+        if value is None or np.isnan(value):
+            return None
+        # Both counts are range scans over the metric's index
+        below, ties, total = self._connect().execute(
+            f"SELECT (SELECT COUNT(*) FROM participants WHERE {metric} < ?), "
+            f"(SELECT COUNT(*) FROM participants WHERE {metric} = ?), "
+            f"(SELECT COUNT({metric}) FROM participants)",
+            (value, value)
+        ).fetchone()
+        if extra is not None and len(extra):
+            extra = np.asarray(extra, dtype=float)
+            extra = extra[~np.isnan(extra)]
+            below += int(np.count_nonzero(extra < value))
+            ties += int(np.count_nonzero(extra == value))
+            total += len(extra)
+        if total == 0:
+            return None
+        return float(100.0 * (below + 0.5 * ties) / total)
+
+    def version(self):
+        """(participant count, hash of the write revision); any write changes it."""
+        count, revision = self._connect().execute(
+            "SELECT (SELECT COUNT(*) FROM participants), value FROM meta WHERE key = 'revision'"
+        ).fetchone()
+        return count, hashlib.sha256(f'{count}:{revision}'.encode('utf-8')).hexdigest()
+
+    def generation(self):
+        """How many times stored rows were rewritten in place; appends leave it alone."""
+        return self._connect().execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def bump_generation(self):
+        connection = self._connect()
+        with connection:
+            connection.execute("UPDATE meta SET value = value + 1 WHERE key IN ('revision', 'generation')")
+
+    def read_all(self):
+        return self._read_frame()
+
+    def iter_rows(self, after_row=0, chunk_size=10_000, submitted_after=None):
+        """
+        Yield (row ids, DataFrame) chunks of at most chunk_size participants
+        with a row id above after_row, in storage order, optionally only those
+        submitted after an ISO timestamp. Memory is bounded by the chunk.
+        """
+        while True:
+            where, params = "WHERE id > ?", [after_row]
+            if submitted_after is not None:
+                where += " AND submitted_at > ?"
+                params.append(submitted_after)
+            frame = self._read_frame(where, params, limit=chunk_size)
+            if not len(frame):
+                return
+            yield frame.index.to_numpy(), frame.reset_index(drop=True)
+            after_row = int(frame.index[-1])
+
+    def write_scores(self, frame, values):
+        """Overwrite the score columns of the rows returned by read_all() and bump the generation."""
+        assignments = ', '.join(f'{column} = ?' for column in SCORE_COLUMNS)
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                f"UPDATE participants SET {assignments} WHERE id = ?",
+                [[float(value) for value in row] + [int(row_id)]
+                 for row, row_id in zip(np.asarray(values), frame.index)]
+            )
+            connection.execute("UPDATE meta SET value = value + 1 WHERE key IN ('revision', 'generation')")
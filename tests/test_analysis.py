@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import BayesianRidge
+from scipy import stats
+from sklearn.preprocessing import StandardScaler
+
+from analysis import (
+    BOOTSTRAP_MAX_ITER, BOOTSTRAP_TOL, BOOTSTRAP_TOLERANCE, EFFECT_NAMES, GROUP_FEATURES, GROUP_TARGETS,
+    bootstrap_bayesian_ridge, bootstrap_indices, fit_bayesian_ridge_stats, perform_group_analysis
+)
+from benchmarks.synthetic import generate_sheet_values
+from response_cache import parse_rows
+
+
+def sample(n, seed):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([rng.integers(15, 80, n), rng.uniform(0, 12, n).round(1)]).astype(float)
+    y = np.clip(0.6 - 0.002 * X[:, 0] + 0.01 * X[:, 1] + rng.normal(0, 0.1, n), 0, 1)
+    return StandardScaler().fit_transform(X), y
+
+
+@pytest.mark.parametrize('n, seed', [(12, 0), (200, 1), (1000, 2)])
+def test_vectorized_bootstrap_matches_sklearn(n, seed):
+    X, y = sample(n, seed)
+    coef, intercept = bootstrap_bayesian_ridge(X, y, n_resamples=50, random_state=seed)
+    coef_sk, intercept_sk = bootstrap_bayesian_ridge(X, y, n_resamples=50, random_state=seed, method='sklearn')
+    assert coef.shape == coef_sk.shape == (50, 2)
+    np.testing.assert_allclose(coef, coef_sk, rtol=0, atol=BOOTSTRAP_TOLERANCE)
+    np.testing.assert_allclose(intercept, intercept_sk, rtol=0, atol=BOOTSTRAP_TOLERANCE)
+
+
+def test_stats_fit_matches_bayesian_ridge():
+    X, y = sample(300, 3)
+    brr = BayesianRidge(max_iter=1000, tol=1e-6, alpha_init=1e-6, lambda_init=1e-6).fit(X, y)
+    coef, intercept, alpha, lam = fit_bayesian_ridge_stats(
+        np.array([len(y)]), X.sum(axis=0)[None], (X.T @ X)[None], np.array([y.sum()]),
+        (X.T @ y)[None], np.array([y @ y]),
+        max_iter=1000, tol=1e-6, alpha_init=1e-6, lambda_init=1e-6
+    )
+    np.testing.assert_allclose(coef[0], brr.coef_, rtol=0, atol=BOOTSTRAP_TOLERANCE)
+    np.testing.assert_allclose(intercept[0], brr.intercept_, rtol=0, atol=BOOTSTRAP_TOLERANCE)
+    np.testing.assert_allclose([alpha[0], lam[0]], [brr.alpha_, brr.lambda_], rtol=1e-6)
+
+
+def test_unknown_method_is_rejected():
+    X, y = sample(10, 4)
+    with pytest.raises(ValueError):
+        bootstrap_bayesian_ridge(X, y, n_resamples=2, method='gpu')
+
+
+def test_group_analysis_matches_per_group_bayesian_ridge():
+    values = generate_sheet_values(400, seed=5)
+    data_df = parse_rows(values[1:], values[0])
+    data_df.loc[[2, 30], 'age'] = np.nan
+    data_df.loc[7, 'withAudio'] = np.nan
+    result = perform_group_analysis(data_df, n_iterations=30, random_state=0)
+
+    frame = data_df.dropna(subset=GROUP_FEATURES + GROUP_TARGETS)
+    X = StandardScaler().fit_transform(frame[GROUP_FEATURES].to_numpy(dtype=float))
+    genders = frame['gender'].to_numpy()
+    resamples = np.concatenate(list(bootstrap_indices(len(frame), 30, 0)))
+    groups = {'all': np.ones(len(frame), dtype=bool)}
+    groups.update({gender: genders == gender for gender in sorted(set(genders))
+                   if np.count_nonzero(genders == gender) >= 10})
+    assert set(result['by_gender']) == set(groups) - {'all'}
+
+    for name, rows in groups.items():
+        group = result['all'] if name == 'all' else result['by_gender'][name]
+        assert group['n'] == rows.sum()
+        for target in GROUP_TARGETS:
+            y = frame[target].to_numpy(dtype=float)
+            brr = BayesianRidge(max_iter=1000, tol=1e-6, alpha_init=1e-6, lambda_init=1e-6).fit(X[rows], y[rows])
+            boot = []
+            for indices in resamples:
+                # The group's own rows of a resample drawn over everyone
+                chosen = indices[rows[indices]]
+                fit = BayesianRidge(max_iter=BOOTSTRAP_MAX_ITER, tol=BOOTSTRAP_TOL).fit(X[chosen], y[chosen])
+                boot.append(np.append(fit.coef_, fit.intercept_))
+            boot = np.array(boot)
+            entry = group[target]
+            for i, feature in enumerate(GROUP_FEATURES):
+                effect = entry[EFFECT_NAMES.get(feature, f'{feature}_effect')]
+                assert effect['mean'] == pytest.approx(brr.coef_[i], abs=BOOTSTRAP_TOLERANCE)
+                assert effect['std'] == pytest.approx(np.std(boot[:, i]), abs=BOOTSTRAP_TOLERANCE)
+                assert (effect['ci_low'], effect['ci_high']) == pytest.approx(
+                    tuple(np.percentile(boot[:, i], [2.5, 97.5])), abs=BOOTSTRAP_TOLERANCE)
+                r, p_value = stats.pearsonr(X[rows, i], y[rows])
+                assert (effect['correlation'], effect['p_value']) == pytest.approx((r, p_value), rel=1e-6)
+            assert entry['baseline']['mean'] == pytest.approx(brr.intercept_, abs=BOOTSTRAP_TOLERANCE)
+            assert entry['baseline']['std'] == pytest.approx(np.std(boot[:, -1]), abs=BOOTSTRAP_TOLERANCE)
+            assert entry['model_score'] == pytest.approx(brr.score(X[rows], y[rows]), abs=1e-6)
@@ -0,0 +1,45 @@
+import pandas as pd
+
+from benchmarks.synthetic import generate_sheet_values
+from export import export_responses
+from response_cache import SHEET_COLUMNS
+from storage import SQLiteStorage
+
+
+def rows(n, seed, submitted_at):
+    values = generate_sheet_values(n, seed=seed)
+    header = values[0]
+    out = []
+    for k, row in enumerate(values[1:]):
+        row = [row[header.index(column)] if column in header else '' for column in SHEET_COLUMNS]
+        row[SHEET_COLUMNS.index('participant_id')] = f'{seed}-{k}'
+        row[SHEET_COLUMNS.index('submitted_at')] = submitted_at(k)
+        out.append(row)
+    return out
+
+
+def test_row_cursor_continues_exactly(tmp_path):
+    storage = SQLiteStorage(tmp_path / 'responses.db')
+    # Second-resolution rows from before, then sub-second ones in the same second
+    storage.append_rows(rows(3, 1, lambda k: '2026-05-01T10:00:00+00:00'))
+    first = export_responses(storage, tmp_path / 'first.csv')
+    storage.append_rows(rows(4, 2, lambda k: f'2026-05-01T10:00:00.{k + 1:06d}+00:00'))
+
+    second = export_responses(storage, tmp_path / 'second.csv', since_row=first['last_row'])
+    assert (first['rows'], second['rows']) == (3, 4)
+    exported = pd.read_csv(tmp_path / 'second.csv')
+    assert exported['participant_id'].tolist() == [f'2-{k}' for k in range(4)]
+    assert second['last_submitted_at'] == '2026-05-01T10:00:00.000004+00:00'
+
+    # A time cursor is strict: later instants in the same second are still exported
+    by_time = export_responses(storage, tmp_path / 'by_time.csv', since_time='2026-05-01T10:00:00Z')
+    assert by_time['rows'] == 4
+
+
+def test_mixed_timestamp_precision_is_parsed(tmp_path):
+    storage = SQLiteStorage(tmp_path / 'responses.db')
+    storage.append_rows(rows(1, 1, lambda k: '2026-05-01T10:00:00+00:00')
+                        + rows(1, 2, lambda k: '2026-05-01T10:00:00.250000+00:00'))
+    export_responses(storage, tmp_path / 'all.parquet')
+    submitted = pd.read_parquet(tmp_path / 'all.parquet')['submitted_at']
+    assert submitted.notna().all()
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_sheet_values
+from item_stats import ItemStats
+from response_cache import parse_rows
+from scoring import ANSWER_KEY, N_PAIRS, encode_responses
+
+
+@pytest.fixture
+def data_df():
+    values = generate_sheet_values(400, seed=3)
+    return parse_rows(values[1:], values[0])
+
+
+def test_updates_match_a_rebuild(data_df):
+    stats = ItemStats()
+    for record in data_df.to_dict('records'):
+        stats.update(record)
+    rebuilt = ItemStats.from_dataframe(data_df)
+    assert stats.n == rebuilt.n == len(data_df)
+    np.testing.assert_array_equal(stats.counts, rebuilt.counts)
+    np.testing.assert_array_equal(stats.moments, rebuilt.moments)
+
+
+def test_difficulty_and_discrimination_match_the_answers(data_df):
+    stats = ItemStats.from_dataframe(data_df)
+    codes = encode_responses(data_df['responses'])
+    answered = codes > 0
+    correct = (codes == ANSWER_KEY) & answered
+    rest = correct.sum(axis=1)[:, None] - correct
+    for pair in range(N_PAIRS):
+        mask = answered[:, pair]
+        if mask.sum() < 2:
+            assert stats.discrimination(pair) is None
+            continue
+        assert stats.difficulty(pair) == pytest.approx(correct[mask, pair].mean())
+        expected = np.corrcoef(correct[mask, pair], rest[mask, pair])[0, 1]
+        assert stats.discrimination(pair) == pytest.approx(expected)
+
+
+def test_saved_counters_keep_their_generation(tmp_path, data_df):
+    stats = ItemStats.from_dataframe(data_df)
+    stats.generation = 'sqlite:4'
+    stats.save(tmp_path / 'item_stats.json')
+    loaded = ItemStats.load(tmp_path / 'item_stats.json')
+    assert loaded.generation == 'sqlite:4'
+    np.testing.assert_array_equal(loaded.counts, stats.counts)
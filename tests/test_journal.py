@@ -0,0 +1,136 @@
+import random
+import threading
+import time
+
+from journal import ResponseJournal, WriteBehindWriter
+
+
+class SlowJournal(ResponseJournal):
+    """Journal that pauses after each append, widening the window for races."""
+
+    def append(self, row):
+        offset = super().append(row)
+        time.sleep(random.uniform(0, 0.002))
+        return offset
+
+
+def test_concurrent_submits_are_delivered_once_and_compacted(tmp_path):
+    delivered = []
+    lock = threading.Lock()
+
+    def append_rows(rows):
+        with lock:
+            delivered.extend(rows)
+
+    journal = SlowJournal(tmp_path / 'responses.journal')
+    writer = WriteBehindWriter(append_rows, journal, batch_size=3, flush_interval=0.001).start()
+
+    def submit(thread):
+        for k in range(50):
+            writer.submit([thread, k])
+
+    threads = [threading.Thread(target=submit, args=(thread,)) for thread in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert writer.flush(timeout=30)
+    writer.stop()
+
+    assert sorted(map(tuple, delivered)) == [(thread, k) for thread in range(8) for k in range(50)]
+    # Fully drained: nothing to replay, and rows journaled later are found on restart
+    restarted = ResponseJournal(tmp_path / 'responses.journal')
+    assert restarted.pending() == []
+    restarted.append(['late', 0])
+    restarted.append(['late', 1])
+    assert [row for _, row in ResponseJournal(tmp_path / 'responses.journal').pending()] == \
+        [['late', 0], ['late', 1]]
+
+
+class GatedJournal(ResponseJournal):
+    """Journal that holds the submit of row ['a'] between journaling and returning."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.journaled = threading.Event()
+        self.gate = threading.Event()
+
+    def append(self, row):
+        offset = super().append(row)
+        if row == ['a']:
+            self.journaled.set()
+            self.gate.wait(5)
+        return offset
+
+
+def test_delivery_never_compacts_past_a_row_being_submitted(tmp_path):
+    journal = GatedJournal(tmp_path / 'responses.journal')
+    delivered = []
+    writer = WriteBehindWriter(delivered.extend, journal, flush_interval=0.001).start()
+    first = threading.Thread(target=writer.submit, args=(['a'],))
+    first.start()
+    assert journal.journaled.wait(5)
+    # ['b'] is journaled after ['a'], and must not be delivered and compacted before it
+    second = threading.Thread(target=writer.submit, args=(['b'],))
+    second.start()
+    time.sleep(0.2)
+    journal.gate.set()
+    first.join()
+    second.join()
+    assert writer.flush(timeout=10)
+    writer.stop()
+    assert sorted(delivered) == [['a'], ['b']]
+
+    restarted = ResponseJournal(tmp_path / 'responses.journal')
+    restarted.append(['c'])
+    assert [row for _, row in restarted.pending()] == [['c']]
+
+
+def test_pending_skips_unreadable_records(tmp_path):
+    journal = ResponseJournal(tmp_path / 'responses.journal')
+    journal.append(['a'])
+    with open(journal.path, 'ab') as f:
+        f.write(b'"b"]\n')
+    journal.append(['c'])
+    # A crash mid-write leaves a torn last line
+    with open(journal.path, 'ab') as f:
+        f.write(b'["d')
+    assert [row for _, row in journal.pending()] == [['a'], ['c']]
+    journal.append(['e'])
+    assert [row for _, row in journal.pending()] == [['a'], ['c'], ['e']]
+
+
+def test_stale_offset_past_the_end_replays_the_log(tmp_path):
+    journal = ResponseJournal(tmp_path / 'responses.journal')
+    journal.append(['a'])
+    journal._write_offset(10_000)
+    assert [row for _, row in journal.pending()] == [['a']]
+
+
+def test_submissions_during_backoff_do_not_retry_early(tmp_path):
+    attempts = []
+
+    def failing_append(rows):
+        attempts.append(time.monotonic())
+        raise ConnectionError("store unavailable")
+
+    writer = WriteBehindWriter(failing_append, ResponseJournal(tmp_path / 'responses.journal'),
+                               flush_interval=0.01, max_backoff=1.0)
+    writer.start()
+    writer.submit(['first'])
+    deadline = time.monotonic() + 2
+    while not attempts:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    # Every submission wakes the writer; none may cut the 1s backoff short
+    for k in range(20):
+        writer.submit([f'row-{k}'])
+        writer.flush(timeout=0)
+        time.sleep(0.02)
+    assert len(attempts) == 1
+    while len(attempts) < 2:
+        assert time.monotonic() < deadline + 2
+        time.sleep(0.01)
+    assert attempts[1] - attempts[0] >= 1.0
+    writer._stopping.set()
+    writer._wakeup.set()
@@ -0,0 +1,58 @@
+import hashlib
+import mmap
+
+import pytest
+
+import media
+from media_archive import MediaArchive, open_media_archive, write_media_archive
+
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    # No renditions built: clips are packed as their original files, without posters
+    monkeypatch.setattr(media, 'RENDITION_DIR', tmp_path / 'videos')
+    files = {}
+    for name, size in [('real.jpg', 3000), ('fake.jpg', 10), ('real.mp4', 5000), ('fake.mp4', 0)]:
+        path = tmp_path / name
+        path.write_bytes(hashlib.sha256(name.encode()).digest() * (size // 32) + b'x' * (size % 32))
+        files[str(path)] = {'width': 200, 'sha256': media.file_checksum(path)}
+    return {
+        'pairs': {'images': [[str(tmp_path / 'real.jpg'), str(tmp_path / 'fake.jpg')]],
+                  'no_audio': [[str(tmp_path / 'real.mp4'), str(tmp_path / 'fake.mp4')]]},
+        'files': files,
+        'fingerprint': {'data/celeb-df/real/images': 1},
+    }
+
+
+def test_entries_read_back_page_aligned(manifest, tmp_path):
+    count, size = write_media_archive(manifest, tmp_path / 'media.pack')
+    assert count == 4 and size == (tmp_path / 'media.pack').stat().st_size
+    archive = MediaArchive(tmp_path / 'media.pack')
+    for path in manifest['pairs']['images'][0]:
+        assert bytes(archive.image(path)) == open(path, 'rb').read()
+    for path in manifest['pairs']['no_audio'][0]:
+        clip = archive.video(path)
+        assert bytes(clip['video']) == open(path, 'rb').read()
+        assert clip['poster'] is None and clip['duration'] is None
+    assert (archive.table['offset'] % mmap.PAGESIZE == 0).all()
+    assert archive.pairs == manifest['pairs'] and archive.fingerprint == manifest['fingerprint']
+    assert archive.image('missing.jpg') is None
+    assert archive.verify() == []
+
+
+def test_verify_reports_changed_entries(manifest, tmp_path):
+    write_media_archive(manifest, tmp_path / 'media.pack')
+    real = manifest['pairs']['images'][0][0]
+    offset = int(MediaArchive(tmp_path / 'media.pack').table['offset'][0])
+    with open(tmp_path / 'media.pack', 'r+b') as f:
+        f.seek(offset + 100)
+        f.write(b'\xff')
+    assert MediaArchive(tmp_path / 'media.pack').verify() == [f'image:{real}']
+
+
+def test_unreadable_archives_are_not_opened(tmp_path):
+    assert open_media_archive(tmp_path / 'missing.pack') is None
+    (tmp_path / 'other.pack').write_bytes(b'NOTAPACK' + b'\0' * 64)
+    assert open_media_archive(tmp_path / 'other.pack') is None
+    (tmp_path / 'short.pack').write_bytes(b'DDHA')
+    assert open_media_archive(tmp_path / 'short.pack') is None
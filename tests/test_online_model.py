@@ -0,0 +1,147 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analysis
+import database
+import item_stats
+from benchmarks.synthetic import generate_sheet_values
+from journal import ResponseJournal, WriteBehindWriter
+from response_cache import parse_rows
+from storage import SCORE_COLUMNS, SQLiteStorage
+
+
+def participants(n, seed=0):
+    values = generate_sheet_values(n, seed=seed)
+    return parse_rows(values[1:], values[0])
+
+
+def test_updates_match_a_rebuild_and_sklearn():
+    data_df = participants(300)
+    model = analysis.OnlineBayesianRegression()
+    for record in data_df.to_dict('records'):
+        model.update([record[name] for name in analysis.ONLINE_FEATURES], record[analysis.ONLINE_TARGET])
+    checks = analysis.check_online_model(data_df, model)
+    assert checks['stats_match']
+    assert checks['coef_match']
+
+
+def test_rows_with_missing_values_are_left_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis, 'ONLINE_MODEL_PATH', tmp_path / 'online_model.json')
+    monkeypatch.setattr(analysis, '_online_model', None)
+    data_df = participants(50)
+    broken = data_df.copy()
+    broken.loc[[3, 7], 'accuracy'] = np.nan
+    broken.loc[11, 'age'] = np.nan
+    rebuilt = analysis.OnlineBayesianRegression.from_dataframe(broken)
+    assert rebuilt.n == 47 and np.isfinite(rebuilt.sum_xy).all()
+
+    for record in broken.to_dict('records'):
+        analysis.update_online_model(record)
+    model = analysis.get_online_model()
+    assert model.n == 47
+    np.testing.assert_allclose(model.sum_xy, rebuilt.sum_xy)
+
+
+class FlakyStorage(SQLiteStorage):
+    """SQLite store whose reads fail while `down` is set."""
+
+    down = False
+
+    def load(self, force=False):
+        if self.down:
+            raise ConnectionError("store unavailable")
+        return super().load(force)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis, 'ONLINE_MODEL_PATH', tmp_path / 'online_model.json')
+    monkeypatch.setattr(analysis, '_online_model', None)
+    monkeypatch.setattr(item_stats, 'ITEM_STATS_PATH', tmp_path / 'item_stats.json')
+    monkeypatch.setattr(item_stats, '_item_stats', None)
+    storage = FlakyStorage(tmp_path / 'responses.db')
+    storage.append_rows(generate_sheet_values(20, seed=1)[1:])
+    database.set_storage(storage)
+    # Not started: submissions stay in the journal, like rows waiting on a slow store
+    monkeypatch.setattr(database, '_writer', WriteBehindWriter(
+        database._append_rows, ResponseJournal(tmp_path / 'responses.journal')))
+    yield storage
+    database.set_storage(None)
+
+
+def submission(k):
+    return {'name': f'new_{k}', 'age': 20 + k, 'gender': 'Female', 'social_media_hours': k,
+            'responses': ['Image 2', 'Image 3'], 'familiarity': ['Yes', 'No', 'No', 'No']}
+
+
+def wait_until(status, timeout=10):
+    deadline = time.monotonic() + timeout
+    while database._derived_status != status:
+        assert time.monotonic() < deadline, f"derived state never became {status}"
+        time.sleep(0.01)
+
+
+def wait_until_ready():
+    wait_until('ready')
+
+
+def test_submission_survives_a_failed_rebuild_and_is_counted_once(store):
+    store.down = True
+    database.save_user_response(submission(0))
+    assert len(database.get_response_writer().pending_rows()) == 1
+    # The failed rebuild leaves the next submission to try again
+    wait_until(None)
+
+    store.down = False
+    database.save_user_response(submission(1))
+    wait_until_ready()
+    database.save_user_response(submission(2))
+    model = analysis.get_online_model()
+    assert model.n == 23
+
+    all_rows = database.load_all_responses()
+    rebuilt = analysis.OnlineBayesianRegression.from_dataframe(all_rows)
+    assert rebuilt.n == 23
+    np.testing.assert_allclose(model.sum_xx, rebuilt.sum_xx)
+    np.testing.assert_allclose(model.sum_xy, rebuilt.sum_xy)
+    snapshot = database.online_model()
+    assert snapshot is not model and snapshot.posterior()['n'] == 23
+    stats = database.item_statistics()
+    rebuilt_stats = item_stats.ItemStats.from_dataframe(all_rows)
+    assert stats.n == 23
+    np.testing.assert_array_equal(stats.counts, rebuilt_stats.counts)
+    np.testing.assert_array_equal(stats.moments, rebuilt_stats.moments)
+
+
+def test_rewritten_store_is_rebuilt_not_patched(store):
+    database.save_user_response(submission(0))
+    wait_until_ready()
+    # A maintenance command rewrites the scores in another process
+    frame = store.read_all()
+    values = frame[SCORE_COLUMNS].to_numpy(dtype=float) * 0.5
+    SQLiteStorage(store.path).write_scores(frame, values)
+
+    database.save_user_response(submission(1))
+    wait_until_ready()
+    model = analysis.get_online_model()
+    rebuilt = analysis.OnlineBayesianRegression.from_dataframe(database.load_all_responses())
+    assert model.n == rebuilt.n == 22
+    np.testing.assert_allclose(model.sum_xy, rebuilt.sum_xy)
+    assert model.generation == database._store_generation()
+
+
+def test_imported_rows_reach_the_online_model(store, tmp_path):
+    database.save_user_response(submission(0))
+    wait_until_ready()
+    values = generate_sheet_values(5, seed=2)
+    json_path = tmp_path / 'responses.json'
+    json_path.write_text(json.dumps([dict(zip(values[0], row)) for row in values[1:]]))
+    assert database.migrate_responses('json', json_path, SQLiteStorage(store.path)) == (5, 5)
+
+    database.save_user_response(submission(1))
+    wait_until_ready()
+    assert analysis.get_online_model().n == 27
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_sheet_values
+from plots import box_figure, ols_line, scatter_figure
+from response_cache import parse_rows
+
+
+@pytest.fixture(scope='module')
+def responses():
+    values = generate_sheet_values(600, seed=7)
+    frame = parse_rows(values[1:], values[0])
+    frame.loc[[4, 9], 'accuracy'] = np.nan
+    frame.loc[13, 'age'] = np.nan
+    return frame
+
+
+def bin_of(value, edges):
+    """Bin of one value the way numpy.histogram counts it: right edge of the last bin included."""
+    for k in range(len(edges) - 1):
+        if edges[k] <= value < edges[k + 1] or (k == len(edges) - 2 and value == edges[-1]):
+            return k
+    raise AssertionError(value)
+
+
+def test_heatmap_counts_every_participant_once(responses):
+    heatmap, line = scatter_figure(responses, 'age', 'accuracy', 'title', aggregate_above=0).data
+    x_centers, y_centers = np.asarray(heatmap.x), np.asarray(heatmap.y)
+    x_step, y_step = x_centers[1] - x_centers[0], y_centers[1] - y_centers[0]
+    x_edges = np.append(x_centers - x_step / 2, x_centers[-1] + x_step / 2)
+    y_edges = np.append(y_centers - y_step / 2, y_centers[-1] + y_step / 2)
+
+    counts = np.zeros((len(y_centers), len(x_centers)))
+    for age, accuracy in zip(responses['age'], responses['accuracy']):
+        if not (np.isnan(age) or np.isnan(accuracy)):
+            counts[bin_of(accuracy, y_edges), bin_of(age, x_edges)] += 1
+    np.testing.assert_array_equal(np.nan_to_num(np.asarray(heatmap.z, dtype=float)), counts)
+    assert counts.sum() == len(responses) - 3
+
+    # The OLS line is the same one drawn over the individual markers
+    _, per_row_line = scatter_figure(responses, 'age', 'accuracy', 'title', aggregate_above=10_000).data
+    np.testing.assert_allclose(line.y, per_row_line.y)
+
+
+def test_ols_line_matches_polyfit(responses):
+    keep = responses[['age', 'accuracy']].notna().all(axis=1)
+    slope, intercept = ols_line(responses['age'], responses['accuracy'])
+    np.testing.assert_allclose([slope, intercept], np.polyfit(
+        responses['age'][keep], responses['accuracy'][keep], 1))
+    assert ols_line([1, 1, 1], [0, 1, 2]) is None
+
+
+def test_aggregated_boxes_match_per_group_statistics(responses):
+    box, = box_figure(responses, 'gender', 'accuracy', 'title', aggregate_above=0).data
+    for k, gender in enumerate(box.x):
+        scores = [value for group, value in zip(responses['gender'], responses['accuracy'])
+                  if group == gender and not np.isnan(value)]
+        q1, median, q3 = np.percentile(scores, [25, 50, 75])
+        inside = [value for value in scores if q1 - 1.5 * (q3 - q1) <= value <= q3 + 1.5 * (q3 - q1)]
+        assert (box.q1[k], box.median[k], box.q3[k]) == pytest.approx((q1, median, q3))
+        assert (box.lowerfence[k], box.upperfence[k]) == pytest.approx((min(inside), max(inside)))
+        assert box.mean[k] == pytest.approx(np.mean(scores))
+    assert sorted(box.x) == sorted(responses['gender'].unique())
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import percentileofscore
+
+from population import HISTOGRAM_BINS, ScoreHistogram, _bin_index
+
+# Score steps the test produces: per category (8, 20 pairs) and overall (up to 36 answers)
+STEPS = [8, 20, 36, 35, 17]
+
+
+def scores(rng, n, steps):
+    return rng.integers(0, steps + 1, n) / steps
+
+
+def test_score_steps_land_in_distinct_bins():
+    for steps in STEPS:
+        values = np.arange(steps + 1) / steps
+        bins = _bin_index(values)
+        assert len(set(bins)) == steps + 1
+        # Edges fall in the bin they start, and 1.0 in the last one
+        np.testing.assert_array_equal(bins[:-1], np.floor(np.arange(steps) * HISTOGRAM_BINS / steps + 1e-9))
+        assert bins[-1] == HISTOGRAM_BINS - 1
+
+
+@pytest.mark.parametrize('steps', STEPS)
+def test_percentile_matches_the_rank_based_result(steps):
+    rng = np.random.default_rng(steps)
+    population = scores(rng, 2000, steps)
+    histogram = ScoreHistogram(['accuracy'])
+    histogram.add(pd.DataFrame({'accuracy': population}))
+    for value in np.arange(steps + 1) / steps:
+        expected = percentileofscore(population, value, kind='mean')
+        assert histogram.percentile('accuracy', value) == pytest.approx(expected)
+
+
+def test_percentile_agrees_with_numpy_percentile():
+    rng = np.random.default_rng(0)
+    population = scores(rng, 1000, 36)
+    histogram = ScoreHistogram(['accuracy'])
+    histogram.add(pd.DataFrame({'accuracy': population}))
+    for q in [5, 25, 50, 75, 95]:
+        value = np.percentile(population, q, method='inverted_cdf')
+        below = 100 * np.mean(population < value)
+        at_or_below = 100 * np.mean(population <= value)
+        assert below <= q <= at_or_below
+        assert below <= histogram.percentile('accuracy', value) <= at_or_below
+
+
+def test_extra_scores_and_missing_values():
+    histogram = ScoreHistogram(['accuracy'])
+    assert histogram.percentile('accuracy', 0.5) is None
+    histogram.add(pd.DataFrame({'accuracy': [0.25, np.nan, 0.75]}))
+    assert histogram.total('accuracy') == 2
+    assert histogram.percentile('accuracy', np.nan) is None
+    extra = np.array([0.5, np.nan])
+    assert histogram.percentile('accuracy', 0.5, extra=extra) == pytest.approx(
+        percentileofscore([0.25, 0.75, 0.5], 0.5, kind='mean'))
+    # extra is not added for good
+    assert histogram.total('accuracy') == 2
@@ -0,0 +1,77 @@
+import pytest
+
+from benchmarks.synthetic import generate_sheet_values
+from fake_sheet import FakeWorksheet
+from response_cache import ResponseCache
+
+
+class RecordingSheet(FakeWorksheet):
+    """FakeWorksheet that remembers the ranges it was asked for."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ranges = []
+
+    def get_values(self, range_name=None):
+        self.ranges.append(range_name)
+        return super().get_values(range_name)
+
+
+@pytest.fixture
+def sheet():
+    values = generate_sheet_values(30, seed=4)
+    fake = RecordingSheet(values[0], values[1:21])
+    fake.spare_rows = values[21:]
+    return fake
+
+
+def test_sync_fetches_only_new_rows(sheet, tmp_path):
+    cache = ResponseCache(tmp_path, sync_interval=0)
+    frame = cache.sync(sheet.get_values)
+    assert len(frame) == 20
+    assert sheet.ranges == ['1:1', 'A2:M']
+
+    sheet.append_rows(sheet.spare_rows)
+    sheet.ranges.clear()
+    frame = cache.sync(sheet.get_values)
+    assert sheet.ranges == ['A22:M']
+    assert len(frame) == 30
+    last = sheet.spare_rows[-1]
+    assert cache.find(last[11])['name'] == last[0]
+    assert cache.version()[0] == 30
+
+
+def test_restart_resumes_from_parquet_parts(sheet, tmp_path):
+    first = ResponseCache(tmp_path, sync_interval=0)
+    first.sync(sheet.get_values)
+    sheet.append_rows(sheet.spare_rows)
+    first.sync(sheet.get_values)
+    assert len(list(tmp_path.glob('part-*.parquet'))) == 2
+
+    sheet.ranges.clear()
+    restarted = ResponseCache(tmp_path, sync_interval=0)
+    frame = restarted.sync(sheet.get_values)
+    # Nothing but the rows after the stored ones is downloaded again
+    assert sheet.ranges == ['A32:M']
+    assert restarted.version() == first.version()
+    assert frame['participant_id'].tolist() == first.frame['participant_id'].tolist()
+    # List cells come back from Parquet as arrays
+    assert [list(cell) for cell in frame['responses']] == [list(cell) for cell in first.frame['responses']]
+
+
+def test_generation_bump_forces_a_full_download(sheet, tmp_path):
+    cache = ResponseCache(tmp_path, sync_interval=0)
+    cache.sync(sheet.get_values)
+    sheet.update([['renamed']], 'A2:A2')
+
+    ResponseCache(tmp_path).bump_generation()
+    sheet.ranges.clear()
+    frame = cache.sync(sheet.get_values)
+    assert sheet.ranges == ['1:1', 'A2:M']
+    assert frame['name'].iloc[0] == 'renamed'
+    assert len(frame) == 20
+
+    # A restarted process trusts only parts written in the current generation
+    sheet.ranges.clear()
+    ResponseCache(tmp_path, sync_interval=0).sync(sheet.get_values)
+    assert sheet.ranges == ['A22:M']
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from results_cache import VersionedCache
+
+
+class Compute:
+    """compute() stand-in that counts its calls and blocks until released."""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        return self.value
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_concurrent_first_requests_share_one_computation():
+    cache = VersionedCache()
+    compute = Compute('v1')
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(1, compute))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    assert compute.started.wait(5)
+    time.sleep(0.05)
+    assert not results
+    compute.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == [('v1', True)] * 8
+    assert compute.calls == 1
+
+
+def test_stale_value_is_served_while_the_new_one_is_computed():
+    cache = VersionedCache()
+    first = Compute('v1')
+    first.release.set()
+    assert cache.get(1, first) == ('v1', True)
+
+    second = Compute('v2')
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(2, second))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    # Nobody waited for the running computation
+    assert results == [('v1', False)] * 8
+    assert second.started.wait(5) and second.calls == 1
+
+    second.release.set()
+    wait_for(lambda: cache.version == 2)
+    assert cache.get(2, second) == ('v2', True)
+    assert second.calls == 1
+
+
+def test_only_the_newest_queued_version_is_computed():
+    cache = VersionedCache()
+    computes = {version: Compute(f'v{version}') for version in range(1, 5)}
+    computes[1].release.set()
+    cache.get(1, computes[1])
+    cache.get(2, computes[2])
+    assert computes[2].started.wait(5)
+    cache.get(3, computes[3])
+    cache.get(4, computes[4])
+    computes[2].release.set()
+    computes[4].release.set()
+    wait_for(lambda: cache.version == 4)
+    assert [computes[version].calls for version in range(1, 5)] == [1, 1, 0, 1]
+
+
+def test_failed_first_computation_is_raised():
+    cache = VersionedCache()
+
+    def broken():
+        raise ValueError("no data")
+
+    with pytest.raises(RuntimeError, match="no data"):
+        cache.get(1, broken)
@@ -0,0 +1,149 @@
+import base64
+import json
+import random
+
+import numpy as np
+import pytest
+
+import database
+from benchmarks.synthetic import generate_sheet_values
+from fake_sheet import FakeWorksheet
+from response_cache import ResponseCache
+from scoring import (
+    MAX_FAMILIARITY, PAIR_LABELS, encode_responses, familiarity_cells, familiarity_scores, pack_familiarity,
+    pack_responses, parse_familiarity_cells, parse_response_cells, response_cells, score_matrix,
+    score_responses, unpack_familiarity, unpack_responses
+)
+from storage import SCORE_COLUMNS, SheetsStorage
+
+
+# The per-label loops the app scored with before scoring.py
+def old_category_score(responses, first, count, prefix):
+    correct_pairs = 0
+    for i in range(first, first + 2 * count, 2):
+        if f'{prefix} {i}' not in responses and f'{prefix} {i + 1}' in responses:
+            correct_pairs += 1
+    return correct_pairs / count
+
+
+def old_accuracy(responses):
+    correct = sum(int(response.split()[-1]) % 2 == 0 for response in responses)
+    return correct / len(responses)
+
+
+def random_answers(rng):
+    pairs = [pair for pair in PAIR_LABELS if rng.random() > 0.1]
+    rng.shuffle(pairs)
+    return [rng.choice(pair) for pair in pairs]
+
+
+def test_vectorized_scores_match_the_old_loops():
+    rng = random.Random(5)
+    responses_list = [random_answers(rng) for _ in range(500)]
+    codes = encode_responses(responses_list)
+    scores = score_matrix(codes, [len(responses) for responses in responses_list])
+    for k, responses in enumerate(responses_list):
+        assert scores['accuracy'][k] == pytest.approx(old_accuracy(responses))
+        assert scores['images'][k] == pytest.approx(old_category_score(responses, 1, 20, 'Image'))
+        assert scores['withoutAudio'][k] == pytest.approx(old_category_score(responses, 41, 8, 'Video'))
+        assert scores['withAudio'][k] == pytest.approx(old_category_score(responses, 57, 8, 'Video'))
+    assert score_responses(responses_list[0]) == {name: pytest.approx(values[0]) for name, values in scores.items()}
+
+
+def is_json(cell):
+    return cell.startswith('[')
+
+
+def test_packed_codes_round_trip():
+    rng = np.random.default_rng(1)
+    codes = rng.integers(0, 3, size=(50, len(PAIR_LABELS))).astype(np.uint8)
+    np.testing.assert_array_equal(unpack_responses(pack_responses(codes)), codes)
+    answers = rng.random((50, MAX_FAMILIARITY)) < 0.3
+    lengths = rng.integers(0, MAX_FAMILIARITY + 1, 50)
+    answers &= np.arange(MAX_FAMILIARITY) < lengths[:, None]
+    unpacked, unpacked_lengths = unpack_familiarity(pack_familiarity(answers, lengths))
+    np.testing.assert_array_equal(unpacked, answers)
+    np.testing.assert_array_equal(unpacked_lengths, lengths)
+    assert unpack_responses([]).shape == (0, len(PAIR_LABELS))
+
+
+def test_response_cells_round_trip():
+    responses_list = [
+        [],
+        [PAIR_LABELS[0][1], PAIR_LABELS[3][0], PAIR_LABELS[35][1]],
+        [second for _, second in PAIR_LABELS],
+        # Outside the answer key, a repeated pair and answers out of test order
+        ['Image 2', 'Image 999'],
+        [PAIR_LABELS[0][0], PAIR_LABELS[0][1]],
+        [PAIR_LABELS[5][0], PAIR_LABELS[2][0]],
+    ]
+    cells = response_cells(responses_list)
+    assert [is_json(cell) for cell in cells] == [False, False, False, True, True, True]
+    assert parse_response_cells(cells) == responses_list
+    assert response_cells([]) == []
+
+
+def test_familiarity_cells_round_trip():
+    familiarity_list = [
+        [],
+        ['Yes', 'No', 'No', 'Yes'],
+        ['Yes'] * MAX_FAMILIARITY,
+        # More answers than a packed cell holds, and an answer that is neither Yes nor No
+        ['No'] * MAX_FAMILIARITY + ['Yes'],
+        ['Yes', 'Maybe'],
+    ]
+    cells = familiarity_cells(familiarity_list)
+    assert [is_json(cell) for cell in cells] == [False, False, False, True, True]
+    assert parse_familiarity_cells(cells) == familiarity_list
+    assert familiarity_scores(parse_familiarity_cells(cells))[3] == pytest.approx(familiarity_scores(
+        [familiarity_list[3]])[0])
+
+
+def test_mixed_cells_in_one_column():
+    answers = [PAIR_LABELS[1][0], PAIR_LABELS[4][1]]
+    packed = response_cells([answers])[0]
+    column = [packed, json.dumps(answers), '', None, answers, json.dumps(['Image 999']), packed]
+    assert parse_response_cells(column) == [answers, answers, [], [], answers, ['Image 999'], answers]
+    familiarity = familiarity_cells([['No', 'Yes']])[0]
+    assert parse_familiarity_cells([json.dumps(['Yes']), familiarity, '']) == [['Yes'], ['No', 'Yes'], []]
+    # Cells of a newer packed format are refused rather than misread
+    newer = base64.b64encode(b'\x02' + base64.b64decode(packed)[1:]).decode()
+    with pytest.raises(ValueError):
+        parse_response_cells([packed, newer])
+
+
+@pytest.fixture
+def sheet_storage(monkeypatch, tmp_path):
+    values = generate_sheet_values(25, seed=6)
+    header = values[0]
+    rows = [list(row) for row in values[1:]]
+    # Scores written under an older answer key
+    for row in rows[::3]:
+        row[header.index('accuracy')] = '0'
+        row[header.index('images')] = '0'
+    sheet = FakeWorksheet(header, rows)
+    database.set_sheet_factory(lambda: sheet)
+    storage = SheetsStorage(database.call_sheet, ResponseCache(tmp_path / 'cache'))
+    monkeypatch.setattr(database, '_storage', storage)
+    yield sheet, storage
+    database.set_sheet_factory(None)
+
+
+def test_rescore_round_trip_on_the_sheet(sheet_storage):
+    sheet, storage = sheet_storage
+    stale = storage.read_all()
+    assert database.rescore_all_responses(dry_run=True) == 9
+    assert storage.generation() == 0
+
+    assert database.rescore_all_responses() == 9
+    assert storage.generation() == 1
+    stored = storage.read_all()
+    codes = encode_responses(stored['responses'])
+    expected = score_matrix(codes, stored['responses'].apply(len))
+    expected['fam_score'] = familiarity_scores(stored['familiarity'])
+    for column in SCORE_COLUMNS:
+        np.testing.assert_allclose(stored[column].to_numpy(dtype=float), expected[column])
+    # Only the score columns were rewritten
+    assert stored['participant_id'].tolist() == stale['participant_id'].tolist()
+    assert stored['responses'].tolist() == stale['responses'].tolist()
+    assert database.rescore_all_responses() == 0
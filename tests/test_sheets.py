@@ -0,0 +1,177 @@
+import json
+
+import pytest
+
+import database
+from fake_sheet import FakeSheetError, FakeWorksheet
+from journal import ResponseJournal, WriteBehindWriter
+from response_cache import SHEET_COLUMNS, ResponseCache
+from scoring import familiarity_cells, response_cells
+from storage import SheetsStorage
+
+
+class FlakyWorksheet(FakeWorksheet):
+    """FakeWorksheet whose next `failures` calls fail."""
+
+    def __init__(self, *args, failures=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+
+    def _call(self, name, write=False):
+        fail = super()._call(name, write)
+        if self.failures:
+            self.failures -= 1
+            if write and self.fail_after_write:
+                return True
+            raise FakeSheetError(f"injected failure in {name}")
+        return fail
+
+
+def row(k):
+    values = [''] * len(SHEET_COLUMNS)
+    values[SHEET_COLUMNS.index('name')] = f'participant_{k}'
+    values[SHEET_COLUMNS.index('participant_id')] = f'id-{k}'
+    return values
+
+
+@pytest.fixture
+def sheet(monkeypatch):
+    monkeypatch.setattr(database, 'RETRY_BASE_DELAY', 0.0)
+    fake = FlakyWorksheet(SHEET_COLUMNS, [row(k) for k in range(3)])
+    database.set_sheet_factory(lambda: fake)
+    yield fake
+    database.set_sheet_factory(None)
+
+
+@pytest.fixture
+def storage(sheet, tmp_path):
+    return SheetsStorage(database.call_sheet, ResponseCache(tmp_path / 'cache'))
+
+
+def test_reads_are_retried(sheet):
+    sheet.failures = 2
+    values = database.call_sheet('get_values', 'A1:A')
+    assert [value[0] for value in values] == ['name'] + [f'participant_{k}' for k in range(3)]
+    assert sheet.calls['get_values'] == 3
+    assert database.get_sheet_metrics()['get_values']['retries'] >= 2
+
+
+def test_reads_give_up_after_the_last_attempt(sheet):
+    sheet.failures = database.RETRY_ATTEMPTS
+    with pytest.raises(FakeSheetError):
+        database.call_sheet('get_all_values')
+    assert sheet.calls['get_all_values'] == database.RETRY_ATTEMPTS
+
+
+def test_appends_are_not_retried(sheet):
+    sheet.failures = 1
+    with pytest.raises(FakeSheetError):
+        database.call_sheet('append_rows', [row(3)])
+    assert sheet.calls['append_rows'] == 1
+    assert len(sheet.rows) == 4
+
+
+def test_only_transient_errors_are_retryable():
+    assert database._is_retryable(ConnectionError())
+    assert database._is_retryable(TimeoutError())
+    assert not database._is_retryable(FileNotFoundError())
+    assert not database._is_retryable(PermissionError())
+
+
+def test_append_applied_without_reply_is_not_duplicated(sheet, storage):
+    sheet.fail_after_write = True
+    sheet.failures = 1
+    with pytest.raises(FakeSheetError):
+        storage.append_rows([row(3), row(4)])
+    assert len(sheet.rows) == 6
+    # The writer re-sends the batch; the rows are already there
+    assert storage.append_rows([row(3), row(4), row(5)]) == 1
+    ids = [values[SHEET_COLUMNS.index('participant_id')] for values in sheet.rows[1:]]
+    assert ids == [f'id-{k}' for k in range(6)]
+
+
+def test_writer_delivers_each_row_once(sheet, storage, tmp_path):
+    sheet.fail_after_write = True
+    sheet.failures = 1
+    writer = WriteBehindWriter(storage.append_rows, ResponseJournal(tmp_path / 'journal'),
+                               flush_interval=0.01, max_backoff=0.01).start()
+    for k in range(3, 8):
+        writer.submit(row(k))
+    assert writer.flush(timeout=10)
+    writer.stop()
+    ids = [values[SHEET_COLUMNS.index('participant_id')] for values in sheet.rows[1:]]
+    assert ids == [f'id-{k}' for k in range(8)]
+    assert writer.failures >= 1
+
+
+def test_get_values_is_counted_once():
+    fake = FakeWorksheet(SHEET_COLUMNS, [row(0)])
+    assert fake.get_values() == fake.get_all_values()
+    assert fake.calls == {'get_values': 1, 'get_all_values': 1}
+
+
+def test_rewrites_bump_the_generation_instead_of_deleting(sheet, storage, tmp_path):
+    storage.load(force=True)
+    parts = sorted((tmp_path / 'cache').glob('part-*.parquet'))
+    assert parts
+
+    # The maintenance command runs in another process with its own cache object
+    maintenance = SheetsStorage(database.call_sheet, ResponseCache(tmp_path / 'cache'))
+    frame = maintenance.read_all()
+    maintenance.write_columns(['name', 'age'], [[f'renamed_{k}', '30'] for k in range(len(frame))])
+    assert sorted((tmp_path / 'cache').glob('part-*.parquet')) == parts
+    assert storage.generation() == 1
+
+    reloaded = storage.load()
+    assert reloaded['name'].tolist() == [f'renamed_{k}' for k in range(3)]
+    assert ResponseCache(tmp_path / 'cache').sync(lambda range_name: [], force=False)['name'].tolist() == \
+        reloaded['name'].tolist()
+
+
+def test_writes_need_contiguous_columns(sheet, storage):
+    storage.read_all()
+    with pytest.raises(ValueError):
+        storage.write_columns(['name', 'gender'], [['x', 'y']] * 3)
+    assert 'update' not in sheet.calls
+
+
+def test_packing_leaves_the_app_cache_to_reload(sheet, storage, monkeypatch):
+    monkeypatch.setattr(database, '_storage', storage)
+    # Rows written before the packed encoding
+    sheet.update([['["Image 2", "Image 3"]', '["Yes", "No", "No", "No"]']] * 3, 'E2:F4')
+    before = storage.load(force=True)
+
+    assert database.pack_stored_responses() == (3, 3)
+    assert storage.generation() == 1
+    after = storage.load()
+    assert after['responses'].tolist() == before['responses'].tolist()
+    assert after['familiarity'].tolist() == before['familiarity'].tolist()
+    assert not sheet.get_values('E2:E')[0][0].startswith('[')
+
+
+def test_packing_a_mixed_column(sheet, storage, monkeypatch):
+    monkeypatch.setattr(database, '_storage', storage)
+    packed = response_cells([['Image 2', 'Image 3']])[0]
+    packed_familiarity = familiarity_cells([['No', 'No']])[0]
+    # Already packed, legacy JSON that packs, and JSON the packed form cannot hold
+    sheet.update([
+        [packed, packed_familiarity],
+        ['["Image 2", "Image 3"]', '["Yes", "No", "No", "No"]'],
+        ['["Image 2", "Image 999"]', json.dumps(['No'] * 73)],
+    ], 'E2:F4')
+    before = storage.load(force=True)
+
+    assert database.pack_stored_responses(dry_run=True) == (3, 1)
+    assert storage.generation() == 0
+    assert database.pack_stored_responses() == (3, 1)
+    cells = sheet.get_values('E2:F4')
+    assert cells[0] == [packed, packed_familiarity]
+    assert not cells[1][0].startswith('[') and not cells[1][1].startswith('[')
+    assert cells[2] == ['["Image 2", "Image 999"]', json.dumps(['No'] * 73)]
+    after = storage.load()
+    assert after['responses'].tolist() == before['responses'].tolist()
+    assert after['familiarity'].tolist() == before['familiarity'].tolist()
+    # Nothing left to convert
+    updates = sheet.calls['update']
+    assert database.pack_stored_responses() == (3, 0)
+    assert sheet.calls['update'] == updates
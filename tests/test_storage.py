@@ -0,0 +1,153 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import database
+from benchmarks.synthetic import generate_sheet_values
+from journal import ResponseJournal, WriteBehindWriter
+from response_cache import SHEET_COLUMNS, parse_rows
+from storage import SCORE_COLUMNS, SQLiteStorage
+
+
+@pytest.fixture
+def values():
+    return generate_sheet_values(40, seed=3)
+
+
+@pytest.fixture
+def storage(tmp_path, values):
+    storage = SQLiteStorage(tmp_path / 'responses.db')
+    assert storage.append_rows(values[1:]) == 40
+    return storage
+
+
+def expected(values):
+    return parse_rows(values[1:], values[0])
+
+
+def assert_same_rows(frame, reference):
+    frame = frame.reset_index(drop=True)
+    reference = reference.reset_index(drop=True)
+    for column in ['responses', 'familiarity']:
+        assert [list(cell) for cell in frame[column]] == [list(cell) for cell in reference[column]]
+    columns = [column for column in SHEET_COLUMNS if column not in ('responses', 'familiarity')]
+    pd.testing.assert_frame_equal(frame[columns], reference[columns], check_dtype=False)
+
+
+def test_append_skips_stored_participants(storage, values):
+    version = storage.version()
+    # A batch re-delivered after a lost acknowledgement, plus one new row
+    extra = generate_sheet_values(41, seed=4)[-1]
+    assert storage.append_rows(values[1:6] + [extra]) == 1
+    assert storage.version()[0] == 41 and storage.version() != version
+    assert len(storage.read_all()) == 41
+
+
+def test_read_all_reassembles_lists(storage, values):
+    reference = expected(values)
+    assert_same_rows(storage.read_all(), reference)
+    assert_same_rows(storage.load(), reference)
+
+
+def test_labels_outside_the_answer_key_are_kept(storage):
+    row = list(generate_sheet_values(41, seed=5)[-1])
+    row[SHEET_COLUMNS.index('responses')] = json.dumps(['Image 2', 'Image 999', 'Video 9999'])
+    row[SHEET_COLUMNS.index('familiarity')] = json.dumps(['Yes', 'No'])
+    storage.append_rows([row])
+    found = storage.find(row[SHEET_COLUMNS.index('participant_id')])
+    assert found['responses'] == ['Image 2', 'Image 999', 'Video 9999']
+    assert storage.read_all().iloc[-1]['familiarity'] == ['Yes', 'No']
+
+
+def test_filtered_reads_get_their_own_items(storage, values):
+    reference = expected(values)
+    cutoff = reference['submitted_at'].iloc[20]
+    # Every other participant predates the cutoff, so the selected ids are not one contiguous range
+    connection = storage._connect()
+    with connection:
+        connection.execute("UPDATE participants SET submitted_at = '2000-01-01T00:00:00+00:00' WHERE id % 2 = 0")
+    chunks = list(storage.iter_rows(chunk_size=7, submitted_after=cutoff))
+    ids = np.concatenate([row_ids for row_ids, _ in chunks])
+    positions = np.arange(21, 40)
+    np.testing.assert_array_equal(ids, positions[positions % 2 == 0] + 1)
+    frame = pd.concat([chunk for _, chunk in chunks], ignore_index=True)
+    assert_same_rows(frame, reference.iloc[ids - 1])
+
+
+def test_find(storage, values):
+    reference = expected(values)
+    for position in [0, 17, 39]:
+        found = storage.find(reference['participant_id'].iloc[position])
+        assert list(found.index) == SHEET_COLUMNS
+        assert found['responses'] == list(reference['responses'].iloc[position])
+        assert found['familiarity'] == list(reference['familiarity'].iloc[position])
+        assert found['accuracy'] == pytest.approx(reference['accuracy'].iloc[position])
+    assert storage.find('nobody') is None
+
+
+def test_percentile_counts_ties_as_half(storage, values):
+    scores = expected(values)['accuracy'].to_numpy()
+    extra = np.array([0.5, np.nan, scores[0]])
+    for value in [0.0, scores[0], np.median(scores), 1.0]:
+        for added in [None, extra]:
+            pool = scores if added is None else np.concatenate([scores, added[~np.isnan(added)]])
+            rank = 100 * (np.sum(pool < value) + 0.5 * np.sum(pool == value)) / len(pool)
+            assert storage.percentile('accuracy', value, extra=added) == pytest.approx(rank)
+    assert storage.percentile('accuracy', np.nan) is None
+    with pytest.raises(ValueError):
+        storage.percentile('name', 0.5)
+
+
+def test_write_scores_rewrites_only_scores(storage):
+    frame = storage.read_all()
+    version, generation = storage.version(), storage.generation()
+    values = frame[SCORE_COLUMNS].to_numpy(dtype=float) / 2
+    storage.write_scores(frame, values)
+    rewritten = storage.read_all()
+    np.testing.assert_allclose(rewritten[SCORE_COLUMNS].to_numpy(dtype=float), values)
+    others = [column for column in SHEET_COLUMNS if column not in SCORE_COLUMNS]
+    assert_same_rows(rewritten[others].assign(**frame[SCORE_COLUMNS]), frame)
+    assert storage.generation() == generation + 1
+    assert storage.version() != version
+    # The cached table notices the rewrite
+    np.testing.assert_allclose(storage.load()['accuracy'].to_numpy(dtype=float), values[:, 0])
+
+
+def test_migrate_is_idempotent(tmp_path, values):
+    # Legacy rows have no participant ID or timestamp
+    records = [dict(zip(values[0], row)) for row in values[1:11]]
+    for record in records:
+        del record['participant_id'], record['submitted_at']
+    json_path = tmp_path / 'responses.json'
+    json_path.write_text(json.dumps(records))
+    target = SQLiteStorage(tmp_path / 'migrated.db')
+    assert database.migrate_responses('json', json_path, target) == (10, 10)
+    assert target.generation() == 1
+    assert database.migrate_responses('json', json_path, target) == (10, 0)
+    assert target.generation() == 1
+    migrated = target.read_all()
+    assert migrated['participant_id'].str.startswith('legacy-').all()
+    assert [list(cell) for cell in migrated['responses']] == \
+        [list(cell) for cell in expected(values)['responses'].iloc[:10]]
+
+
+def test_results_page_reads_skip_the_full_table(storage, tmp_path, monkeypatch):
+    reads = []
+    read_frame = storage._read_frame
+    monkeypatch.setattr(storage, '_read_frame', lambda *args, **kwargs: reads.append(args) or read_frame(*args, **kwargs))
+    database.set_storage(storage)
+    monkeypatch.setattr(database, '_writer', WriteBehindWriter(
+        database._append_rows, ResponseJournal(tmp_path / 'responses.journal')))
+    try:
+        participant_id = storage.read_all()['participant_id'].iloc[5]
+        reads.clear()
+        pending = database.sync_responses()
+        participant = database.find_participant(participant_id, pending)
+        database.participant_percentiles(participant, pending)
+        assert reads == []
+        assert len(database.load_all_responses(pending)) == 40
+        assert len(reads) == 1
+    finally:
+        database.set_storage(None)